@@ -10,10 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 import textwrap
 
 from pathlib import Path
 
+from .databases import sqlite_production_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "tx.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -52,6 +56,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "tx.replica.ReadReplicaMiddleware",
+    "tx.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "taxan.urls"
@@ -84,6 +90,13 @@ DATABASES = {
     }
 }
 
+# WAL, tuned PRAGMAs and a read-only `replica` alias for report traffic; see
+# taxan/databases.py
+if os.environ.get("TAXAN_DATABASE_PROFILE") == "production":
+    DATABASES = sqlite_production_databases(BASE_DIR / "db.sqlite3")
+
+DATABASE_ROUTERS = ["tx.replica.ReadReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -125,6 +138,33 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Coalesce concurrent event creations in each process into shared write
+# transactions (group commit, see tx/group_commit.py), of at most
+# EVENT_GROUP_COMMIT_MAX_BATCH events
+EVENT_GROUP_COMMIT = False
+EVENT_GROUP_COMMIT_MAX_BATCH = 100
+
+# Hand attachment downloads to the front proxy instead of sending them from
+# Django: None, "x-accel-redirect" (nginx) or "x-sendfile" (Apache, lighttpd)
+ATTACHMENT_SENDFILE = None
+# The internal nginx location that serves MEDIA_ROOT, for X-Accel-Redirect
+ATTACHMENT_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+
+# Where ProfilingMiddleware saves the profiles of requests made with
+# "X-Profile: 1" by staff users, and how many of them it keeps
+PROFILE_ROOT = BASE_DIR / "profiles"
+PROFILE_KEEP = 100
+
+# Log queries slower than this many seconds, with their query plan, to the
+# "tx.slow_queries" logger; None turns it off
+SLOW_QUERY_THRESHOLD = 0.5
+
+# Hash uploads while they are received, for content-addressed attachments
+FILE_UPLOAD_HANDLERS = [
+    "tx.storage.HashingMemoryFileUploadHandler",
+    "tx.storage.HashingTemporaryFileUploadHandler",
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -168,5 +208,9 @@ SPECTACULAR_SETTINGS = {
             "name": "attachments",
             "description": "File attachments associated with accounting events",
         },
+        {
+            "name": "accounts",
+            "description": "Chart of accounts and account balances",
+        },
     ],
 }
@@ -20,7 +20,22 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
-from tx.views import EventViewSet, FinancialYearViewSet, AttachmentViewSet
+from tx.views import (
+    AccountViewSet,
+    EventViewSet,
+    FinancialYearViewSet,
+    AttachmentViewSet,
+)
+from tx.async_views import (
+    AsyncAttachmentDetailView,
+    AsyncAttachmentListView,
+    AsyncEventDetailView,
+    AsyncEventListView,
+    AsyncFinancialYearDetailView,
+    AsyncFinancialYearListView,
+)
+from tx.metrics import metrics_view
+from tx.profiling import profile_view
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 # Create a router instance
@@ -28,12 +43,42 @@ router = DefaultRouter()
 router.register(r"events", EventViewSet)
 router.register(r"financial-years", FinancialYearViewSet)
 router.register(r"attachments", AttachmentViewSet)
+router.register(r"accounts", AccountViewSet)
+
+# Async versions of the hot read endpoints, for ASGI deployments
+async_urlpatterns = [
+    path("events/", AsyncEventListView.as_view(), name="async-event-list"),
+    path("events/<int:pk>/", AsyncEventDetailView.as_view(), name="async-event-detail"),
+    path(
+        "financial-years/",
+        AsyncFinancialYearListView.as_view(),
+        name="async-financialyear-list",
+    ),
+    path(
+        "financial-years/<int:pk>/",
+        AsyncFinancialYearDetailView.as_view(),
+        name="async-financialyear-detail",
+    ),
+    path(
+        "attachments/",
+        AsyncAttachmentListView.as_view(),
+        name="async-attachment-list",
+    ),
+    path(
+        "attachments/<int:pk>/",
+        AsyncAttachmentDetailView.as_view(),
+        name="async-attachment-detail",
+    ),
+]
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api-auth/", include("rest_framework.urls")),
     path("schema/", SpectacularAPIView.as_view(), name="schema"),
     path("docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+    path("async/", include(async_urlpatterns)),
+    path("metrics", metrics_view, name="metrics"),
+    path("profiles/<uuid:profile_id>/", profile_view, name="profile"),
     path("", include(router.urls)),
 ]
 
@@ -0,0 +1,38 @@
+"""
+Monetary amounts.
+
+Amounts are stored as integers of öre (hundredths of a krona), so sums,
+comparisons and balance checks run on native integers in the database and in
+Python. They are converted to and from two-decimal strings only at the edges:
+the API, exports and SIE files.
+"""
+
+from decimal import Decimal
+
+# `Transaction.amount` accepts up to 12 digits, 2 of them decimals.
+MAX_DIGITS = 12
+DECIMAL_PLACES = 2
+
+
+def to_ore(value):
+    """
+    Convert a `Decimal` amount in kronor to integer öre. Raises `ValueError`
+    if the amount is not finite or has more than two decimals.
+    """
+    if not value.is_finite():
+        raise ValueError(f"Invalid amount: {value}")
+    ore = value.scaleb(DECIMAL_PLACES)
+    if ore != ore.to_integral_value():
+        raise ValueError(f"Amount has more than {DECIMAL_PLACES} decimals: {value}")
+    return int(ore)
+
+
+def from_ore(ore):
+    """Convert integer öre to a `Decimal` amount in kronor with two decimals."""
+    return Decimal(ore).scaleb(-DECIMAL_PLACES)
+
+
+def format_ore(ore):
+    """Format integer öre as a decimal string, e.g. `-123456` as `-1234.56`."""
+    kronor, ore_part = divmod(abs(ore), 100)
+    return f"{'-' if ore < 0 else ''}{kronor}.{ore_part:02d}"
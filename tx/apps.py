@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class TxConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tx"
+
+    def ready(self):
+        # Imported for the signal receivers they connect
+        from . import financial_years  # noqa: F401
+        from . import metrics  # noqa: F401
+        from . import profiling  # noqa: F401
+        from . import replica  # noqa: F401
+        from . import storage  # noqa: F401
@@ -0,0 +1,194 @@
+"""
+Async read endpoints for ASGI deployments.
+
+The DRF viewsets are synchronous, so under ASGI every request to them holds a
+worker thread from start to finish. The views here serve the hot read paths
+(event, financial year and attachment list and detail) as native coroutines
+with Django's async ORM, so a request only occupies a thread while a query
+runs. They are plain Django views mounted under `/async/` next to the
+viewsets, and return the same representation: serializers, pagination,
+filters and cache headers are taken from the viewset each one mirrors. Only
+JSON is rendered.
+"""
+
+from django.db.models import aprefetch_related_objects
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .caching import ConditionalGetMixin, add_cache_headers, make_etag
+from .models import Attachment
+from .representations import EVENT_FIELDS, aserialize_events
+from .serializers import EventFilterSerializer
+from .views import (
+    EVENT_VERSION_FIELDS,
+    AttachmentViewSet,
+    EventViewSet,
+    FinancialYearViewSet,
+    event_versions,
+    filter_events,
+    page_attachment_ids,
+)
+
+
+class AsyncReadView(View):
+    """
+    Base class for async views serving the representation of `viewset`.
+
+    Subclasses implement `respond()`. For viewsets with conditional GET,
+    `get_version()` returns the state of the requested page or object that
+    the ETag is derived from, like the viewset's own version methods.
+    """
+
+    viewset = None
+    http_method_names = ["get", "head", "options"]
+    renderer = JSONRenderer()
+
+    async def get(self, request, **kwargs):
+        request = Request(request)
+        request.accepted_renderer = self.renderer
+        try:
+            return await self.respond(request, **kwargs)
+        except APIException as exc:
+            detail = exc.detail
+            if not isinstance(detail, (list, dict)):
+                detail = {"detail": detail}
+            return self.render(detail, status=exc.status_code)
+
+    async def respond(self, request, **kwargs):
+        raise NotImplementedError
+
+    def get_queryset(self):
+        return self.viewset.queryset.all()
+
+    def serialize(self, request, instance, many=False):
+        serializer_class = self.viewset.serializer_class
+        return serializer_class(instance, many=many, context={"request": request}).data
+
+    def render(self, data, status=200):
+        return HttpResponse(
+            self.renderer.render(data),
+            status=status,
+            content_type=self.renderer.media_type,
+        )
+
+    async def conditional_response(self, request, version, cache_control, render):
+        if not issubclass(self.viewset, ConditionalGetMixin):
+            return await render()
+        etag = make_etag(request, version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = await render()
+        return add_cache_headers(response, etag, cache_control)
+
+
+class AsyncListView(AsyncReadView):
+    """List endpoint, paginated and prefetched like the viewset's `list`."""
+
+    action = "list"
+
+    def filter_queryset(self, request, queryset):
+        return queryset
+
+    async def respond(self, request):
+        queryset = self.filter_queryset(
+            request, self.get_queryset().prefetch_related(None)
+        )
+        pagination_class = self.viewset.pagination_class
+        paginator = pagination_class() if pagination_class else None
+        if paginator is not None:
+            page = await paginator.apaginate_queryset(queryset, request)
+        else:
+            page = [obj async for obj in queryset]
+
+        version = None
+        if issubclass(self.viewset, ConditionalGetMixin):
+            version = await self.get_version(request, page)
+            if paginator is not None:
+                version = (version, paginator.has_next, paginator.has_previous)
+
+        async def render():
+            data = await self.serialize_page(request, page)
+            if paginator is not None:
+                data = paginator.get_paginated_response(data).data
+            return self.render(data)
+
+        cache_control = getattr(self.viewset, "list_cache_control", None)
+        return await self.conditional_response(request, version, cache_control, render)
+
+    async def get_version(self, request, page):
+        return [obj.pk for obj in page]
+
+    async def serialize_page(self, request, page):
+        await aprefetch_related_objects(
+            page, *getattr(self.viewset, "page_prefetch", ())
+        )
+        return self.serialize(request, page, many=True)
+
+
+class AsyncDetailView(AsyncReadView):
+    """Detail endpoint; the ETag is checked before the object is loaded."""
+
+    action = "retrieve"
+
+    async def respond(self, request, pk):
+        version = None
+        if issubclass(self.viewset, ConditionalGetMixin):
+            version = await self.get_version(request, pk)
+            if version is None:
+                raise NotFound()
+
+        async def render():
+            instance = await self.get_queryset().filter(pk=pk).afirst()
+            if instance is None:
+                raise NotFound()
+            return self.render(self.serialize(request, instance))
+
+        cache_control = getattr(self.viewset, "object_cache_control", None)
+        return await self.conditional_response(request, version, cache_control, render)
+
+
+class AsyncEventListView(AsyncListView):
+    viewset = EventViewSet
+
+    def filter_queryset(self, request, queryset):
+        query = EventFilterSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return filter_events(queryset, query.validated_data).values(*EVENT_FIELDS)
+
+    async def get_version(self, request, page):
+        ids = [event["id"] for event in page]
+        return ids, [pk async for pk in page_attachment_ids(ids)]
+
+    async def serialize_page(self, request, page):
+        return await aserialize_events(page, request)
+
+
+class AsyncEventDetailView(AsyncDetailView):
+    viewset = EventViewSet
+
+    async def get_version(self, request, pk):
+        versions = event_versions().filter(pk=pk)
+        return await versions.values_list(*EVENT_VERSION_FIELDS).afirst()
+
+
+class AsyncFinancialYearListView(AsyncListView):
+    viewset = FinancialYearViewSet
+
+
+class AsyncFinancialYearDetailView(AsyncDetailView):
+    viewset = FinancialYearViewSet
+
+
+class AsyncAttachmentListView(AsyncListView):
+    viewset = AttachmentViewSet
+
+
+class AsyncAttachmentDetailView(AsyncDetailView):
+    viewset = AttachmentViewSet
+
+    async def get_version(self, request, pk):
+        return await Attachment.objects.filter(pk=pk).values_list("id", "file").afirst()
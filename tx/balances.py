@@ -0,0 +1,374 @@
+"""
+Maintenance of the `AccountBalance` and `BalanceCheckpoint` tables.
+
+Every write path that creates transactions calls `apply_transactions` inside
+the same database transaction, so the per-account totals for each financial
+year and the month-end checkpoints are always in step with the `Transaction`
+table. Balance reads then cost one row per account instead of a scan over
+every transaction.
+
+A checkpoint row exists for every month in which an account has activity and
+holds the cumulative totals at that month's end. Months without a row had no
+activity, so the balance at any date is the latest checkpoint before the
+date's month plus the transactions from the start of that month.
+"""
+
+import calendar
+from collections import defaultdict
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db import connections, router
+from django.db.models import BigIntegerField, F, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, RowNumber, TruncMonth
+
+from .models import AccountBalance, BalanceCheckpoint, Transaction
+
+# Accounts per query when selecting checkpoints with one condition per account:
+# every OR term deepens the expression tree, which SQLite limits to 1000
+ACCOUNTS_PER_QUERY = 250
+
+
+def month_end(value):
+    return value.replace(day=calendar.monthrange(value.year, value.month)[1])
+
+
+def _account_chunks(dates):
+    """Split `{account_id: date}` into dicts of `ACCOUNTS_PER_QUERY` items."""
+    items = iter(dates.items())
+    while chunk := dict(islice(items, ACCOUNTS_PER_QUERY)):
+        yield chunk
+
+
+def _per_account(dates, lookup):
+    """`Q` matching the checkpoints of each account in `dates` by `lookup`."""
+    return reduce(
+        or_,
+        (
+            Q(account_id=account_id, **{f"date__{lookup}": date})
+            for account_id, date in dates.items()
+        ),
+    )
+
+
+def apply_transactions(transactions):
+    """
+    Add newly created `transactions` to the balance table and checkpoints.
+    Must be called in the `transaction.atomic()` block that created them.
+    """
+    transactions = list(transactions)
+    _apply_year_totals(transactions)
+    _apply_checkpoints(transactions)
+
+
+def _sum_by(transactions, key):
+    deltas = defaultdict(lambda: [0, 0])
+    for transaction in transactions:
+        if transaction.direction == "debit":
+            deltas[key(transaction)][0] += transaction.amount
+        else:
+            deltas[key(transaction)][1] += transaction.amount
+    return deltas
+
+
+def _add_totals(model, where, increments):
+    """
+    Add `(debit, credit, *params)` increments to the rows of `model` selected
+    by the `where` clause, executing one UPDATE statement for all of them.
+    """
+    if not increments:
+        return
+    connection = connections[router.db_for_write(model)]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET debit = debit + %s, credit = credit + %s "
+            f"WHERE {where}",
+            increments,
+        )
+
+
+def _apply_year_totals(transactions):
+    deltas = _sum_by(
+        transactions,
+        lambda transaction: (
+            transaction.account_id,
+            transaction.event.financial_year_id,
+        ),
+    )
+    if not deltas:
+        return
+
+    AccountBalance.objects.bulk_create(
+        [
+            AccountBalance(account_id=account_id, financial_year_id=financial_year_id)
+            for account_id, financial_year_id in deltas
+        ],
+        ignore_conflicts=True,
+    )
+    _add_totals(
+        AccountBalance,
+        "account_id = %s AND financial_year_id = %s",
+        [
+            (debit, credit, account_id, financial_year_id)
+            for (account_id, financial_year_id), (debit, credit) in deltas.items()
+        ],
+    )
+
+
+def _apply_checkpoints(transactions):
+    """
+    Roll the checkpoints of each touched account forward from the month the
+    transactions landed in, creating that month's checkpoint when missing.
+
+    Does not issue queries per month: it reads the checkpoints from the first
+    touched month on and the checkpoint before it for accounts that need a
+    new one, with one query of each per `ACCOUNTS_PER_QUERY` accounts, then
+    runs one UPDATE and one INSERT.
+    """
+    deltas = _sum_by(
+        transactions,
+        lambda transaction: (
+            transaction.account_id,
+            month_end(transaction.event.date),
+        ),
+    )
+    if not deltas:
+        return
+
+    first_month = {}
+    for account_id, date in sorted(deltas):
+        first_month.setdefault(account_id, date)
+
+    later = {
+        (account_id, date): (debit, credit)
+        for chunk in _account_chunks(first_month)
+        for account_id, date, debit, credit in BalanceCheckpoint.objects.filter(
+            _per_account(chunk, "gte")
+        ).values_list("account_id", "date", "debit", "credit")
+    }
+    previous = _previous_checkpoints(
+        {
+            account_id: first_month[account_id]
+            for account_id, date in deltas
+            if (account_id, date) not in later
+        }
+    )
+
+    # Each month's totals roll every existing checkpoint from that month on
+    # forward; the increments add up where an account has several months.
+    last_checkpoint = {}
+    for account_id, date in later:
+        last_checkpoint[account_id] = max(date, last_checkpoint.get(account_id, date))
+    _add_totals(
+        BalanceCheckpoint,
+        "account_id = %s AND date >= %s",
+        [
+            (debit, credit, account_id, date)
+            for (account_id, date), (debit, credit) in deltas.items()
+            if date <= last_checkpoint.get(account_id, date.min)
+        ],
+    )
+
+    # New checkpoints start from the closest earlier checkpoint as it was
+    # before these transactions, plus the running total of them up to the
+    # month they close.
+    dates = defaultdict(set)
+    for account_id, date in [*deltas, *later]:
+        dates[account_id].add(date)
+    created = []
+    for account_id, account_dates in dates.items():
+        base = previous.get(account_id, (0, 0))
+        debit = credit = 0
+        for date in sorted(account_dates):
+            delta = deltas.get((account_id, date), (0, 0))
+            debit += delta[0]
+            credit += delta[1]
+            if (account_id, date) in later:
+                base = later[account_id, date]
+            else:
+                created.append(
+                    BalanceCheckpoint(
+                        account_id=account_id,
+                        date=date,
+                        debit=base[0] + debit,
+                        credit=base[1] + credit,
+                    )
+                )
+    BalanceCheckpoint.objects.bulk_create(created)
+
+
+def _previous_checkpoints(before):
+    """
+    Return `{account_id: (debit, credit)}` of the latest checkpoint of each
+    account in `before` dated before the date it maps to.
+    """
+    previous = {}
+    for chunk in _account_chunks(before):
+        rows = (
+            BalanceCheckpoint.objects.filter(_per_account(chunk, "lt"))
+            .annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=F("account_id"),
+                    order_by=F("date").desc(),
+                )
+            )
+            .filter(position=1)
+            .values_list("account_id", "debit", "credit")
+        )
+        previous.update(
+            (account_id, (debit, credit)) for account_id, debit, credit in rows
+        )
+    return previous
+
+
+def sum_direction(direction):
+    """Aggregate of transaction amounts in one direction, zero when empty."""
+    return Coalesce(
+        Sum("amount", filter=Q(direction=direction)),
+        Value(0),
+        output_field=BigIntegerField(),
+    )
+
+
+def computed_balances(transactions=None):
+    """
+    Return `{(account_id, financial_year_id): (debit, credit)}` aggregated from
+    the `Transaction` table with one grouped query.
+    """
+    if transactions is None:
+        transactions = Transaction.objects.all()
+    rows = (
+        transactions.order_by()
+        .values("account_id", "event__financial_year_id")
+        .annotate(debit=sum_direction("debit"), credit=sum_direction("credit"))
+        .values_list("account_id", "event__financial_year_id", "debit", "credit")
+    )
+    return {
+        (account_id, financial_year_id): (debit, credit)
+        for account_id, financial_year_id, debit, credit in rows
+    }
+
+
+def rebuild_balances():
+    """Replace the balance table with totals recomputed from transactions."""
+    balances = [
+        AccountBalance(
+            account_id=account_id,
+            financial_year_id=financial_year_id,
+            debit=debit,
+            credit=credit,
+        )
+        for (account_id, financial_year_id), (debit, credit) in (
+            computed_balances().items()
+        )
+    ]
+    AccountBalance.objects.all().delete()
+    AccountBalance.objects.bulk_create(balances)
+    return len(balances)
+
+
+def verify_balances():
+    """
+    Compare the balance table with totals recomputed from transactions and
+    return a list of `(account_id, financial_year_id, stored, computed)`
+    mismatches, where each side is a `(debit, credit)` pair.
+    """
+    computed = computed_balances()
+    stored = {
+        (account_id, financial_year_id): (debit, credit)
+        for account_id, financial_year_id, debit, credit in (
+            AccountBalance.objects.values_list(
+                "account_id", "financial_year_id", "debit", "credit"
+            )
+        )
+    }
+    mismatches = []
+    for key in sorted(computed.keys() | stored.keys()):
+        expected = computed.get(key, (0, 0))
+        actual = stored.get(key, (0, 0))
+        if expected != actual:
+            mismatches.append((*key, actual, expected))
+    return mismatches
+
+
+def computed_checkpoints():
+    """
+    Return `{(account_id, month end): (debit, credit)}` with cumulative totals,
+    from one query grouped by account and month.
+    """
+    rows = (
+        Transaction.objects.order_by()
+        .values("account_id", month=TruncMonth("event__date"))
+        .annotate(debit=sum_direction("debit"), credit=sum_direction("credit"))
+        .order_by("account_id", "month")
+        .values_list("account_id", "month", "debit", "credit")
+    )
+    checkpoints = {}
+    totals = defaultdict(lambda: (0, 0))
+    for account_id, month, debit, credit in rows:
+        previous_debit, previous_credit = totals[account_id]
+        totals[account_id] = (previous_debit + debit, previous_credit + credit)
+        checkpoints[(account_id, month_end(month))] = totals[account_id]
+    return checkpoints
+
+
+def rebuild_checkpoints():
+    """Replace the checkpoints with totals recomputed from transactions."""
+    checkpoints = [
+        BalanceCheckpoint(account_id=account_id, date=date, debit=debit, credit=credit)
+        for (account_id, date), (debit, credit) in computed_checkpoints().items()
+    ]
+    BalanceCheckpoint.objects.all().delete()
+    BalanceCheckpoint.objects.bulk_create(checkpoints)
+    return len(checkpoints)
+
+
+def verify_checkpoints():
+    """
+    Compare the checkpoints with totals recomputed from transactions and
+    return a list of `(account_id, date, stored, computed)` mismatches.
+    """
+    computed = computed_checkpoints()
+    stored = {
+        (account_id, date): (debit, credit)
+        for account_id, date, debit, credit in (
+            BalanceCheckpoint.objects.values_list(
+                "account_id", "date", "debit", "credit"
+            )
+        )
+    }
+    mismatches = []
+    for key in sorted(computed.keys() | stored.keys()):
+        expected = computed.get(key)
+        actual = stored.get(key)
+        if expected != actual:
+            mismatches.append((*key, actual, expected))
+    return mismatches
+
+
+def balance_at(account, date):
+    """
+    Return the cumulative `(debit, credit)` of `account` at the end of `date`.
+
+    Reads the latest checkpoint on or before `date` and, unless it falls on
+    `date` itself, adds the transactions from the first of `date`'s month.
+    The checkpoint is then from an earlier month, and the account had no
+    activity between it and the start of `date`'s month.
+    """
+    checkpoint = (
+        BalanceCheckpoint.objects.filter(account=account, date__lte=date)
+        .order_by("-date")
+        .values_list("date", "debit", "credit")
+        .first()
+    )
+    if checkpoint is not None and checkpoint[0] == date:
+        return checkpoint[1], checkpoint[2]
+
+    debit, credit = checkpoint[1:] if checkpoint is not None else (0, 0)
+    partial = Transaction.objects.filter(
+        account=account, event__date__gte=date.replace(day=1), event__date__lte=date
+    ).aggregate(debit=sum_direction("debit"), credit=sum_direction("credit"))
+    return debit + partial["debit"], credit + partial["credit"]
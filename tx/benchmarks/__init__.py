@@ -0,0 +1,7 @@
+"""
+Ledger-scale benchmarks.
+
+`generator` fills a database with realistic, balanced bookkeeping data and
+`scenarios` times the API against it. Run them with the `benchmark`
+management command.
+"""
@@ -0,0 +1,191 @@
+"""
+Synthetic ledger generator.
+
+Produces balanced events over a BAS-like chart of accounts and a run of
+calendar financial years. Rows are written with `executemany` in large
+batches, bypassing model instantiation, so millions of transactions load in
+well under a minute. The balance tables are rebuilt afterwards. Output is
+deterministic for a given seed, which keeps benchmark runs comparable.
+"""
+
+import random
+from datetime import date, datetime, timedelta, timezone
+
+from django.db import connection, transaction
+
+from tx.balances import rebuild_balances, rebuild_checkpoints
+from tx.models import Account, Event, FinancialYear, Transaction
+
+BAS_ACCOUNTS = [
+    (1510, "Kundfordringar"),
+    (1910, "Kassa"),
+    (1930, "Företagskonto"),
+    (2010, "Eget kapital"),
+    (2440, "Leverantörsskulder"),
+    (2611, "Utgående moms 25 %"),
+    (2641, "Debiterad ingående moms"),
+    (2710, "Personalskatt"),
+    (2731, "Avräkning lagstadgade sociala avgifter"),
+    (3001, "Försäljning inom Sverige, 25 % moms"),
+    (4010, "Inköp material och varor"),
+    (5010, "Lokalhyra"),
+    (5410, "Förbrukningsinventarier"),
+    (6110, "Kontorsmateriel"),
+    (6212, "Mobiltelefon"),
+    (6540, "IT-tjänster"),
+    (7210, "Löner till tjänstemän"),
+    (7510, "Arbetsgivaravgifter"),
+    (8310, "Ränteintäkter från omsättningstillgångar"),
+    (8410, "Räntekostnader för skulder till kreditinstitut"),
+]
+
+BATCH_SIZE = 20000
+
+
+def _sale(rng, accounts):
+    net = rng.randint(100, 50000) * 100
+    vat = net // 4
+    return "Försäljning", [
+        (accounts[1510], "debit", net + vat),
+        (accounts[3001], "credit", net),
+        (accounts[2611], "credit", vat),
+    ]
+
+
+def _payment(rng, accounts):
+    amount = rng.randint(100, 60000) * 100
+    return "Inbetalning kund", [
+        (accounts[1930], "debit", amount),
+        (accounts[1510], "credit", amount),
+    ]
+
+
+def _purchase(rng, accounts):
+    net = rng.randint(50, 20000) * 100
+    vat = net // 4
+    expense = rng.choice([4010, 5010, 5410, 6110, 6212, 6540])
+    return "Leverantörsfaktura", [
+        (accounts[expense], "debit", net),
+        (accounts[2641], "debit", vat),
+        (accounts[2440], "credit", net + vat),
+    ]
+
+
+def _supplier_payment(rng, accounts):
+    amount = rng.randint(50, 25000) * 100
+    return "Betalning leverantör", [
+        (accounts[2440], "debit", amount),
+        (accounts[1930], "credit", amount),
+    ]
+
+
+def _payroll(rng, accounts):
+    gross = rng.randint(250, 600) * 10000
+    tax = gross * 30 // 100
+    fees = gross * 3142 // 10000
+    return "Löneutbetalning", [
+        (accounts[7210], "debit", gross),
+        (accounts[7510], "debit", fees),
+        (accounts[2710], "credit", tax),
+        (accounts[2731], "credit", fees),
+        (accounts[1930], "credit", gross - tax),
+    ]
+
+
+TEMPLATES = [
+    (_sale, 35),
+    (_payment, 30),
+    (_purchase, 20),
+    (_supplier_payment, 12),
+    (_payroll, 3),
+]
+
+
+def generate_ledger(events, years=3, first_year=2022, seed=1, extra_accounts=0):
+    """
+    Create `years` calendar financial years and `events` balanced events spread
+    evenly over them. Returns a summary of what was created.
+    """
+    rng = random.Random(seed)
+
+    with transaction.atomic():
+        financial_years = [
+            FinancialYear.objects.create(
+                start_date=date(year, 1, 1), end_date=date(year, 12, 31)
+            )
+            for year in range(first_year, first_year + years)
+        ]
+        Account.objects.bulk_create(
+            [Account(code=code, name=name) for code, name in BAS_ACCOUNTS]
+            + [
+                Account(code=9000 + index, name=f"Konto {9000 + index}")
+                for index in range(extra_accounts)
+            ]
+        )
+        accounts = dict(Account.objects.values_list("code", "id"))
+
+        event_sql, transaction_sql = _insert_statements()
+        created_at = connection.ops.adapt_datetimefield_value(
+            datetime(first_year + years, 1, 1, tzinfo=timezone.utc)
+        )
+        templates, weights = zip(*TEMPLATES)
+        next_event_id = (
+            Event.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        ) + 1
+        transactions = 0
+
+        with connection.cursor() as cursor:
+            for batch_start in range(0, events, BATCH_SIZE):
+                event_rows = []
+                transaction_rows = []
+                for index in range(batch_start, min(batch_start + BATCH_SIZE, events)):
+                    financial_year = financial_years[index * years // events]
+                    day_count = (
+                        financial_year.end_date - financial_year.start_date
+                    ).days
+                    event_date = financial_year.start_date + timedelta(
+                        days=rng.randint(0, day_count)
+                    )
+                    template = rng.choices(templates, weights)[0]
+                    description, lines = template(rng, accounts)
+                    event_id = next_event_id + index
+                    event_rows.append(
+                        (
+                            event_id,
+                            connection.ops.adapt_datefield_value(event_date),
+                            f"{description} {index}",
+                            financial_year.id,
+                            created_at,
+                        )
+                    )
+                    transaction_rows.extend(
+                        (amount, account_id, direction, event_id)
+                        for account_id, direction, amount in lines
+                    )
+                cursor.executemany(event_sql, event_rows)
+                cursor.executemany(transaction_sql, transaction_rows)
+                transactions += len(transaction_rows)
+
+        rebuild_balances()
+        rebuild_checkpoints()
+
+    return {
+        "events": events,
+        "transactions": transactions,
+        "accounts": len(accounts),
+        "financial_years": years,
+    }
+
+
+def _insert_statements():
+    quote = connection.ops.quote_name
+    event_sql = (
+        f"INSERT INTO {quote(Event._meta.db_table)} "
+        "(id, date, description, financial_year_id, created_at) "
+        "VALUES (%s, %s, %s, %s, %s)"
+    )
+    transaction_sql = (
+        f"INSERT INTO {quote(Transaction._meta.db_table)} "
+        "(amount, account_id, direction, event_id) VALUES (%s, %s, %s, %s)"
+    )
+    return event_sql, transaction_sql
@@ -0,0 +1,305 @@
+"""
+Timed API scenarios.
+
+Each scenario issues one request through the test client against a database
+filled by `generator.generate_ledger`. Latency is measured over plain runs;
+one extra run records the query count and, with `tracemalloc`, the peak
+Python memory allocated while handling and consuming the response.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from tx.models import Account, Attachment, Event, FinancialYear
+
+ATTACHMENT_SIZE = 64 * 1024
+DOWNLOAD_SIZE = 4 * 1024 * 1024
+
+
+class BenchmarkContext:
+    """Objects from the generated ledger that the scenarios request."""
+
+    def __init__(self):
+        self.client = APIClient()
+        years = list(FinancialYear.objects.order_by("start_date"))
+        self.financial_year = years[len(years) // 2]
+        self.mid_year = self.financial_year.start_date.replace(month=6, day=15)
+        self.accounts = dict(Account.objects.values_list("code", "id"))
+        self.event = (
+            Event.objects.filter(financial_year=self.financial_year)
+            .order_by("date", "id")
+            .first()
+        )
+        self.counter = 0
+        self._download = None
+
+    def next_number(self):
+        self.counter += 1
+        return self.counter
+
+    def download(self):
+        """A `DOWNLOAD_SIZE` attachment, uploaded on first use."""
+        if self._download is None:
+            self._download = Attachment.objects.create(
+                file=SimpleUploadedFile(
+                    "annual-report.pdf",
+                    b"%PDF" + os.urandom(DOWNLOAD_SIZE - 4),
+                    content_type="application/pdf",
+                ),
+                event=self.event,
+            )
+        return self._download
+
+    def sale(self):
+        number = self.next_number()
+        return {
+            "date": self.mid_year.isoformat(),
+            "description": f"Benchmark sale {number}",
+            "financial_year": self.financial_year.id,
+            "transactions": [
+                {
+                    "amount": "1250.00",
+                    "account": self.accounts[1510],
+                    "direction": "debit",
+                },
+                {
+                    "amount": "1000.00",
+                    "account": self.accounts[3001],
+                    "direction": "credit",
+                },
+                {
+                    "amount": "250.00",
+                    "account": self.accounts[2611],
+                    "direction": "credit",
+                },
+            ],
+        }
+
+
+def event_create(context):
+    return context.client.post(reverse("event-list"), context.sale(), format="json")
+
+
+def event_bulk_create(context):
+    data = [context.sale() for _ in range(100)]
+    return context.client.post(reverse("event-bulk"), data, format="json")
+
+
+def event_list(context):
+    return context.client.get(reverse("event-list"), {"page_size": 100})
+
+
+def event_detail(context):
+    return context.client.get(reverse("event-detail", kwargs={"pk": context.event.id}))
+
+
+def event_search(context):
+    return context.client.get(reverse("event-search"), {"q": context.event.description})
+
+
+def attachment_upload(context, unique=True):
+    number = context.next_number()
+    # Unique content is stored; a repeated file only gains a reference
+    header = b"%%PDF-%d" % number if unique else b"%PDF"
+    upload = SimpleUploadedFile(
+        f"receipt-{number}.pdf",
+        header + b"\0" * (ATTACHMENT_SIZE - len(header)),
+        content_type="application/pdf",
+    )
+    return context.client.post(
+        reverse("attachment-list"),
+        {"file": upload, "event": context.event.id},
+        format="multipart",
+    )
+
+
+def attachment_upload_duplicate(context):
+    return attachment_upload(context, unique=False)
+
+
+def attachment_download(context):
+    return context.client.get(
+        reverse("attachment-download", kwargs={"pk": context.download().id})
+    )
+
+
+def attachment_download_range(context):
+    return context.client.get(
+        reverse("attachment-download", kwargs={"pk": context.download().id}),
+        headers={"Range": f"bytes={DOWNLOAD_SIZE // 2}-{DOWNLOAD_SIZE // 2 + 65535}"},
+    )
+
+
+def trial_balance(context):
+    return context.client.get(
+        reverse("financialyear-trial-balance", kwargs={"pk": context.financial_year.id})
+    )
+
+
+def trial_balance_as_of(context):
+    return context.client.get(
+        reverse(
+            "financialyear-trial-balance", kwargs={"pk": context.financial_year.id}
+        ),
+        {"as_of": context.mid_year.isoformat()},
+    )
+
+
+def account_balance(context):
+    return context.client.get(
+        reverse("account-balance", kwargs={"pk": context.accounts[1930]}),
+        {"date": context.mid_year.isoformat()},
+    )
+
+
+def sie_export(context):
+    return context.client.get(
+        reverse("financialyear-sie", kwargs={"pk": context.financial_year.id})
+    )
+
+
+def ledger_export(context):
+    return context.client.get(
+        reverse("event-export"), {"financial_year": context.financial_year.id}
+    )
+
+
+# (name, scenario, iterations)
+SCENARIOS = [
+    ("event_create", event_create, 50),
+    ("event_bulk_create_100", event_bulk_create, 10),
+    ("event_list", event_list, 50),
+    ("event_detail", event_detail, 100),
+    ("event_search", event_search, 100),
+    ("attachment_upload", attachment_upload, 30),
+    ("attachment_upload_duplicate", attachment_upload_duplicate, 30),
+    ("attachment_download", attachment_download, 30),
+    ("attachment_download_range", attachment_download_range, 50),
+    ("trial_balance", trial_balance, 50),
+    ("trial_balance_as_of", trial_balance_as_of, 5),
+    ("account_balance", account_balance, 50),
+    ("sie_export", sie_export, 3),
+    ("ledger_export", ledger_export, 3),
+]
+
+
+def _perform(scenario, context):
+    response = scenario(context)
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f"{scenario.__name__} failed with {response.status_code}: "
+            f"{response.content[:500]!r}"
+        )
+    return size
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_scenario(scenario, context, iterations):
+    _perform(scenario, context)
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        size = _perform(scenario, context)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            _perform(scenario, context)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p90_ms": round(percentile(latencies, 0.90), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "queries": len(queries),
+        "peak_memory_kib": round(peak / 1024, 1),
+        "response_bytes": size,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(dataset, names=None, iterations=None, log=None):
+    """
+    Run the selected scenarios (all by default) and return the results as a
+    JSON-serializable dict. `iterations` overrides every scenario's default.
+    """
+    context = BenchmarkContext()
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "dataset": dataset,
+        "scenarios": {},
+    }
+    for name, scenario, default_iterations in SCENARIOS:
+        if names and name not in names:
+            continue
+        result = run_scenario(scenario, context, iterations or default_iterations)
+        results["scenarios"][name] = result
+        if log:
+            log(
+                f"{name:24} p50 {result['p50_ms']:>10.3f} ms  "
+                f"p99 {result['p99_ms']:>10.3f} ms  "
+                f"{result['queries']:>4} queries  "
+                f"{result['peak_memory_kib']:>10.1f} KiB peak"
+            )
+    return results
+
+
+def compare(previous, current, threshold):
+    """
+    Yield `(name, previous p50, current p50, change, regressed)` for scenarios
+    present in both runs. `change` is the relative change in median latency and
+    `regressed` tells whether it exceeds `threshold`.
+    """
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if before is None or not before["p50_ms"]:
+            continue
+        change = result["p50_ms"] / before["p50_ms"] - 1
+        yield name, before["p50_ms"], result["p50_ms"], change, change > threshold
+
+
+def write_results(results, path):
+    with open(path, "w") as output:
+        json.dump(results, output, indent=2)
+        output.write("\n")
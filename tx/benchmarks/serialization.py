@@ -0,0 +1,92 @@
+"""
+Event list serialization: `EventSerializer` versus the row-based fast path.
+
+Both paths serialize the same page of events. "serialize" times building the
+representation from data already loaded (prefetched model instances for the
+serializer, rows for the fast path); "load and serialize" also includes the
+queries for the page and its transactions and attachments.
+"""
+
+import statistics
+import time
+
+from django.db.models import prefetch_related_objects
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from tx.models import Event
+from tx.representations import (
+    EVENT_FIELDS,
+    attachment_event_ids,
+    build_representations,
+    event_url_template,
+    serialize_events,
+    transaction_rows,
+)
+from tx.serializers import EventSerializer
+
+
+def _median_ms(function, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def run_serialization(page_size=100, iterations=50, log=None):
+    request = Request(APIRequestFactory().get("/events/"))
+    page = Event.objects.order_by("date", "id")[:page_size]
+    serializer_context = {"request": request}
+
+    def load_events():
+        events = list(page)
+        prefetch_related_objects(events, "transactions", "attachments")
+        return events
+
+    def load_rows():
+        rows = list(page.values(*EVENT_FIELDS))
+        ids = [row["id"] for row in rows]
+        return rows, list(transaction_rows(ids)), list(attachment_event_ids(ids))
+
+    events = load_events()
+    rows, transactions, attachments = load_rows()
+    paths = {
+        "serializer": {
+            "serialize": lambda: EventSerializer(
+                events, many=True, context=serializer_context
+            ).data,
+            "load_and_serialize": lambda: EventSerializer(
+                load_events(), many=True, context=serializer_context
+            ).data,
+        },
+        "fast_path": {
+            "serialize": lambda: build_representations(
+                rows, transactions, attachments, event_url_template(request)
+            ),
+            "load_and_serialize": lambda: serialize_events(
+                list(page.values(*EVENT_FIELDS)), request
+            ),
+        },
+    }
+
+    results = {"events": len(events)}
+    for path, timings in paths.items():
+        results[path] = {
+            name: _median_ms(function, iterations) for name, function in timings.items()
+        }
+    results["speedup"] = {
+        name: results["serializer"][name] / results["fast_path"][name]
+        for name in ("serialize", "load_and_serialize")
+    }
+
+    if log is not None:
+        log(f"Serialization of {len(events)} events (median of {iterations}):")
+        for name in ("serialize", "load_and_serialize"):
+            log(
+                f"  {name:20} serializer {results['serializer'][name]:8.3f} ms  "
+                f"fast path {results['fast_path'][name]:8.3f} ms  "
+                f"{results['speedup'][name]:5.1f}x"
+            )
+    return results
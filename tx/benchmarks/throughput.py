@@ -0,0 +1,260 @@
+"""
+Requests per second with many concurrent slow clients, WSGI versus ASGI.
+
+Requests go through the real handlers (`WSGIHandler` and `ASGIHandler`)
+without a network server. A slow client is modelled by a delay while the
+response is sent: a WSGI worker thread is blocked for the duration, while an
+ASGI server only suspends the coroutine sending it. The WSGI path serves the
+DRF viewsets from a fixed pool of worker threads, like a threaded WSGI
+server; the ASGI path serves both the viewsets and the async views under
+`/async/` from one event loop.
+
+The write test posts events from many clients at once to a WSGI server with
+one thread per client, with and without `EVENT_GROUP_COMMIT`, and counts
+events created per second and requests that failed.
+"""
+
+import asyncio
+import io
+import json
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.core.asgi import get_asgi_application
+from django.core.signals import got_request_exception
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from tx.serializers import event_group_commit
+
+# (name, URL name, async URL name, kwargs from the benchmark context)
+ENDPOINTS = [
+    ("event_list", "event-list", "async-event-list", lambda context: {}),
+    (
+        "event_detail",
+        "event-detail",
+        "async-event-detail",
+        lambda context: {"pk": context.event.id},
+    ),
+    (
+        "financial_year_detail",
+        "financialyear-detail",
+        "async-financialyear-detail",
+        lambda context: {"pk": context.financial_year.id},
+    ),
+]
+
+
+def _check(status):
+    if status >= 400:
+        raise RuntimeError(f"Request failed with {status}")
+
+
+def wsgi_throughput(path, query, requests, concurrency, threads, client_delay):
+    """
+    Serve `requests` requests to `concurrency` clients from `threads` worker
+    threads and return the requests per second.
+    """
+    application = get_wsgi_application()
+
+    def handle(_):
+        environ = {}
+        setup_testing_defaults(environ)
+        environ.update(PATH_INFO=path, QUERY_STRING=query, HTTP_HOST="testserver")
+        statuses = []
+        body = application(
+            environ, lambda status, headers, exc_info=None: statuses.append(status)
+        )
+        b"".join(body)
+        time.sleep(client_delay)
+        body.close()
+        _check(int(statuses[0].split()[0]))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(min(threads, concurrency)) as pool:
+        list(pool.map(handle, range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+def asgi_throughput(path, query, requests, concurrency, client_delay):
+    """
+    Serve `requests` requests to `concurrency` clients from one event loop and
+    return the requests per second.
+    """
+    application = get_asgi_application()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"testserver")],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 0),
+    }
+
+    async def request():
+        statuses = []
+        received = []
+
+        async def receive():
+            if not received:
+                received.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # The client stays connected; Django stops listening once the
+            # response is sent
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif not message.get("more_body"):
+                await asyncio.sleep(client_delay)
+
+        await application(dict(scope), receive, send)
+        _check(statuses[0])
+
+    async def client(count):
+        for _ in range(count):
+            await request()
+
+    async def run():
+        counts = [requests // concurrency] * concurrency
+        for index in range(requests % concurrency):
+            counts[index] += 1
+        await asyncio.gather(*(client(count) for count in counts if count))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return requests / (time.perf_counter() - start)
+
+
+def run_throughput(
+    context, requests=500, concurrency=50, threads=8, client_delay=0.1, log=None
+):
+    """
+    Return requests per second for each endpoint served by WSGI, by ASGI with
+    the sync viewsets and by ASGI with the async views.
+    """
+    query = urlencode({"page_size": 20})
+    results = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "wsgi_threads": threads,
+        "client_delay_ms": client_delay * 1000,
+        "endpoints": {},
+    }
+    for name, url_name, async_url_name, get_kwargs in ENDPOINTS:
+        kwargs = get_kwargs(context)
+        path = reverse(url_name, kwargs=kwargs)
+        async_path = reverse(async_url_name, kwargs=kwargs)
+        endpoint_query = query if "list" in name else ""
+        result = {
+            "wsgi": wsgi_throughput(
+                path, endpoint_query, requests, concurrency, threads, client_delay
+            ),
+            "asgi": asgi_throughput(
+                path, endpoint_query, requests, concurrency, client_delay
+            ),
+            "asgi_async_views": asgi_throughput(
+                async_path, endpoint_query, requests, concurrency, client_delay
+            ),
+        }
+        result = {key: round(value, 1) for key, value in result.items()}
+        results["endpoints"][name] = result
+        if log:
+            log(
+                f"{name:24} WSGI {result['wsgi']:>8.1f} req/s  "
+                f"ASGI {result['asgi']:>8.1f} req/s  "
+                f"ASGI async views {result['asgi_async_views']:>8.1f} req/s"
+            )
+    return results
+
+
+def post_events(bodies, concurrency):
+    """
+    POST each event payload in `bodies` to the event list from `concurrency`
+    clients, each served by its own WSGI thread. Returns the events created
+    per second and the exceptions of failed requests by message.
+    """
+    application = get_wsgi_application()
+    path = reverse("event-list")
+    errors = Counter()
+
+    def record(sender, request=None, **kwargs):
+        # Sent from the handler's except block
+        errors[str(sys.exc_info()[1])] += 1
+
+    def handle(body):
+        environ = {}
+        setup_testing_defaults(environ)
+        environ.update(
+            {
+                "REQUEST_METHOD": "POST",
+                "PATH_INFO": path,
+                "CONTENT_TYPE": "application/json",
+                "CONTENT_LENGTH": str(len(body)),
+                "HTTP_HOST": "testserver",
+                "wsgi.input": io.BytesIO(body),
+            }
+        )
+        statuses = []
+        response = application(
+            environ, lambda status, headers, exc_info=None: statuses.append(status)
+        )
+        b"".join(response)
+        response.close()
+        return int(statuses[0].split()[0])
+
+    got_request_exception.connect(record)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            statuses = list(pool.map(handle, bodies))
+        elapsed = time.perf_counter() - start
+    finally:
+        got_request_exception.disconnect(record)
+    created = statuses.count(201)
+    return {
+        "events_per_second": round(created / elapsed, 1),
+        "created": created,
+        "failed": len(statuses) - created,
+        "errors": dict(errors),
+    }
+
+
+def run_write_throughput(context, requests=2000, concurrency=32, log=None):
+    """
+    Return events created per second by `concurrency` clients posting events
+    at once, with each request writing in its own transaction and with group
+    commit.
+    """
+    results = {"requests": requests, "concurrency": concurrency}
+    for name, group_commit in [("direct", False), ("group_commit", True)]:
+        bodies = [json.dumps(context.sale()).encode() for _ in range(requests)]
+        batches = event_group_commit.batches
+        with override_settings(EVENT_GROUP_COMMIT=group_commit):
+            result = post_events(bodies, concurrency)
+        if group_commit:
+            batches = event_group_commit.batches - batches
+            result["mean_batch"] = round(result["created"] / max(batches, 1), 1)
+        results[name] = result
+        if log:
+            log(
+                f"{name:24} {result['events_per_second']:>8.1f} events/s  "
+                f"{result['failed']} failed"
+                + "".join(
+                    f"\n{'':24} {count} x {message}"
+                    for message, count in result["errors"].items()
+                )
+            )
+    return results
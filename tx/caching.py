@@ -0,0 +1,137 @@
+"""
+Conditional GET for events and attachments.
+
+Events, their transactions and attachments are never updated in place, so a
+cheap query over ids tells whether a client's copy is still current. Views
+compute a strong ETag from that query before loading anything else and answer
+a matching `If-None-Match` with 304 Not Modified without running the
+serializer.
+
+For lists, the page query runs first (it is a keyset index scan) and the ETag
+is derived from the ids on the page; related objects are only prefetched and
+serialized when the page has changed.
+"""
+
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import prefetch_related_objects
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+# Bump when the serialized form of events or attachments changes, so that
+# clients drop copies in the old format.
+REPRESENTATION_VERSION = 1
+
+# One year, the longest max-age HTTP caches honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def make_etag(request, version):
+    """
+    Return a strong ETag for the resource state `version`, which is combined
+    with everything else that shapes the response body: the absolute URLs in
+    it, the query string and the renderer.
+    """
+    key = (
+        REPRESENTATION_VERSION,
+        request.build_absolute_uri(),
+        request.accepted_renderer.format,
+        version,
+    )
+    return quote_etag(hashlib.sha256(repr(key).encode()).hexdigest()[:32])
+
+
+def add_cache_headers(response, etag, cache_control):
+    """
+    Set the `ETag`, `Cache-Control` and `Vary` headers of a 200 or 304
+    response; error responses are left alone.
+    """
+    if response.status_code in (200, 304):
+        response.headers["ETag"] = etag
+        patch_cache_control(response, **cache_control)
+        patch_vary_headers(response, ["Accept"])
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETags and `Cache-Control` to `list` and `retrieve`.
+
+    Views implement `get_object_version()`, returning a value that changes
+    whenever the representation of the requested object does (or None when
+    it does not exist). `get_page_version(page)` does the same for a page of
+    a list and defaults to the primary keys on it; related objects named in
+    `page_prefetch` are loaded, and the page serialized by `serialize_page()`,
+    once the page is known to have changed.
+    """
+
+    object_cache_control = {"private": True, "no_cache": True}
+    list_cache_control = {"private": True, "no_cache": True}
+    page_prefetch = ()
+
+    def get_object_version(self):
+        raise NotImplementedError
+
+    def get_page_version(self, page):
+        return [obj.pk for obj in page]
+
+    def lookup_version(self, queryset, *fields):
+        """
+        Return `fields` of the object named in the URL as a tuple, or None if
+        there is no such object.
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            return queryset.filter(**lookup).values_list(*fields).first()
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def retrieve(self, request, *args, **kwargs):
+        version = self.get_object_version()
+        if version is None:
+            raise NotFound()
+        return self.conditional_response(
+            request,
+            make_etag(request, version),
+            self.object_cache_control,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset().prefetch_related(None))
+        page = self.paginate_queryset(queryset)
+        paginated = page is not None
+        if not paginated:
+            page = list(queryset)
+
+        version = self.get_page_version(page)
+        if paginated:
+            version = (version, self.paginator.has_next, self.paginator.has_previous)
+
+        def render():
+            data = self.serialize_page(page)
+            if paginated:
+                return self.get_paginated_response(data)
+            return Response(data)
+
+        return self.conditional_response(
+            request, make_etag(request, version), self.list_cache_control, render
+        )
+
+    def serialize_page(self, page):
+        prefetch_related_objects(page, *self.page_prefetch)
+        return self.get_serializer(page, many=True).data
+
+    def conditional_response(self, request, etag, cache_control, render):
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = render()
+        return add_cache_headers(response, etag, cache_control)
@@ -0,0 +1,161 @@
+"""
+Attachment downloads.
+
+Files are sent with `FileResponse`, which hands the open file to the WSGI
+server's `wsgi.file_wrapper`, so servers that implement it (gunicorn, uWSGI)
+send the whole file with `sendfile()` instead of copying it through Python.
+
+A single `Range` is answered with 206 Partial Content, read in blocks from
+the requested offset; other range requests (several ranges, other units,
+malformed values) get the whole file, as RFC 9110 allows. `If-Range` is
+compared with the strong ETag, so a resumed download only continues when the
+file is the one it started from. Attachment files never change, so the ETag
+is the SHA-256 of the content (or of the file name for attachments stored
+before content addressing).
+
+With `ATTACHMENT_SENDFILE` set, Django only checks the request and names the
+file in an `X-Accel-Redirect` (nginx) or `X-Sendfile` (Apache, lighttpd)
+header, and the front proxy sends it, including ranges, without holding a
+Python worker for the transfer.
+"""
+
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, quote_etag
+from rest_framework.exceptions import NotFound
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class DownloadResponse(FileResponse):
+    block_size = 64 * 1024
+
+
+class FileRange:
+    """Read-only view of `length` bytes of `file` from its current position."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive `(first, last)` byte positions of a single range
+    request for a file of `size` bytes, or None to send the whole file.
+    Raises `RangeNotSatisfiable` when the range lies beyond the end.
+    """
+    match = RANGE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable()
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def attachment_etag(attachment):
+    if attachment.blob is not None:
+        return quote_etag(attachment.blob.sha256)
+    return quote_etag(hashlib.sha256(attachment.file.name.encode()).hexdigest()[:32])
+
+
+def sendfile_header(name):
+    """Return the proxy header naming the stored file `name`, or None."""
+    if settings.ATTACHMENT_SENDFILE == "x-accel-redirect":
+        prefix = settings.ATTACHMENT_ACCEL_REDIRECT_PREFIX.rstrip("/")
+        return "X-Accel-Redirect", f"{prefix}/{name}"
+    if settings.ATTACHMENT_SENDFILE == "x-sendfile":
+        return "X-Sendfile", os.path.join(settings.MEDIA_ROOT, name)
+    return None
+
+
+def download_response(request, attachment, cache_control):
+    """Return the response to a download request for `attachment`."""
+    file = attachment.file
+    etag = attachment_etag(attachment)
+    filename = f"attachment-{attachment.id}{os.path.splitext(file.name)[1]}"
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        offload = sendfile_header(file.name)
+        if offload is not None:
+            response = HttpResponse()
+            response[offload[0]] = offload[1]
+            # Let the proxy pick the type from the file name
+            del response["Content-Type"]
+            response["Content-Disposition"] = content_disposition_header(True, filename)
+        else:
+            response = stream_file(request, file, etag, filename)
+
+    if response.status_code in (200, 206, 304):
+        response["ETag"] = etag
+        patch_cache_control(response, **cache_control)
+    return response
+
+
+def stream_file(request, file, etag, filename):
+    try:
+        size = file.size
+        handle = file.storage.open(file.name, "rb")
+    except FileNotFoundError:
+        raise NotFound("The attachment file is missing.")
+
+    byte_range = None
+    header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(header, size)
+        except RangeNotSatisfiable:
+            handle.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = DownloadResponse(handle, as_attachment=True, filename=filename)
+    else:
+        first, last = byte_range
+        handle.seek(first)
+        response = DownloadResponse(
+            FileRange(handle, last - first + 1),
+            status=206,
+            as_attachment=True,
+            filename=filename,
+        )
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response["Content-Length"] = last - first + 1
+    response["Accept-Ranges"] = "bytes"
+    return response
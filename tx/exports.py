@@ -0,0 +1,147 @@
+import csv
+import json
+import zlib
+
+from .amounts import format_ore
+from .models import Transaction
+
+LEDGER_FIELDS = [
+    "event_id",
+    "date",
+    "description",
+    "financial_year",
+    "transaction_id",
+    "account_code",
+    "account_name",
+    "direction",
+    "amount",
+]
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+ROW_CHUNK_SIZE = 2000
+WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def ledger_rows(financial_year=None):
+    """
+    Yield one tuple per transaction, in `LEDGER_FIELDS` order, joined with its
+    event and account. Rows are fetched in chunks from a server-side cursor, so
+    memory use does not grow with the size of the ledger.
+    """
+    queryset = Transaction.objects.order_by("event__date", "event_id", "id")
+    if financial_year is not None:
+        queryset = queryset.filter(event__financial_year=financial_year)
+    rows = queryset.values_list(
+        "event_id",
+        "event__date",
+        "event__description",
+        "event__financial_year_id",
+        "id",
+        "account__code",
+        "account__name",
+        "direction",
+        "amount",
+    )
+    for row in rows.iterator(chunk_size=ROW_CHUNK_SIZE):
+        yield _export_values(row)
+
+
+def _export_values(row):
+    (
+        event_id,
+        date,
+        description,
+        financial_year,
+        transaction_id,
+        account_code,
+        account_name,
+        direction,
+        amount,
+    ) = row
+    return (
+        event_id,
+        date.isoformat(),
+        description,
+        financial_year,
+        transaction_id,
+        account_code,
+        account_name,
+        direction,
+        format_ore(amount),
+    )
+
+
+class _Echo:
+    """File-like object that hands back what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(LEDGER_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(LEDGER_FIELDS, row)), ensure_ascii=False) + "\n"
+
+
+def encode_chunks(lines, encoding="utf-8", buffer_size=WRITE_BUFFER_SIZE):
+    """
+    Join text lines into encoded chunks of roughly `buffer_size` characters, so
+    that the response is written in a few large blocks rather than one per row.
+    Characters that `encoding` cannot represent are replaced.
+    """
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield "".join(buffer).encode(encoding, "replace")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode(encoding, "replace")
+
+
+def gzip_chunks(chunks):
+    """Compress a stream of byte chunks into a single gzip member on the fly."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def ledger_lines(export_format="csv", financial_year=None):
+    """
+    Return an iterator of text lines with the general ledger in
+    `export_format` (one of `EXPORT_FORMATS`).
+    """
+    rows = ledger_rows(financial_year)
+    if export_format == "csv":
+        return csv_lines(rows)
+    if export_format == "ndjson":
+        return ndjson_lines(rows)
+    raise ValueError(f"Unsupported export format: {export_format}")
+
+
+def export_ledger(export_format="csv", financial_year=None, compress=False):
+    """
+    Return an iterator of byte chunks with the general ledger in
+    `export_format` (one of `EXPORT_FORMATS`), optionally gzip-compressed.
+    """
+    chunks = encode_chunks(ledger_lines(export_format, financial_year))
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return chunks
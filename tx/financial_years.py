@@ -0,0 +1,158 @@
+"""
+In-process index of financial years.
+
+Financial years are few and rarely change, but every event write needs the
+one covering its date. The index keeps them sorted by start date so the year
+for a date is a binary search, and it is shared by every request in the
+process, so it only ever holds committed years: a `FinancialYear` saved or
+deleted in this process drops it once the transaction commits. Until then
+the thread that made the change uses an index of its own, which sees its
+uncommitted changes and is thrown away if the transaction rolls back.
+Changes made by other processes are not signalled here, so the index
+also expires `RELOAD_AFTER` seconds after loading and the next lookup reloads
+it, hit or miss: a year created, changed or deleted elsewhere can be served
+from the old index for up to that long. A write in that window that refers to
+a deleted year fails on its foreign key.
+
+Financial years are expected not to overlap, which `FinancialYearSerializer`
+enforces.
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import FinancialYear
+
+RELOAD_AFTER = 1.0
+
+_index = None
+
+
+class _PendingChanges(threading.local):
+    """Financial year changes of this thread's open transaction."""
+
+    using = None
+    # The on_commit hook that drops the shared index
+    committed = None
+    index = None
+    # The savepoints open when `index` was loaded
+    savepoints = ()
+
+
+_pending = _PendingChanges()
+
+
+class FinancialYearIndex:
+    def __init__(self, financial_years):
+        self.financial_years = sorted(
+            financial_years, key=lambda year: (year.start_date, year.pk)
+        )
+        self.start_dates = [year.start_date for year in self.financial_years]
+        self.end_dates = [year.end_date for year in self.financial_years]
+        self.by_pk = {year.pk: year for year in self.financial_years}
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, using=None):
+        return cls(FinancialYear.objects.using(using).all())
+
+    def find(self, date):
+        """Return the financial year covering `date`, or None."""
+        position = bisect_right(self.start_dates, date) - 1
+        if position >= 0 and date <= self.end_dates[position]:
+            return self.financial_years[position]
+        return None
+
+    def overlapping(self, start_date, end_date):
+        """Return the financial years that share a day with the given range."""
+        first = bisect_left(self.end_dates, start_date)
+        last = bisect_right(self.start_dates, end_date)
+        return self.financial_years[first:last]
+
+    def is_stale(self):
+        return time.monotonic() - self.loaded_at >= RELOAD_AFTER
+
+
+def has_pending_changes():
+    """Whether this thread's open transaction has changed financial years."""
+    if _pending.committed is None:
+        return False
+    # Django drops the on_commit hooks of transactions and savepoints that
+    # roll back, so the changes are pending while the hook is still queued
+    run_on_commit = connections[_pending.using].run_on_commit
+    if any(func is _pending.committed for _, func, _ in run_on_commit):
+        return True
+    _pending.committed = _pending.index = None
+    return False
+
+
+def financial_year_index(refresh=False):
+    global _index
+    if has_pending_changes():
+        savepoints = tuple(connections[_pending.using].savepoint_ids)
+        index = _pending.index
+        if (
+            index is None
+            or refresh
+            or index.is_stale()
+            # A savepoint it was loaded in has rolled back
+            or savepoints[: len(_pending.savepoints)] != _pending.savepoints
+        ):
+            index = _pending.index = FinancialYearIndex.load(_pending.using)
+            _pending.savepoints = savepoints
+        return index
+    if _index is None or refresh or _index.is_stale():
+        _index = FinancialYearIndex.load()
+    return _index
+
+
+def invalidate_financial_year_index():
+    global _index
+    _index = None
+
+
+def _committed():
+    _pending.committed = _pending.index = None
+    invalidate_financial_year_index()
+
+
+@receiver(post_save, sender=FinancialYear)
+@receiver(post_delete, sender=FinancialYear)
+def financial_years_changed(using, **kwargs):
+    if not connections[using].in_atomic_block:
+        # Already committed
+        invalidate_financial_year_index()
+        return
+    _pending.index = None
+    if not has_pending_changes():
+        _pending.using = using
+        _pending.committed = _committed
+        transaction.on_commit(_committed, using=using)
+
+
+def resolve_financial_year(date):
+    """Return the financial year covering `date`, or None."""
+    return financial_year_index().find(date)
+
+
+def get_financial_year(pk):
+    """Return the financial year with primary key `pk`, or None."""
+    return financial_year_index().by_pk.get(pk)
+
+
+class FinancialYearsByPk:
+    """
+    Mapping of primary key to financial year backed by the shared index, for
+    use as preloaded objects of `PreloadedPrimaryKeyRelatedField`.
+    """
+
+    def __getitem__(self, pk):
+        financial_year = get_financial_year(pk)
+        if financial_year is None:
+            raise KeyError(pk)
+        return financial_year
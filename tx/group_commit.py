@@ -0,0 +1,109 @@
+"""
+Group commit for concurrent writes from one process.
+
+SQLite allows one writer at a time. When request threads each open their
+own write transaction, they queue on the database lock, and a deferred
+transaction that has to upgrade its lock while another holds it fails
+straight away with "database is locked". `GroupCommit` turns concurrent
+writes from the threads of one process into a queue: the first thread to
+arrive becomes the leader and writes everything queued so far in one
+database transaction, while writes arriving in the meantime queue up for the
+next batch. Every caller blocks until its own item is committed and gets its
+own result or exception back, as if it had written alone.
+
+If a batch fails, its items are written again one transaction each, so a bad
+item only fails its own caller. Callers already inside `transaction.atomic()`
+write directly: their work must commit or roll back with the rest of their
+transaction, not with someone else's batch.
+"""
+
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class _Slot:
+    def __init__(self, item):
+        self.item = item
+        self.done = False
+        self.result = None
+        self.exception = None
+
+    def set_result(self, result):
+        self.result = result
+        self.done = True
+
+    def set_exception(self, exception):
+        self.exception = exception
+        self.done = True
+
+    def get(self):
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
+
+class GroupCommit:
+    """
+    Coalesces calls to `submit(item)` into calls to `write_batch(items)`,
+    which must return one result per item in order and write them all in one
+    database transaction, and `write_one(item)`, which writes a single item
+    in its own transaction. `max_batch` is a number of items or a callable
+    returning one, called for every batch so that it can follow settings.
+    """
+
+    def __init__(self, write_batch, write_one, max_batch=100, using=DEFAULT_DB_ALIAS):
+        self.write_batch = write_batch
+        self.write_one = write_one
+        self.max_batch = max_batch
+        self.using = using
+        self.condition = threading.Condition()
+        self.pending = []
+        self.leading = False
+        self.batches = 0
+
+    def submit(self, item):
+        if connections[self.using].in_atomic_block:
+            return self.write_one(item)
+
+        slot = _Slot(item)
+        with self.condition:
+            self.pending.append(slot)
+        while True:
+            with self.condition:
+                while self.leading and not slot.done:
+                    self.condition.wait()
+                if slot.done:
+                    return slot.get()
+                self.leading = True
+            try:
+                self.lead()
+            finally:
+                with self.condition:
+                    self.leading = False
+                    self.condition.notify_all()
+
+    def batch_size(self):
+        if callable(self.max_batch):
+            return self.max_batch()
+        return self.max_batch
+
+    def lead(self):
+        batch_size = self.batch_size()
+        with self.condition:
+            batch = self.pending[:batch_size]
+            del self.pending[: len(batch)]
+        if not batch:
+            return
+        self.batches += 1
+        try:
+            results = self.write_batch([slot.item for slot in batch])
+        except Exception:
+            for slot in batch:
+                try:
+                    slot.set_result(self.write_one(slot.item))
+                except Exception as exc:
+                    slot.set_exception(exc)
+        else:
+            for slot, result in zip(batch, results):
+                slot.set_result(result)
@@ -0,0 +1,199 @@
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from tx.benchmarks.generator import generate_ledger
+from tx.benchmarks.scenarios import (
+    SCENARIOS,
+    BenchmarkContext,
+    compare,
+    run_benchmarks,
+    write_results,
+)
+from tx.benchmarks.serialization import run_serialization
+from tx.benchmarks.throughput import run_throughput, run_write_throughput
+from tx.models import Account, Event, FinancialYear, Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic ledger in a separate benchmark database, time the "
+        "API scenarios against it and write the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--events",
+            type=int,
+            default=200000,
+            help="Number of events to generate (default: 200000)",
+        )
+        parser.add_argument(
+            "--years",
+            type=int,
+            default=3,
+            help="Number of financial years (default: 3)",
+        )
+        parser.add_argument("--seed", type=int, default=1, help="Random seed")
+        parser.add_argument(
+            "--database-name",
+            default="benchmark.sqlite3",
+            help="Name of the benchmark database (default: benchmark.sqlite3)",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the benchmark database and reuse its data on the next run",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=[name for name, _, _ in SCENARIOS],
+            help="Only run this scenario (repeatable)",
+        )
+        parser.add_argument(
+            "--iterations", type=int, help="Override the iterations of every scenario"
+        )
+        parser.add_argument(
+            "--throughput",
+            action="store_true",
+            help="Also measure requests per second of WSGI and ASGI with concurrent slow clients",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="Concurrent clients for --throughput (default: 50)",
+        )
+        parser.add_argument(
+            "--client-delay",
+            type=float,
+            default=100.0,
+            help="Milliseconds each client takes to receive a response for --throughput (default: 100)",
+        )
+        parser.add_argument(
+            "--write-throughput",
+            action="store_true",
+            help="Also measure events created per second by concurrent clients, with and without group commit",
+        )
+        parser.add_argument(
+            "--writers",
+            type=int,
+            default=32,
+            help="Concurrent clients for --write-throughput (default: 32)",
+        )
+        parser.add_argument(
+            "--serialization",
+            action="store_true",
+            help="Also compare event list serialization by EventSerializer and by the fast path",
+        )
+        parser.add_argument(
+            "--output",
+            default="benchmark-results.json",
+            help="File to write results to (default: benchmark-results.json)",
+        )
+        parser.add_argument(
+            "--compare", help="Results file of an earlier run to compare against"
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=20.0,
+            help="Median latency increase, in percent, reported as a regression (default: 20)",
+        )
+
+    def handle(self, *args, **options):
+        previous = None
+        if options["compare"]:
+            with open(options["compare"]) as results_file:
+                previous = json.load(results_file)
+
+        setup_test_environment(debug=False)
+        media_root = tempfile.mkdtemp()
+        original_media_root = settings.MEDIA_ROOT
+        settings.MEDIA_ROOT = media_root
+        connection.settings_dict["TEST"]["NAME"] = options["database_name"]
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+        )
+        try:
+            if Event.objects.exists():
+                dataset = self.describe_dataset()
+                self.stdout.write(f"Reusing dataset: {dataset}")
+            else:
+                dataset = generate_ledger(
+                    options["events"], years=options["years"], seed=options["seed"]
+                )
+                self.stdout.write(f"Generated dataset: {dataset}")
+
+            results = run_benchmarks(
+                dataset,
+                names=options["scenario"],
+                iterations=options["iterations"],
+                log=self.stdout.write,
+            )
+            if options["throughput"]:
+                results["throughput"] = run_throughput(
+                    BenchmarkContext(),
+                    concurrency=options["concurrency"],
+                    client_delay=options["client_delay"] / 1000,
+                    log=self.stdout.write,
+                )
+            if options["write_throughput"]:
+                results["write_throughput"] = run_write_throughput(
+                    BenchmarkContext(),
+                    concurrency=options["writers"],
+                    log=self.stdout.write,
+                )
+            if options["serialization"]:
+                results["serialization"] = run_serialization(log=self.stdout.write)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+            settings.MEDIA_ROOT = original_media_root
+            shutil.rmtree(media_root, ignore_errors=True)
+            teardown_test_environment()
+
+        write_results(results, options["output"])
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if previous is not None:
+            self.report_comparison(previous, results, options["threshold"])
+
+    def describe_dataset(self):
+        return {
+            "events": Event.objects.count(),
+            "transactions": Transaction.objects.count(),
+            "accounts": Account.objects.count(),
+            "financial_years": FinancialYear.objects.count(),
+        }
+
+    def report_comparison(self, previous, results, threshold):
+        if previous.get("dataset") != results["dataset"]:
+            self.stderr.write(
+                "Datasets differ, so the comparison is not like for like: "
+                f"{previous.get('dataset')} vs {results['dataset']}"
+            )
+
+        regressions = []
+        for name, before, after, change, regressed in compare(
+            previous, results, threshold / 100
+        ):
+            marker = "  REGRESSION" if regressed else ""
+            self.stdout.write(
+                f"{name:24} {before:>10.3f} ms -> {after:>10.3f} ms "
+                f"({change:+.1%}){marker}"
+            )
+            if regressed:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f"Median latency regressed by more than {threshold}% in: "
+                f"{', '.join(regressions)}"
+            )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from tx.models import Attachment
+from tx.storage import adopt_attachment_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Move attachments stored before content addressing into deduplicated "
+        "blobs, deleting their own copies of the files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of attachments read per query (default 500)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        moved = duplicates = missing = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Attachment.objects.filter(blob__isnull=True, id__gt=last_id).order_by(
+                    "id"
+                )[:batch_size]
+            )
+            if not batch:
+                break
+            for attachment in batch:
+                try:
+                    blob = adopt_attachment_file(attachment)
+                except FileNotFoundError:
+                    missing += 1
+                    self.stderr.write(
+                        f"Attachment {attachment.id}: {attachment.file.name} is missing"
+                    )
+                    continue
+                moved += 1
+                if blob.ref_count > 1:
+                    duplicates += 1
+            last_id = batch[-1].id
+
+        self.stdout.write(
+            f"Moved {moved} attachments into blobs, {duplicates} of them duplicates "
+            f"of files already stored; {missing} files were missing."
+        )
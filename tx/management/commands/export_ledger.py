@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tx.exports import EXPORT_FORMATS, export_ledger, ledger_lines
+from tx.models import FinancialYear
+
+
+class Command(BaseCommand):
+    help = "Stream the general ledger as CSV or NDJSON to a file or stdout."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            dest="export_format",
+            choices=list(EXPORT_FORMATS),
+            default="csv",
+            help="Export format (default: csv)",
+        )
+        parser.add_argument(
+            "--financial-year",
+            type=int,
+            help="Only export events in the financial year with this id",
+        )
+        parser.add_argument(
+            "--gzip", action="store_true", help="Compress the output with gzip"
+        )
+        parser.add_argument(
+            "--output", "-o", help="File to write to (default: standard output)"
+        )
+
+    def handle(self, *args, **options):
+        financial_year = None
+        if options["financial_year"] is not None:
+            try:
+                financial_year = FinancialYear.objects.get(pk=options["financial_year"])
+            except FinancialYear.DoesNotExist:
+                raise CommandError(
+                    f"Financial year {options['financial_year']} does not exist."
+                )
+
+        # Bytes for files and binary streams; a text stream, such as the
+        # StringIO passed to call_command(), gets the lines as text
+        output = options["output"]
+        if output is None and not hasattr(self.stdout, "buffer"):
+            if options["gzip"]:
+                raise CommandError(
+                    "Compressed output is binary; write it to a file with --output."
+                )
+            for line in ledger_lines(options["export_format"], financial_year):
+                self.stdout.write(line, ending="")
+            return
+
+        chunks = export_ledger(
+            options["export_format"], financial_year, compress=options["gzip"]
+        )
+        if output:
+            with open(output, "wb") as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            output = self.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tx.exports import encode_chunks
+from tx.models import FinancialYear
+from tx.sie import sie_lines
+from tx.sie_parser import SIE_ENCODING
+
+
+class Command(BaseCommand):
+    help = "Export a financial year as an SIE 4 file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("financial_year", type=int, help="Financial year id")
+        parser.add_argument(
+            "--company-name", default="", help="Company name written to #FNAMN"
+        )
+        parser.add_argument(
+            "--output", "-o", help="File to write to (default: standard output)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            financial_year = FinancialYear.objects.get(pk=options["financial_year"])
+        except FinancialYear.DoesNotExist:
+            raise CommandError(
+                f"Financial year {options['financial_year']} does not exist."
+            )
+
+        lines = sie_lines(financial_year, company_name=options["company_name"])
+        if options["output"] is None and not hasattr(self.stdout, "buffer"):
+            # A text stream, such as the StringIO passed to call_command()
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        chunks = encode_chunks(lines, encoding=SIE_ENCODING)
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            output = self.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
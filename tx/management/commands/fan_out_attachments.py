@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tx.models import Attachment, Blob
+from tx.storage import fan_out_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Move attachment files stored flat in attachments/ into the fan-out "
+        "layout (attachments/ab/cd/...), in batches and without downtime. Files "
+        "already in place are skipped, so an interrupted run can be restarted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of files moved per batch (default 100)",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.0,
+            help="Seconds to pause between batches, to limit the load on a live system",
+        )
+
+    def handle(self, *args, **options):
+        moved = skipped = missing = 0
+        # Blobs, then attachments from before content addressing
+        for queryset in [Blob.objects.all(), Attachment.objects.filter(blob=None)]:
+            last_id = 0
+            while True:
+                batch = list(
+                    queryset.filter(id__gt=last_id).order_by("id")[
+                        : options["batch_size"]
+                    ]
+                )
+                if not batch:
+                    break
+                batch_moved = 0
+                for instance in batch:
+                    try:
+                        if fan_out_file(instance):
+                            batch_moved += 1
+                        else:
+                            skipped += 1
+                    except FileNotFoundError:
+                        missing += 1
+                        self.stderr.write(
+                            f"{type(instance).__name__} {instance.id}: "
+                            f"{instance.file.name} is missing"
+                        )
+                last_id = batch[-1].id
+                moved += batch_moved
+                if batch_moved:
+                    self.stdout.write(
+                        f"Moved {moved} files (last {type(instance).__name__.lower()} "
+                        f"{last_id})"
+                    )
+                    if options["sleep"]:
+                        time.sleep(options["sleep"])
+
+        self.stdout.write(
+            f"Moved {moved} files; {skipped} were already in place and "
+            f"{missing} were missing."
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from tx.sie import IMPORT_BATCH_SIZE, SieImporter
+from tx.sie_parser import parse_file
+
+
+class Command(BaseCommand):
+    help = "Import accounts, financial years and vouchers from an SIE 4 file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the SIE file")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes used to parse the file (default: 1)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f"Vouchers inserted per transaction (default: {IMPORT_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        records = parse_file(options["path"], workers=options["workers"])
+        result = SieImporter(batch_size=options["batch_size"]).load(records)
+
+        for error in result["errors"]:
+            self.stderr.write(f"Line {error['line']}: {error['message']}")
+
+        self.stdout.write(
+            f"Imported {result['events']} events with {result['transactions']} "
+            f"transactions, {result['accounts']} accounts and "
+            f"{result['financial_years']} financial years; "
+            f"skipped {result['error_count']} malformed rows."
+        )
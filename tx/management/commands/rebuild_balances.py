@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tx.balances import (
+    rebuild_balances,
+    rebuild_checkpoints,
+    verify_balances,
+    verify_checkpoints,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild or verify the per-account balance table and month-end balance "
+        "checkpoints from transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report differences instead of rebuilding",
+        )
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            mismatches = 0
+            for account_id, financial_year_id, stored, computed in verify_balances():
+                mismatches += 1
+                self.stderr.write(
+                    f"Account {account_id} in financial year {financial_year_id}: "
+                    f"stored debit/credit {stored[0]}/{stored[1]}, "
+                    f"computed {computed[0]}/{computed[1]}"
+                )
+            for account_id, date, stored, computed in verify_checkpoints():
+                mismatches += 1
+                self.stderr.write(
+                    f"Account {account_id} checkpoint at {date}: "
+                    f"stored {stored}, computed {computed}"
+                )
+            if mismatches:
+                raise CommandError(f"{mismatches} balances are out of date.")
+            self.stdout.write("All balances are up to date.")
+            return
+
+        with transaction.atomic():
+            balances = rebuild_balances()
+            checkpoints = rebuild_checkpoints()
+        self.stdout.write(f"Rebuilt {balances} balances and {checkpoints} checkpoints.")
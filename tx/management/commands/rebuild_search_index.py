@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tx.search import rebuild_search_index, verify_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the full-text search index over event descriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only check the index instead of rebuilding it",
+        )
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            if not verify_search_index():
+                raise CommandError("The search index is out of date.")
+            self.stdout.write("The search index is up to date.")
+            return
+
+        rebuild_search_index()
+        self.stdout.write("Rebuilt the search index.")
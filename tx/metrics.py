@@ -0,0 +1,339 @@
+"""
+Per-request performance metrics.
+
+`RequestMetricsMiddleware` measures every request: wall time, the number of
+database queries and the time spent in them, the time spent in serializers
+and the size of the response. Each response carries the measurements of its
+own request in a `Server-Timing` header, which browser developer tools show
+next to the network timings, and the middleware adds them to histograms per
+view (`EventViewSet.list`, `AsyncEventListView.get`, ...) that `/metrics`
+serves in the Prometheus text format.
+
+Queries are counted by an execute wrapper installed on every database
+connection when it is opened, and serializer time by `TimedSerializerMixin`
+on the serializers the views use (and `serializer_timed` for representations
+built without one). Serializer time includes the queries a serializer runs
+itself, such as related object lookups during validation.
+Both only read a context variable when no request is being measured, and a
+measured request costs a few clock reads per query and per serialized
+object plus one short lock to update the histograms, so the middleware can
+stay on in production.
+
+The headers are sent before the body, so for streamed responses
+`Server-Timing` covers the time to the first byte. The histograms record
+streamed responses when the stream ends, including the queries run while
+streaming.
+
+The histograms live in the memory of each process; with several worker
+processes, each one serves its own at `/metrics`.
+"""
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = tuple(256 * 4**i for i in range(9))  # 256 B to 16 MiB
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = ("start", "queries", "db_time", "serializer_time", "serializing")
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """A Prometheus histogram with one series per view."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, view, value):
+        series = self.series.get(view)
+        if series is None:
+            # One count per bucket and one for +Inf, then the sum
+            series = self.series[view] = [0] * (len(self.buckets) + 1) + [0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for view, series in sorted(self.series.items()):
+            label = f'view="{escape_label(view)}"'
+            count = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                count += bucket_count
+                yield f'{self.name}_bucket{{{label},le="{bound}"}} {count}'
+            count += series[len(self.buckets)]
+            yield f'{self.name}_bucket{{{label},le="+Inf"}} {count}'
+            yield f"{self.name}_sum{{{label}}} {series[-1]}"
+            yield f"{self.name}_count{{{label}}} {count}"
+
+
+class Registry:
+    """The request metrics of this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.duration = Histogram(
+                "taxan_request_duration_seconds",
+                "Wall time of requests.",
+                DURATION_BUCKETS,
+            )
+            self.queries = Histogram(
+                "taxan_request_db_queries",
+                "Database queries per request.",
+                QUERY_BUCKETS,
+            )
+            self.db_time = Histogram(
+                "taxan_request_db_duration_seconds",
+                "Time per request spent in database queries.",
+                DURATION_BUCKETS,
+            )
+            self.serializer_time = Histogram(
+                "taxan_request_serializer_duration_seconds",
+                "Time per request spent in serializers.",
+                DURATION_BUCKETS,
+            )
+            self.size = Histogram(
+                "taxan_response_size_bytes",
+                "Size of response bodies.",
+                SIZE_BUCKETS,
+            )
+
+    def record(self, view, status, metrics, duration, size):
+        with self.lock:
+            key = (view, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.duration.observe(view, duration)
+            self.queries.observe(view, metrics.queries)
+            self.db_time.observe(view, metrics.db_time)
+            self.serializer_time.observe(view, metrics.serializer_time)
+            if size is not None:
+                self.size.observe(view, size)
+
+    def render(self):
+        with self.lock:
+            lines = [
+                "# HELP taxan_requests_total Requests by view and status code.",
+                "# TYPE taxan_requests_total counter",
+            ]
+            for (view, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'taxan_requests_total{{view="{escape_label(view)}",'
+                    f'status="{status}"}} {count}'
+                )
+            for histogram in (
+                self.duration,
+                self.queries,
+                self.db_time,
+                self.serializer_time,
+                self.size,
+            ):
+                lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def view_name(request):
+    """
+    Return the label of the view that handled `request`: the viewset and
+    action for DRF viewsets, and the view class and method for other class
+    based views.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        # Keep the labels bounded: no label per unknown URL
+        return "unmatched"
+    func = match.func
+    method = request.method.lower()
+    actions = getattr(func, "actions", None)
+    if actions is not None:
+        return f"{func.cls.__name__}.{actions.get(method, method)}"
+    view_class = getattr(func, "view_class", None) or getattr(func, "cls", None)
+    if view_class is not None:
+        return f"{view_class.__name__}.{method}"
+    return getattr(func, "__name__", "unknown")
+
+
+def server_timing(metrics, duration):
+    return (
+        f"total;dur={duration * 1000:.1f}, "
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries", '
+        f"serializer;dur={metrics.serializer_time * 1000:.1f}"
+    )
+
+
+def response_size(response):
+    if not response.streaming:
+        return len(response.content)
+    length = response.get("Content-Length")
+    return int(length) if length is not None else None
+
+
+def count_stream(content, finish):
+    size = 0
+    try:
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        finish(size)
+
+
+async def acount_stream(content, finish):
+    size = 0
+    try:
+        async for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        finish(size)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        response = self.get_response(request)
+        return self.finish(request, response, metrics, token)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        response = await self.get_response(request)
+        return self.finish(request, response, metrics, token)
+
+    def finish(self, request, response, metrics, token):
+        duration = perf_counter() - metrics.start
+        response.headers["Server-Timing"] = server_timing(metrics, duration)
+        view = view_name(request)
+        status = response.status_code
+
+        size = response_size(response)
+        # The WSGI server sends files with wsgi.file_wrapper, bypassing
+        # streaming_content, so only count what goes through it
+        if size is None and getattr(response, "file_to_stream", None) is None:
+
+            def finish(size):
+                registry.record(
+                    view, status, metrics, perf_counter() - metrics.start, size
+                )
+
+            # Keep measuring until the stream ends; the request_finished
+            # receiver clears the context afterwards
+            if response.is_async:
+                response.streaming_content = acount_stream(
+                    response.streaming_content, finish
+                )
+            else:
+                response.streaming_content = count_stream(
+                    response.streaming_content, finish
+                )
+            return response
+
+        registry.record(view, status, metrics, duration, size)
+        _current.reset(token)
+        return response
+
+
+@receiver(request_finished)
+def clear_request_metrics(**kwargs):
+    _current.set(None)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_wrapper(connection, **kwargs):
+    # Connection objects outlive reconnects; install the wrapper once
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def serializer_timed(func, *args, **kwargs):
+    """
+    Call `func`, adding the time it takes to the serializer time of the
+    current request. Calls nested in another timed call are not counted
+    again.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics.serializing:
+        return func(*args, **kwargs)
+    metrics.serializing = True
+    start = perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        metrics.serializer_time += perf_counter() - start
+        metrics.serializing = False
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time a serializer spends validating input and building its
+    representation to the serializer time of the current request. Nested
+    serializers are counted as part of their parent.
+    """
+
+    def run_validation(self, *args, **kwargs):
+        return serializer_timed(super().run_validation, *args, **kwargs)
+
+    def to_representation(self, *args, **kwargs):
+        return serializer_timed(super().to_representation, *args, **kwargs)
+
+
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tx", "0007_alter_event_financial_year"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="attachment",
+            index=models.Index(
+                fields=["created_at", "id"], name="tx_attachment_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["date", "id"], name="tx_event_date_id_idx"),
+        ),
+    ]
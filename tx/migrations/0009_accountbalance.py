@@ -0,0 +1,102 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_account_balances(apps, schema_editor):
+    AccountBalance = apps.get_model("tx", "AccountBalance")
+    Transaction = apps.get_model("tx", "Transaction")
+
+    def total(direction):
+        return Coalesce(
+            Sum("amount", filter=Q(direction=direction)),
+            Value(0),
+            output_field=models.DecimalField(max_digits=15, decimal_places=2),
+        )
+
+    rows = (
+        Transaction.objects.order_by()
+        .values("account_id", "event__financial_year_id")
+        .annotate(debit=total("debit"), credit=total("credit"))
+    )
+    AccountBalance.objects.bulk_create(
+        AccountBalance(
+            account_id=row["account_id"],
+            financial_year_id=row["event__financial_year_id"],
+            debit=row["debit"],
+            credit=row["credit"],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tx", "0008_event_attachment_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "debit",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of debit transactions on the account in the financial year",
+                        max_digits=15,
+                    ),
+                ),
+                (
+                    "credit",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of credit transactions on the account in the financial year",
+                        max_digits=15,
+                    ),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        help_text="The account this balance is for",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="account_balances",
+                        to="tx.account",
+                    ),
+                ),
+                (
+                    "financial_year",
+                    models.ForeignKey(
+                        help_text="The financial year this balance is for",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="account_balances",
+                        to="tx.financialyear",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("financial_year", "account"),
+                        name="tx_accountbalance_year_account_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_account_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:38
+
+import calendar
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def populate_balance_checkpoints(apps, schema_editor):
+    BalanceCheckpoint = apps.get_model("tx", "BalanceCheckpoint")
+    Transaction = apps.get_model("tx", "Transaction")
+
+    def total(direction):
+        return Coalesce(
+            Sum("amount", filter=Q(direction=direction)),
+            Value(0),
+            output_field=models.DecimalField(max_digits=15, decimal_places=2),
+        )
+
+    rows = (
+        Transaction.objects.order_by()
+        .values("account_id", month=TruncMonth("event__date"))
+        .annotate(debit=total("debit"), credit=total("credit"))
+        .order_by("account_id", "month")
+    )
+    totals = defaultdict(lambda: (0, 0))
+    checkpoints = []
+    for row in rows:
+        debit, credit = totals[row["account_id"]]
+        debit += row["debit"]
+        credit += row["credit"]
+        totals[row["account_id"]] = (debit, credit)
+        month = row["month"]
+        checkpoints.append(
+            BalanceCheckpoint(
+                account_id=row["account_id"],
+                date=month.replace(day=calendar.monthrange(month.year, month.month)[1]),
+                debit=debit,
+                credit=credit,
+            )
+        )
+    BalanceCheckpoint.objects.bulk_create(checkpoints)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tx", "0009_accountbalance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BalanceCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateField(
+                        help_text="Last day of the month this checkpoint closes"
+                    ),
+                ),
+                (
+                    "debit",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of all debit transactions on the account up to and including the date",
+                        max_digits=15,
+                    ),
+                ),
+                (
+                    "credit",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Sum of all credit transactions on the account up to and including the date",
+                        max_digits=15,
+                    ),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        help_text="The account this checkpoint is for",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_checkpoints",
+                        to="tx.account",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("account", "date"),
+                        name="tx_balancecheckpoint_account_date_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_balance_checkpoints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+AMOUNT_FIELDS = [
+    ("Transaction", "amount"),
+    ("AccountBalance", "debit"),
+    ("AccountBalance", "credit"),
+    ("BalanceCheckpoint", "debit"),
+    ("BalanceCheckpoint", "credit"),
+]
+
+
+def scale_amounts(factor, places):
+    # Amounts are scaled while the columns are still decimal; rounding to the
+    # target's decimal places (none for öre, which become integers) guards
+    # against binary floating point on databases that store decimals as REAL.
+    def scale(apps, schema_editor):
+        for model_name, field in AMOUNT_FIELDS:
+            model = apps.get_model("tx", model_name)
+            model.objects.update(**{field: Round(F(field) * factor, places)})
+
+    return scale
+
+
+def widen(model_name, field):
+    # Room for amounts in öre while the column is still decimal
+    return migrations.AlterField(
+        model_name=model_name.lower(),
+        name=field,
+        field=models.DecimalField(max_digits=17, decimal_places=2),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tx", "0010_balancecheckpoint"),
+    ]
+
+    operations = [
+        *(widen(model_name, field) for model_name, field in AMOUNT_FIELDS),
+        migrations.RunPython(
+            scale_amounts(Decimal("100"), 0), scale_amounts(Decimal("0.01"), 2)
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="amount",
+            field=models.BigIntegerField(
+                help_text="Transaction amount in öre (hundredths of a krona)"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="accountbalance",
+            name="debit",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Sum in öre of debit transactions on the account in the financial year",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="accountbalance",
+            name="credit",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Sum in öre of credit transactions on the account in the financial year",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="balancecheckpoint",
+            name="debit",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Sum in öre of all debit transactions on the account up to and including the date",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="balancecheckpoint",
+            name="credit",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Sum in öre of all credit transactions on the account up to and including the date",
+            ),
+        ),
+    ]
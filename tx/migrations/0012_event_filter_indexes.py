@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tx", "0011_amounts_in_ore"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["financial_year", "date", "id"],
+                name="tx_event_year_date_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["created_at", "id"], name="tx_event_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["account", "event"], name="tx_transaction_acct_event_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+SQLITE_CREATE = [
+    # External content: the table stores only the index, descriptions are read
+    # from tx_event
+    "CREATE VIRTUAL TABLE tx_event_search USING fts5("
+    "description, content='tx_event', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 0')",
+    "CREATE TRIGGER tx_event_search_insert AFTER INSERT ON tx_event BEGIN "
+    "INSERT INTO tx_event_search(rowid, description) "
+    "VALUES (new.id, new.description); END",
+    "CREATE TRIGGER tx_event_search_delete AFTER DELETE ON tx_event BEGIN "
+    "INSERT INTO tx_event_search(tx_event_search, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER tx_event_search_update AFTER UPDATE OF description "
+    "ON tx_event BEGIN "
+    "INSERT INTO tx_event_search(tx_event_search, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO tx_event_search(rowid, description) "
+    "VALUES (new.id, new.description); END",
+    "INSERT INTO tx_event_search(tx_event_search) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER tx_event_search_insert",
+    "DROP TRIGGER tx_event_search_delete",
+    "DROP TRIGGER tx_event_search_update",
+    "DROP TABLE tx_event_search",
+]
+
+
+def postgres_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return GinIndex(
+        SearchVector("description", config="simple"), name="tx_event_search_idx"
+    )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sql in SQLITE_CREATE:
+            schema_editor.execute(sql)
+    elif vendor == "postgresql":
+        schema_editor.add_index(apps.get_model("tx", "Event"), postgres_index())
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sql in SQLITE_DROP:
+            schema_editor.execute(sql)
+    elif vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model("tx", "Event"), postgres_index())
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index over event descriptions, see `tx/search.py`.
+
+    SQLite rebuilds a table to alter it, which drops its triggers; a later
+    migration that alters `Event` must recreate them.
+    """
+
+    dependencies = [
+        ("tx", "0012_event_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
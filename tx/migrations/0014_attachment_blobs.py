@@ -0,0 +1,75 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:39
+
+import django.db.models.deletion
+import tx.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tx", "0013_event_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Blob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        help_text="Hex SHA-256 digest of the file content",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        help_text="Stored file, named after its SHA-256 digest",
+                        upload_to=tx.models.blob_upload_to,
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(help_text="File size in bytes"),
+                ),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Number of attachments referring to this file",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="attachment",
+            name="file",
+            field=models.FileField(
+                help_text="Uploaded file attachment (stored under its SHA-256 digest)",
+                upload_to=tx.models.attachment_upload_to,
+            ),
+        ),
+        migrations.AddField(
+            model_name="attachment",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The deduplicated file this attachment refers to",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="attachments",
+                to="tx.blob",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tx", "0014_attachment_blobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventSearch",
+            fields=[
+                (
+                    "event",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search",
+                        serialize=False,
+                        to="tx.event",
+                    ),
+                ),
+                ("description", models.TextField()),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "tx_event_search",
+                "managed": False,
+            },
+        ),
+    ]
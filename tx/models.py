@@ -1,6 +1,7 @@
 import uuid
 import os
 from django.db import models
+from .amounts import format_ore
 
 
 class FinancialYear(models.Model):
@@ -37,20 +38,52 @@ class Event(models.Model):
         help_text="Timestamp when this event was created in the system",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "id"], name="tx_event_date_id_idx"),
+            models.Index(
+                fields=["financial_year", "date", "id"],
+                name="tx_event_year_date_id_idx",
+            ),
+            models.Index(fields=["created_at", "id"], name="tx_event_created_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.date} - {self.description}"
 
 
+class EventSearch(models.Model):
+    """
+    The SQLite full-text index of event descriptions, kept in step with
+    `Event` by triggers (see tx/search.py). Mapped so that searches can join
+    it; the table is created by migration 0013 and only exists on SQLite.
+    """
+
+    event = models.OneToOneField(
+        Event,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search",
+    )
+    description = models.TextField()
+    # FTS5's hidden relevance column, lower is better
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "tx_event_search"
+
+
 class Transaction(models.Model):
     DIRECTION_CHOICES = [
         ("debit", "Debit"),
         ("credit", "Credit"),
     ]
 
-    amount = models.DecimalField(
-        max_digits=12,
-        decimal_places=2,
-        help_text="Transaction amount with up to 12 digits and 2 decimal places",
+    amount = models.BigIntegerField(
+        help_text="Transaction amount in öre (hundredths of a krona)",
     )
     account = models.ForeignKey(
         Account,
@@ -70,20 +103,142 @@ class Transaction(models.Model):
         help_text="The event this transaction belongs to",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["account", "event"], name="tx_transaction_acct_event_idx"
+            ),
+        ]
+
     def __str__(self):
-        return f"{self.direction} {self.amount} to {self.account.name}"
+        return f"{self.direction} {format_ore(self.amount)} to {self.account.name}"
+
+
+class AccountBalance(models.Model):
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name="account_balances",
+        help_text="The account this balance is for",
+    )
+    financial_year = models.ForeignKey(
+        FinancialYear,
+        on_delete=models.CASCADE,
+        related_name="account_balances",
+        help_text="The financial year this balance is for",
+    )
+    debit = models.BigIntegerField(
+        default=0,
+        help_text="Sum in öre of debit transactions on the account in the financial year",
+    )
+    credit = models.BigIntegerField(
+        default=0,
+        help_text="Sum in öre of credit transactions on the account in the financial year",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["financial_year", "account"],
+                name="tx_accountbalance_year_account_uniq",
+            ),
+        ]
+
+    @property
+    def balance(self):
+        return self.debit - self.credit
+
+    def __str__(self):
+        return (
+            f"{self.account_id} in {self.financial_year_id}: {format_ore(self.balance)}"
+        )
+
+
+class BalanceCheckpoint(models.Model):
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name="balance_checkpoints",
+        help_text="The account this checkpoint is for",
+    )
+    date = models.DateField(
+        help_text="Last day of the month this checkpoint closes",
+    )
+    debit = models.BigIntegerField(
+        default=0,
+        help_text="Sum in öre of all debit transactions on the account up to and including the date",
+    )
+    credit = models.BigIntegerField(
+        default=0,
+        help_text="Sum in öre of all credit transactions on the account up to and including the date",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "date"],
+                name="tx_balancecheckpoint_account_date_uniq",
+            ),
+        ]
+
+    @property
+    def balance(self):
+        return self.debit - self.credit
+
+    def __str__(self):
+        return f"{self.account_id} at {self.date}: {format_ore(self.balance)}"
+
+
+def fan_out(filename):
+    """
+    Place an attachment file two directory levels down, named after its
+    first four characters: `attachments/ab/cd/abcd...`. File names are random
+    or hashes, so files spread evenly over 65,536 directories.
+    """
+    return os.path.join("attachments", filename[:2], filename[2:4], filename)
 
 
 def attachment_upload_to(instance, filename):
     ext = os.path.splitext(filename)[1]
-    filename = f"{uuid.uuid4()}{ext}"
-    return os.path.join("attachments", filename)
+    return fan_out(f"{uuid.uuid4()}{ext}")
+
+
+def blob_upload_to(instance, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return fan_out(f"{instance.sha256}{ext}")
+
+
+class Blob(models.Model):
+    sha256 = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="Hex SHA-256 digest of the file content",
+    )
+    file = models.FileField(
+        upload_to=blob_upload_to,
+        help_text="Stored file, named after its SHA-256 digest",
+    )
+    size = models.PositiveBigIntegerField(help_text="File size in bytes")
+    ref_count = models.PositiveIntegerField(
+        default=0, help_text="Number of attachments referring to this file"
+    )
+
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} references)"
 
 
 class Attachment(models.Model):
     file = models.FileField(
         upload_to=attachment_upload_to,
-        help_text="Uploaded file attachment (renamed with UUID)",
+        help_text="Uploaded file attachment (stored under its SHA-256 digest)",
+    )
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="attachments",
+        help_text="The deduplicated file this attachment refers to",
     )
     event = models.ForeignKey(
         Event,
@@ -95,5 +250,17 @@ class Attachment(models.Model):
         auto_now_add=True, help_text="Timestamp when this attachment was uploaded"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="tx_attachment_created_id_idx"
+            ),
+        ]
+
+    @staticmethod
+    def label(event_description):
+        """The string of an attachment of an event with this description."""
+        return f"Attachment for {event_description}"
+
     def __str__(self):
-        return f"Attachment for {self.event.description}"
+        return self.label(self.event.description)
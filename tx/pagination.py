@@ -0,0 +1,157 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on the full ordering tuple.
+
+    DRF's cursor pagination positions on the first ordering field only and
+    skips ties with an OFFSET. This paginator stores every ordering value in
+    the cursor and filters with a row comparison instead, so each page is an
+    index range scan no matter how deep into the result set it is.
+    """
+
+    ordering = ("id",)
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.prepare(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset[: self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Like `paginate_queryset`, fetching the page with the async ORM."""
+        queryset = self.prepare(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([obj async for obj in queryset[: self.page_size + 1]])
+
+    def prepare(self, queryset, request, view=None):
+        """
+        Read the page size and cursor from the request and return the page
+        queryset, or None when pagination is turned off.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        return self.get_page_queryset(queryset)
+
+    def get_page_queryset(self, queryset):
+        """
+        Return the queryset for the current page, with one extra row so that
+        we can tell whether there is anything beyond it.
+        """
+        reverse = self.cursor is not None and self.cursor.reverse
+        if reverse:
+            queryset = queryset.order_by(*(f"-{field}" for field in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.cursor is not None and self.cursor.position is not None:
+            position = self._decode_position(self.cursor.position)
+            try:
+                queryset = queryset.filter(self._keyset_filter(position, reverse))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        has_position = self.cursor is not None and self.cursor.position is not None
+        if self.cursor is not None and self.cursor.reverse:
+            self.page.reverse()
+            self.has_next = has_position
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = has_position
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        assert not any(
+            field.startswith("-") for field in ordering
+        ), "Keyset pagination only supports ascending orderings."
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field_name in ordering:
+            if isinstance(instance, dict):
+                value = instance[field_name]
+            else:
+                value = getattr(instance, field_name)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return json.dumps(values, separators=(",", ":"))
+
+    def _decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _keyset_filter(self, values, reverse):
+        """
+        Build `(f1, f2, ...) > (v1, v2, ...)` (or `<` when paging backwards).
+
+        The leading range on the first field lets the database seek straight
+        into the composite index before evaluating the tie-breakers.
+        """
+        gt, gte = ("lt", "lte") if reverse else ("gt", "gte")
+        fields = list(zip(self.ordering, values))
+
+        alternatives = []
+        for index, (field, value) in enumerate(fields):
+            equal = {name: prior for name, prior in fields[:index]}
+            alternatives.append(Q(**equal, **{f"{field}__{gt}": value}))
+
+        first_field, first_value = fields[0]
+        return Q(**{f"{first_field}__{gte}": first_value}) & reduce(or_, alternatives)
+
+
+class EventPagination(KeysetPagination):
+    ordering = ("date", "id")
+
+
+class AttachmentPagination(KeysetPagination):
+    ordering = ("created_at", "id")
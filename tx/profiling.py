@@ -0,0 +1,258 @@
+"""
+On-demand request profiling and slow query logging.
+
+A staff user can have a single request profiled by sending it with an
+`X-Profile: 1` header or a `profile=1` query parameter. `ProfilingMiddleware`
+then runs the request under `cProfile` and saves the profile in
+`PROFILE_ROOT`; the response names it in an `X-Profile-Id` header and
+`/profiles/<id>/` shows it as a `pstats` report (or, with `format=prof`,
+returns the file for `snakeviz` or `python -m pstats`). Requests from other
+users, and requests arriving while another one is being profiled, run
+normally. Only the `PROFILE_KEEP` most recent profiles are kept.
+
+Under ASGI the synchronous parts of a request (DRF views, and the queries of
+async views) run in a worker thread, so the profile combines the event loop
+thread with that thread. The profile ends when the view returns its
+response; the body of a streamed response is not profiled.
+
+Separately, every query that takes longer than `SLOW_QUERY_THRESHOLD`
+seconds is logged to the `tx.slow_queries` logger, with the view it ran in,
+its parameters and the database's query plan (`EXPLAIN QUERY PLAN` on
+SQLite). Plans that scan a whole table point at missing indexes.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import uuid
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.signals import request_finished
+from django.db import NotSupportedError
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import FileResponse, Http404, HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .metrics import view_name
+
+logger = logging.getLogger("tx.slow_queries")
+
+SORT_KEYS = {"cumulative", "tottime", "calls", "ncalls", "time"}
+
+_request = ContextVar("profiled_request", default=None)
+
+# One profiled request at a time: cProfile instances in different threads
+# would compete for the interpreter's profiling hooks on newer Pythons
+_profiling = threading.Lock()
+
+
+def profile_requested(request):
+    return request.headers.get("X-Profile") == "1" or request.GET.get("profile") == "1"
+
+
+def is_staff(request):
+    """
+    Whether the request comes from a staff user, signed in with a session or
+    with any of the API's authentication schemes.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        drf_request = Request(
+            request,
+            authenticators=[
+                authenticator()
+                for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+            ],
+        )
+        try:
+            user = drf_request.user
+        except APIException:
+            return False
+    return bool(user is not None and user.is_staff)
+
+
+def profile_path(profile_id):
+    return os.path.join(settings.PROFILE_ROOT, f"{profile_id}.prof")
+
+
+def save_profile(*profilers):
+    """Save the combined stats of `profilers` and return the profile id."""
+    os.makedirs(settings.PROFILE_ROOT, exist_ok=True)
+    profile_id = str(uuid.uuid4())
+    stats = pstats.Stats(*profilers)
+    stats.dump_stats(profile_path(profile_id))
+
+    # Drop the oldest profiles
+    paths = [
+        entry.path
+        for entry in os.scandir(settings.PROFILE_ROOT)
+        if entry.name.endswith(".prof")
+    ]
+    paths.sort(key=os.path.getmtime)
+    for path in paths[: max(len(paths) - settings.PROFILE_KEEP, 0)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return profile_id
+
+
+def enable_in_thread(profiler):
+    """
+    Enable `profiler` in the current thread. Returns False on Pythons where
+    the profiler already enabled elsewhere covers every thread.
+    """
+    try:
+        profiler.enable()
+    except ValueError:
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        _request.set(request)
+        if not profile_requested(request) or not is_staff(request):
+            return self.get_response(request)
+        if not _profiling.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            response["X-Profile-Id"] = save_profile(profiler)
+        finally:
+            _profiling.release()
+        return response
+
+    async def __acall__(self, request):
+        _request.set(request)
+        if not profile_requested(request):
+            return await self.get_response(request)
+        if not await sync_to_async(is_staff)(request):
+            return await self.get_response(request)
+        if not _profiling.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            profilers = [cProfile.Profile()]
+            profilers[0].enable()
+            # Synchronous code of this request runs in one worker thread
+            thread_profiler = cProfile.Profile()
+            if await sync_to_async(enable_in_thread)(thread_profiler):
+                profilers.append(thread_profiler)
+            try:
+                response = await self.get_response(request)
+            finally:
+                profilers[0].disable()
+                if len(profilers) > 1:
+                    await sync_to_async(thread_profiler.disable)()
+            response["X-Profile-Id"] = save_profile(*profilers)
+        finally:
+            _profiling.release()
+        return response
+
+
+@receiver(request_finished)
+def clear_profiled_request(**kwargs):
+    _request.set(None)
+
+
+def query_plan(connection, sql, params):
+    """Return the lines of the query plan of `sql`, or None."""
+    try:
+        prefix = connection.ops.explain_query_prefix()
+    except NotSupportedError:
+        return None
+    # A cursor of its own, outside the execute wrappers: the caller may
+    # still be fetching rows from the slow query's cursor
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f"{prefix} {sql}", params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except connection.Database.Error:
+        # The raw cursor raises the driver's own exceptions
+        return None
+    finally:
+        cursor.close()
+
+
+def log_slow_query(execute, sql, params, many, context):
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    if threshold is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    result = execute(sql, params, many, context)
+    duration = perf_counter() - start
+    if duration < threshold:
+        return result
+
+    request = _request.get()
+    view = view_name(request) if request is not None else None
+    plan = None
+    if not many and sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        plan = query_plan(context["connection"], sql, params)
+    logger.warning(
+        "Slow query (%.0f ms) in %s: %s\nParameters: %r\nQuery plan:\n%s",
+        duration * 1000,
+        view or "no request",
+        sql,
+        params if not many else "(executemany)",
+        "\n".join(f"  {line}" for line in plan) if plan else "  (not available)",
+        extra={"duration": duration, "view": view, "sql": sql, "plan": plan},
+    )
+    return result
+
+
+@receiver(connection_created)
+def install_slow_query_wrapper(connection, **kwargs):
+    # Connection objects outlive reconnects; install the wrapper once
+    if log_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_query)
+
+
+def profile_view(request, profile_id):
+    if not is_staff(request):
+        raise PermissionDenied
+    path = profile_path(profile_id)
+    if not os.path.exists(path):
+        raise Http404("No such profile.")
+
+    if request.GET.get("format") == "prof":
+        return FileResponse(
+            open(path, "rb"), as_attachment=True, filename=f"{profile_id}.prof"
+        )
+
+    sort = request.GET.get("sort", "cumulative")
+    if sort not in SORT_KEYS:
+        sort = "cumulative"
+    try:
+        limit = min(max(int(request.GET.get("limit", 50)), 1), 1000)
+    except ValueError:
+        limit = 50
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats(sort).print_stats(limit)
+    return HttpResponse(output.getvalue(), content_type="text/plain; charset=utf-8")
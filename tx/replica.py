@@ -0,0 +1,75 @@
+"""
+Routing of safe read requests to the read-only `replica` database alias.
+
+`ReadReplicaMiddleware` marks GET and HEAD requests to viewset actions listed
+in the viewset's `replica_actions` (and the async views mirroring them), and
+`ReadReplicaRouter` sends every read made while handling a marked request to
+the replica. The mark lasts until the response is closed, so streamed
+exports read from the replica too. Writes always go to the default alias.
+
+Without a `replica` alias in `DATABASES` (see `taxan.databases`) the router
+does nothing.
+"""
+
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.dispatch import receiver
+from django.utils.deprecation import MiddlewareMixin
+
+REPLICA = "replica"
+
+SAFE_METHODS = ("GET", "HEAD")
+
+_use_replica = ContextVar("use_replica", default=False)
+
+
+def view_action(view_func, method):
+    """
+    Return the viewset class and action that `view_func` dispatches `method`
+    to, or `(None, None)` for other views.
+    """
+    actions = getattr(view_func, "actions", None)
+    if actions is not None:
+        # DRF viewsets answer HEAD with the GET action
+        return view_func.cls, actions.get(method.lower(), actions.get("get"))
+    view_class = getattr(view_func, "view_class", None)
+    viewset = getattr(view_class, "viewset", None)
+    if viewset is not None:
+        return viewset, getattr(view_class, "action", None)
+    return None, None
+
+
+class ReadReplicaMiddleware(MiddlewareMixin):
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS:
+            return None
+        viewset, action = view_action(view_func, request.method)
+        if action is not None and action in getattr(viewset, "replica_actions", ()):
+            _use_replica.set(True)
+        return None
+
+
+@receiver(request_finished)
+def clear_replica_mark(**kwargs):
+    _use_replica.set(False)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and REPLICA in settings.DATABASES:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA:
+            return False
+        return None
@@ -0,0 +1,52 @@
+"""
+Financial reports computed in the database.
+
+Each report is a single grouped aggregate query, so the work done in Python is
+proportional to the number of accounts rather than the number of transactions.
+"""
+
+from django.db.models import F
+
+from .balances import sum_direction
+from .models import AccountBalance, Transaction
+
+
+def trial_balance_rows(financial_year, as_of=None):
+    """
+    Return per-account debit, credit and balance totals for `financial_year`,
+    ordered by account code.
+
+    Full-year figures are read from the `AccountBalance` table. With `as_of`
+    inside the year, transactions on events up to and including that date are
+    summed with conditional aggregates instead.
+    """
+    if as_of is None or as_of >= financial_year.end_date:
+        rows = AccountBalance.objects.filter(financial_year=financial_year).values(
+            "account_id",
+            "debit",
+            "credit",
+            code=F("account__code"),
+            name=F("account__name"),
+        )
+    else:
+        rows = (
+            Transaction.objects.filter(
+                event__financial_year=financial_year, event__date__lte=as_of
+            )
+            .values("account_id", code=F("account__code"), name=F("account__name"))
+            .annotate(debit=sum_direction("debit"), credit=sum_direction("credit"))
+        )
+    return rows.annotate(balance=F("debit") - F("credit")).order_by(
+        "code", "account_id"
+    )
+
+
+def trial_balance_report(financial_year, as_of=None):
+    accounts = list(trial_balance_rows(financial_year, as_of))
+    return {
+        "financial_year": financial_year.id,
+        "as_of": as_of or financial_year.end_date,
+        "accounts": accounts,
+        "debit": sum(row["debit"] for row in accounts),
+        "credit": sum(row["credit"] for row in accounts),
+    }
@@ -0,0 +1,121 @@
+"""
+Full-text search over event descriptions.
+
+On SQLite, descriptions are indexed in the FTS5 table `tx_event_search`, an
+external-content table over `tx_event`. Triggers created by migration 0013
+keep it in sync, so events inserted by any write path are searchable,
+including the raw inserts of the benchmark generator. The table is mapped as
+the unmanaged `EventSearch` model, so a search is an ORM join filtered with
+the `match` lookup. On PostgreSQL a GIN
+index over the description's `tsvector` serves the same queries. Other
+databases fall back to case-insensitive substring matching.
+
+Every word in a search must occur in the description, as a prefix of one of
+its words; results are ranked by relevance (BM25 on SQLite, `ts_rank` on
+PostgreSQL).
+"""
+
+import re
+from functools import reduce
+from operator import and_
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Lookup, Q
+
+from .models import EventSearch
+
+SEARCH_TABLE = "tx_event_search"
+SEARCH_INDEX = "tx_event_search_idx"
+# Neither backend stems words or folds diacritics: å, ä and ö are letters of
+# their own in Swedish
+SEARCH_CONFIG = "simple"
+
+WORD = re.compile(r"\w+")
+
+
+class Match(Lookup):
+    """FTS5 `MATCH`, restricted to the column on the left."""
+
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+EventSearch._meta.get_field("description").register_lookup(Match)
+
+
+def search_terms(text):
+    """Return the words in `text`, lowercased, ignoring punctuation."""
+    return [word.lower() for word in WORD.findall(text)]
+
+
+def _search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector("description", config=SEARCH_CONFIG)
+
+
+def search_events(queryset, terms):
+    """
+    Restrict an `Event` queryset to events whose description matches every
+    term and order it by relevance, best match first.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        return (
+            queryset.filter(search__description__match=match)
+            .annotate(rank=F("search__rank"))
+            .order_by("rank", "id")
+        )
+    if vendor == "postgresql":
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms),
+            config=SEARCH_CONFIG,
+            search_type="raw",
+        )
+        return (
+            queryset.annotate(search=_search_vector())
+            .filter(search=query)
+            .annotate(rank=SearchRank(_search_vector(), query))
+            .order_by("-rank", "id")
+        )
+    return queryset.filter(
+        reduce(and_, (Q(description__icontains=term) for term in terms))
+    ).order_by("-date", "-id")
+
+
+def rebuild_search_index(using="default"):
+    """Rebuild the search index from the events table."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"REINDEX INDEX {SEARCH_INDEX}")
+
+
+def verify_search_index(using="default"):
+    """
+    Return True if the search index matches the events table. Only SQLite can
+    drift (when its triggers are bypassed); other backends always match.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return True
+    try:
+        with transaction.atomic(using), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) "
+                "VALUES ('integrity-check', 1)"
+            )
+    except DatabaseError:
+        return False
+    return True
@@ -1,10 +1,122 @@
 from rest_framework import serializers
-from decimal import Decimal
+from rest_framework.settings import api_settings
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
+from .amounts import DECIMAL_PLACES, MAX_DIGITS, format_ore, from_ore, to_ore
+from .balances import apply_transactions
+from .financial_years import (
+    FinancialYearsByPk,
+    financial_year_index,
+    resolve_financial_year,
+)
+from .group_commit import GroupCommit
+from .metrics import TimedSerializerMixin
 from .models import FinancialYear, Account, Event, Transaction, Attachment
+from .search import search_terms
 
 
-class FinancialYearSerializer(serializers.ModelSerializer):
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that resolves objects preloaded by a parent serializer.
+    When `context["preloaded"]` holds objects for the related model, lookups are
+    served from it instead of issuing one query per value.
+    """
+
+    def to_internal_value(self, data):
+        model = self.get_queryset().model
+        preloaded = self.context.get("preloaded", {}).get(model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return preloaded[pk]
+        except (KeyError, TypeError):
+            self.fail("does_not_exist", pk_value=data)
+
+
+class AmountField(serializers.DecimalField):
+    """
+    Decimal string in the API, integer öre in Python and the database.
+    Input is validated as a decimal with up to 12 digits and 2 decimal places.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("max_digits", MAX_DIGITS)
+        kwargs.setdefault("decimal_places", DECIMAL_PLACES)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        return to_ore(super().to_internal_value(data))
+
+    def to_representation(self, value):
+        if not getattr(self, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING):
+            return from_ore(value)
+        return format_ore(value)
+
+
+def preload_related(context, model, values):
+    """
+    Load every `model` object referenced by `values` with a single query and
+    make them available to `PreloadedPrimaryKeyRelatedField`.
+    """
+    pks = set()
+    for value in values:
+        if isinstance(value, bool):
+            continue
+        try:
+            pks.add(model._meta.pk.to_python(value))
+        except DjangoValidationError:
+            continue
+    context.setdefault("preloaded", {})[model] = model.objects.in_bulk(pks)
+
+
+def validate_balanced(transactions_data):
+    """
+    Check the double-entry rule: at least one transaction, and total debits
+    equal to total credits.
+    """
+    if not transactions_data:
+        raise serializers.ValidationError("Event must have at least one transaction.")
+
+    total_debits = 0
+    total_credits = 0
+
+    for transaction_data in transactions_data:
+        amount = transaction_data["amount"]
+        direction = transaction_data["direction"]
+
+        if direction == "debit":
+            total_debits += amount
+        elif direction == "credit":
+            total_credits += amount
+
+    if total_debits != total_credits:
+        raise serializers.ValidationError(
+            f"Total debits ({format_ore(total_debits)}) must equal total credits ({format_ore(total_credits)})."
+        )
+
+
+def validate_in_financial_year(event_date, financial_year):
+    """Check that an event date falls within its financial year."""
+    if financial_year and event_date:
+        if event_date < financial_year.start_date:
+            raise serializers.ValidationError(
+                f"Event date ({event_date}) cannot be before financial year start date ({financial_year.start_date})."
+            )
+        if event_date > financial_year.end_date:
+            raise serializers.ValidationError(
+                f"Event date ({event_date}) cannot be after financial year end date ({financial_year.end_date})."
+            )
+
+
+class FinancialYearSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for financial year entities representing business fiscal periods.
     Financial years define the accounting periods for organizing business transactions.
@@ -22,15 +134,41 @@ class FinancialYearSerializer(serializers.ModelSerializer):
     def validate(self, data):
         if data["start_date"] >= data["end_date"]:
             raise serializers.ValidationError("Start date must be before end date.")
+
+        overlapping = financial_year_index(refresh=True).overlapping(
+            data["start_date"], data["end_date"]
+        )
+        if overlapping:
+            raise serializers.ValidationError(
+                f"Financial year overlaps with existing financial year ({overlapping[0]})."
+            )
         return data
 
 
+class AccountSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for accounts in the chart of accounts.
+    """
+
+    url = serializers.HyperlinkedIdentityField(
+        view_name="account-detail", help_text="URL to access this account resource"
+    )
+
+    class Meta:
+        model = Account
+        fields = ["url", "id", "code", "name"]
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     """
     Serializer for individual transaction entries in double-entry bookkeeping.
     Each transaction represents either a debit or credit to a specific account.
     """
 
+    amount = AmountField(
+        help_text="Transaction amount with up to 12 digits and 2 decimal places"
+    )
+
     class Meta:
         model = Transaction
         fields = ["id", "amount", "account", "direction", "event"]
@@ -46,18 +184,108 @@ class NestedTransactionSerializer(serializers.ModelSerializer):
     Used when creating events with nested transaction data.
     """
 
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
+    amount = AmountField(
+        help_text="Transaction amount with up to 12 digits and 2 decimal places"
+    )
+
     class Meta:
         model = Transaction
         fields = ["amount", "account", "direction"]
 
 
-class EventSerializer(serializers.ModelSerializer):
+def create_event(event_data):
+    """Insert one validated event and its transactions."""
+    event_data = dict(event_data)
+    transactions_data = event_data.pop("transactions")
+
+    with transaction.atomic():
+        event = Event.objects.create(**event_data)
+        transactions = Transaction.objects.bulk_create(
+            Transaction(event=event, **transaction_data)
+            for transaction_data in transactions_data
+        )
+        apply_transactions(transactions)
+
+    return event
+
+
+def create_events(events_data):
+    """
+    Insert validated events and their transactions with `bulk_create` in one
+    database transaction.
+    """
+    events = []
+    transactions = []
+
+    for event_data in events_data:
+        event_data = dict(event_data)
+        transactions_data = event_data.pop("transactions")
+        event = Event(**event_data)
+        events.append(event)
+        transactions.extend(
+            Transaction(event=event, **transaction_data)
+            for transaction_data in transactions_data
+        )
+
+    with transaction.atomic():
+        Event.objects.bulk_create(events)
+        Transaction.objects.bulk_create(transactions)
+        apply_transactions(transactions)
+
+    return events
+
+
+# Concurrent single-event creations in this process, coalesced into shared
+# transactions when `EVENT_GROUP_COMMIT` is on
+event_group_commit = GroupCommit(
+    create_events,
+    create_event,
+    max_batch=lambda: settings.EVENT_GROUP_COMMIT_MAX_BATCH,
+)
+
+
+class EventListSerializer(serializers.ListSerializer):
+    """
+    Creates many events at once for bulk ingestion.
+    Each event is validated by `EventSerializer`; events and their transactions
+    are then inserted with `bulk_create` inside a single database transaction.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            events_data = [item for item in data if isinstance(item, dict)]
+            transactions_data = [
+                transaction_data
+                for event_data in events_data
+                if isinstance(event_data.get("transactions"), list)
+                for transaction_data in event_data["transactions"]
+                if isinstance(transaction_data, dict)
+            ]
+            preload_related(
+                self.context,
+                Account,
+                [
+                    transaction_data.get("account")
+                    for transaction_data in transactions_data
+                ],
+            )
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        return create_events(validated_data)
+
+
+class EventSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for accounting events (journal entries) with nested transactions.
     Events group related transactions and must maintain balanced debits and credits.
     Events are immutable after creation to maintain accounting integrity.
     """
 
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     url = serializers.HyperlinkedIdentityField(
         view_name="event-detail", help_text="URL to access this event resource"
     )
@@ -83,67 +311,110 @@ class EventSerializer(serializers.ModelSerializer):
             "created_at",
         ]
         read_only_fields = ["created_at"]
+        extra_kwargs = {
+            "financial_year": {
+                "required": False,
+                "help_text": "Financial year this event belongs to; resolved from the date when omitted",
+            }
+        }
+        list_serializer_class = EventListSerializer
+
+    def to_internal_value(self, data):
+        preloaded = self.context.setdefault("preloaded", {})
+        # Serve financial year lookups from the shared in-process index
+        preloaded.setdefault(FinancialYear, FinancialYearsByPk())
+        # Resolve every account of the event with one query, unless
+        # `EventListSerializer` already did so for the whole batch
+        if Account not in preloaded and isinstance(data, dict):
+            transactions_data = data.get("transactions")
+            if isinstance(transactions_data, list):
+                preload_related(
+                    self.context,
+                    Account,
+                    [
+                        transaction_data.get("account")
+                        for transaction_data in transactions_data
+                        if isinstance(transaction_data, dict)
+                    ],
+                )
+        return super().to_internal_value(data)
 
     def validate(self, data):
-        transactions_data = data.get("transactions", [])
-
-        if not transactions_data:
-            raise serializers.ValidationError(
-                "Event must have at least one transaction."
-            )
-
-        total_debits = Decimal("0")
-        total_credits = Decimal("0")
-
-        for transaction_data in transactions_data:
-            amount = transaction_data["amount"]
-            direction = transaction_data["direction"]
-
-            if direction == "debit":
-                total_debits += amount
-            elif direction == "credit":
-                total_credits += amount
-
-        if total_debits != total_credits:
-            raise serializers.ValidationError(
-                f"Total debits ({total_debits}) must equal total credits ({total_credits})."
-            )
-
-        # Validate that event date falls within financial year period
-        financial_year = data.get("financial_year")
-        event_date = data.get("date")
-
-        if financial_year and event_date:
-            if event_date < financial_year.start_date:
-                raise serializers.ValidationError(
-                    f"Event date ({event_date}) cannot be before financial year start date ({financial_year.start_date})."
-                )
-            if event_date > financial_year.end_date:
+        if data.get("financial_year") is None and data.get("date"):
+            data["financial_year"] = resolve_financial_year(data["date"])
+            if data["financial_year"] is None:
                 raise serializers.ValidationError(
-                    f"Event date ({event_date}) cannot be after financial year end date ({financial_year.end_date})."
+                    {
+                        "financial_year": f"No financial year covers the event date ({data['date']})."
+                    }
                 )
 
+        validate_balanced(data.get("transactions", []))
+        validate_in_financial_year(data.get("date"), data.get("financial_year"))
         return data
 
     def create(self, validated_data):
-        transactions_data = validated_data.pop("transactions")
+        if settings.EVENT_GROUP_COMMIT:
+            return event_group_commit.submit(validated_data)
+        return create_event(validated_data)
 
-        with transaction.atomic():
-            event = Event.objects.create(**validated_data)
+    def update(self, instance, validated_data):
+        raise AttributeError("Event updates are not supported")
 
-            for transaction_data in transactions_data:
-                Transaction.objects.create(event=event, **transaction_data)
 
-        return event
+class EventFilterSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Query parameters for filtering the event list.
+    """
 
-    def update(self, instance, validated_data):
-        raise AttributeError("Event updates are not supported")
+    financial_year = serializers.IntegerField(
+        required=False, help_text="Only include events in this financial year"
+    )
+    date__gte = serializers.DateField(
+        required=False, help_text="Only include events on or after this date"
+    )
+    date__lte = serializers.DateField(
+        required=False, help_text="Only include events on or before this date"
+    )
+    account = serializers.IntegerField(
+        required=False,
+        help_text="Only include events with at least one transaction on this account",
+    )
+    created_at__gte = serializers.DateTimeField(
+        required=False, help_text="Only include events created at or after this time"
+    )
+    created_at__lte = serializers.DateTimeField(
+        required=False, help_text="Only include events created at or before this time"
+    )
 
 
-class AttachmentSerializer(serializers.ModelSerializer):
+class EventSearchQuerySerializer(EventFilterSerializer):
+    """
+    Query parameters for full-text search over events.
+    """
+
+    q = serializers.CharField(
+        help_text="Words to search for in event descriptions; every word must match the start of a word in the description",
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        default=20,
+        min_value=1,
+        max_value=100,
+        help_text="Maximum number of events to return (default 20)",
+    )
+
+    def validate_q(self, value):
+        terms = search_terms(value)
+        if not terms:
+            raise serializers.ValidationError("Enter at least one word.")
+        return terms
+
+
+class AttachmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for file attachments associated with accounting events.
-    Files are automatically renamed with UUIDs and stored in the attachments directory.
+    Files are stored once per distinct content, named after their SHA-256 digest.
     """
 
     url = serializers.HyperlinkedIdentityField(
@@ -155,3 +426,62 @@ class AttachmentSerializer(serializers.ModelSerializer):
         model = Attachment
         fields = ["url", "id", "file", "event", "created_at"]
         read_only_fields = ["created_at"]
+
+
+class TrialBalanceQuerySerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Query parameters for the trial balance report.
+    """
+
+    as_of = serializers.DateField(
+        required=False,
+        help_text="Only include events up to and including this date (defaults to the end of the financial year)",
+    )
+
+
+class TrialBalanceAccountSerializer(serializers.Serializer):
+    """
+    Debit, credit and net balance of one account in a trial balance.
+    """
+
+    account_id = serializers.IntegerField(help_text="Account ID")
+    code = serializers.IntegerField(help_text="Account code")
+    name = serializers.CharField(help_text="Account name")
+    debit = AmountField(max_digits=15, help_text="Total debits")
+    credit = AmountField(max_digits=15, help_text="Total credits")
+    balance = AmountField(max_digits=15, help_text="Debits minus credits")
+
+
+class TrialBalanceSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Trial balance of a financial year: per-account totals plus the grand
+    totals of debits and credits, which are equal for a balanced ledger.
+    """
+
+    financial_year = serializers.IntegerField(help_text="Financial year ID")
+    as_of = serializers.DateField(help_text="Last date included in the report")
+    accounts = TrialBalanceAccountSerializer(many=True)
+    debit = AmountField(max_digits=15, help_text="Total debits of all accounts")
+    credit = AmountField(max_digits=15, help_text="Total credits of all accounts")
+
+
+class AccountBalanceQuerySerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Query parameters for the balance of an account at a date.
+    """
+
+    date = serializers.DateField(
+        help_text="Return the balance at the end of this date",
+    )
+
+
+class AccountBalanceSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Cumulative debit and credit totals of an account at the end of a date.
+    """
+
+    account = serializers.IntegerField(help_text="Account ID")
+    date = serializers.DateField(help_text="Date the balance is for")
+    debit = AmountField(max_digits=15, help_text="Total debits up to the date")
+    credit = AmountField(max_digits=15, help_text="Total credits up to the date")
+    balance = AmountField(max_digits=15, help_text="Debits minus credits")
@@ -0,0 +1,282 @@
+"""
+SIE 4 export and import.
+
+SIE is the file format Swedish bookkeeping software uses to exchange
+accounting data. Type 4 files contain the chart of accounts, opening and
+closing balances, the result for the year and every voucher with its
+transactions. Files are encoded in CP437 ("PC8"). Parsing lives in
+`tx/sie_parser.py`.
+"""
+
+from datetime import date
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, F, Sum, When
+from rest_framework import serializers
+
+from .amounts import MAX_DIGITS, format_ore
+from .balances import apply_transactions
+from .exports import ROW_CHUNK_SIZE
+from .financial_years import financial_year_index, resolve_financial_year
+from .models import Account, Event, FinancialYear, Transaction
+from .serializers import validate_balanced, validate_in_financial_year
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Amounts the API accepts have at most 12 digits, 2 of them decimals.
+MAX_AMOUNT = 10**MAX_DIGITS
+
+# In the BAS chart of accounts, classes 1 and 2 are balance sheet accounts and
+# classes 3 to 8 are profit and loss accounts.
+FIRST_RESULT_ACCOUNT = 3000
+
+SIGNED_AMOUNT = Case(
+    When(direction="debit", then=F("amount")),
+    default=-F("amount"),
+    output_field=BigIntegerField(),
+)
+
+
+def quote(text):
+    text = " ".join(str(text).split())
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def format_date(value):
+    return value.strftime("%Y%m%d")
+
+
+def account_balances(transactions):
+    """
+    Return `{account code: signed sum}` for `transactions`, computed with one
+    grouped aggregate query. Debits are positive and credits negative.
+    """
+    rows = (
+        transactions.order_by()
+        .values("account__code")
+        .annotate(balance=Sum(SIGNED_AMOUNT))
+        .values_list("account__code", "balance")
+    )
+    return dict(rows)
+
+
+def sie_lines(financial_year, company_name="", program_version="0.1.0"):
+    """
+    Yield the lines of an SIE 4 file for `financial_year`.
+
+    Balances are aggregated in the database, and vouchers are streamed from a
+    chunked iterator over transactions ordered by event, so memory use depends
+    on the number of accounts rather than the number of vouchers.
+    """
+    yield "#FLAGGA 0\n"
+    yield f"#PROGRAM {quote('Taxan')} {quote(program_version)}\n"
+    yield "#FORMAT PC8\n"
+    yield f"#GEN {format_date(date.today())}\n"
+    yield "#SIETYP 4\n"
+    yield f"#FNAMN {quote(company_name)}\n"
+    yield (
+        f"#RAR 0 {format_date(financial_year.start_date)} "
+        f"{format_date(financial_year.end_date)}\n"
+    )
+
+    accounts = Account.objects.order_by("code").values_list("code", "name")
+    for code, name in accounts.iterator(chunk_size=ROW_CHUNK_SIZE):
+        yield f"#KONTO {code} {quote(name)}\n"
+
+    yield from balance_lines(financial_year)
+    yield from voucher_lines(financial_year)
+
+
+def balance_lines(financial_year):
+    balance_accounts = Transaction.objects.filter(
+        account__code__lt=FIRST_RESULT_ACCOUNT
+    )
+    opening = account_balances(
+        balance_accounts.filter(event__date__lt=financial_year.start_date)
+    )
+    movement = account_balances(
+        Transaction.objects.filter(event__financial_year=financial_year)
+    )
+
+    for code in sorted(opening.keys() | movement.keys()):
+        if code >= FIRST_RESULT_ACCOUNT:
+            continue
+        opening_balance = opening.get(code, 0)
+        closing_balance = opening_balance + movement.get(code, 0)
+        yield f"#IB 0 {code} {format_ore(opening_balance)}\n"
+        yield f"#UB 0 {code} {format_ore(closing_balance)}\n"
+
+    for code in sorted(movement):
+        if code >= FIRST_RESULT_ACCOUNT:
+            yield f"#RES 0 {code} {format_ore(movement[code])}\n"
+
+
+def voucher_lines(financial_year):
+    rows = (
+        Transaction.objects.filter(event__financial_year=financial_year)
+        .order_by("event__date", "event_id", "id")
+        .values_list(
+            "event_id",
+            "event__date",
+            "event__description",
+            "account__code",
+            "direction",
+            "amount",
+        )
+    )
+    for (event_id, event_date, description), transactions in groupby(
+        rows.iterator(chunk_size=ROW_CHUNK_SIZE), key=lambda row: row[:3]
+    ):
+        yield (f'#VER "" {event_id} {format_date(event_date)} {quote(description)}\n')
+        yield "{\n"
+        for *_, code, direction, amount in transactions:
+            signed = amount if direction == "debit" else -amount
+            yield f"#TRANS {code} {{}} {format_ore(signed)}\n"
+        yield "}\n"
+
+
+class SieImporter:
+    """
+    Loads records from `tx.sie_parser` into the database.
+
+    Accounts are upserted by code and financial years are matched by date, or
+    created from the file's `#RAR` ranges. Each voucher is checked with the
+    same rules as `EventSerializer`; valid vouchers are inserted with
+    `bulk_create` in batches of `batch_size`, each batch in its own database
+    transaction. Malformed or unbalanced vouchers are reported and skipped.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.accounts = {
+            account.code: account for account in Account.objects.order_by("-id")
+        }
+        self.pending_accounts = {}
+        self.year_ranges = []
+        self.events = []
+        self.transactions = []
+        self.result = {
+            "accounts": 0,
+            "financial_years": 0,
+            "events": 0,
+            "transactions": 0,
+            "error_count": 0,
+            "errors": [],
+        }
+
+    def load(self, records):
+        for record in records:
+            kind = record[0]
+            if kind == "voucher":
+                self.add_voucher(*record[1:])
+            elif kind == "account":
+                self.pending_accounts[record[2]] = record[3]
+            elif kind == "year":
+                self.year_ranges.append((record[3], record[4]))
+            else:
+                self.add_error(record[1], record[2])
+        self.save_accounts()
+        self.flush()
+        return self.result
+
+    def add_error(self, line, message):
+        self.result["error_count"] += 1
+        if len(self.result["errors"]) < MAX_REPORTED_ERRORS:
+            self.result["errors"].append({"line": line, "message": message})
+
+    def add_voucher(self, line, date, text, lines):
+        if self.pending_accounts:
+            self.save_accounts()
+
+        financial_year = self.financial_year_for(date)
+        if financial_year is None:
+            self.add_error(
+                line, f"Voucher date ({date}) is outside every financial year."
+            )
+            return
+
+        missing = sorted({code for code, _ in lines if code not in self.accounts})
+        if missing:
+            codes = ", ".join(str(code) for code in missing)
+            self.add_error(line, f"Unknown accounts: {codes}.")
+            return
+
+        if any(abs(amount) >= MAX_AMOUNT for _, amount in lines):
+            self.add_error(line, "Transaction amount is too large.")
+            return
+
+        transactions_data = [
+            {
+                "account": self.accounts[code],
+                "amount": abs(amount),
+                "direction": "debit" if amount >= 0 else "credit",
+            }
+            for code, amount in lines
+        ]
+        try:
+            validate_balanced(transactions_data)
+            validate_in_financial_year(date, financial_year)
+        except serializers.ValidationError as error:
+            self.add_error(line, str(error.detail[0]))
+            return
+
+        event = Event(
+            date=date,
+            description=text[: Event._meta.get_field("description").max_length],
+            financial_year=financial_year,
+        )
+        self.events.append(event)
+        self.transactions.extend(
+            Transaction(event=event, **transaction_data)
+            for transaction_data in transactions_data
+        )
+        if len(self.events) >= self.batch_size:
+            self.flush()
+
+    def financial_year_for(self, date):
+        financial_year = resolve_financial_year(date)
+        if financial_year is not None:
+            return financial_year
+        for start_date, end_date in self.year_ranges:
+            if start_date <= date <= end_date and not (
+                financial_year_index().overlapping(start_date, end_date)
+            ):
+                financial_year = FinancialYear.objects.create(
+                    start_date=start_date, end_date=end_date
+                )
+                self.result["financial_years"] += 1
+                return financial_year
+        return None
+
+    def save_accounts(self):
+        created = []
+        updated = []
+        for code, name in self.pending_accounts.items():
+            account = self.accounts.get(code)
+            if account is None:
+                account = Account(code=code, name=name)
+                self.accounts[code] = account
+                created.append(account)
+            elif account.name != name:
+                account.name = name
+                updated.append(account)
+        self.pending_accounts = {}
+
+        with transaction.atomic():
+            Account.objects.bulk_create(created)
+            Account.objects.bulk_update(updated, ["name"])
+        self.result["accounts"] += len(created) + len(updated)
+
+    def flush(self):
+        if not self.events:
+            return
+        with transaction.atomic():
+            Event.objects.bulk_create(self.events)
+            Transaction.objects.bulk_create(self.transactions)
+            apply_transactions(self.transactions)
+        self.result["events"] += len(self.events)
+        self.result["transactions"] += len(self.transactions)
+        self.events = []
+        self.transactions = []
@@ -0,0 +1,224 @@
+"""
+SIE 4 parser.
+
+Turns the lines of an SIE file into plain tuples that the importer in
+`tx/sie.py` loads into the database. This module deliberately does not import
+Django, so that large files can be parsed in worker processes.
+
+Records:
+
+- `("account", line, code, name)` for `#KONTO`
+- `("year", line, index, start_date, end_date)` for `#RAR`
+- `("voucher", line, date, text, [(account code, signed amount in öre), ...])`
+  for `#VER` blocks, where debits are positive and credits negative
+- `("error", line, message)` for malformed rows
+"""
+
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from .amounts import to_ore
+
+SIE_ENCODING = "cp437"
+
+PARSE_CHUNK_SIZE = 8 * 1024 * 1024
+
+TOKEN_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|(\{[^}]*\})|(\S+)')
+ESCAPE_RE = re.compile(r"\\(.)")
+
+# Lines inside a voucher that are only kept for audit history; `#RTRANS` is
+# always followed by an identical `#TRANS`.
+IGNORED_VOUCHER_LABELS = {"#BTRANS", "#RTRANS"}
+
+
+def tokenize(line):
+    if '"' not in line and "{" not in line.replace("{}", ""):
+        return line.split()
+    tokens = []
+    for quoted, object_list, bare in TOKEN_RE.findall(line):
+        if bare:
+            tokens.append(bare)
+        elif object_list:
+            tokens.append(object_list)
+        else:
+            tokens.append(ESCAPE_RE.sub(r"\1", quoted))
+    return tokens
+
+
+def parse_date(value):
+    if len(value) != 8 or not value.isdigit():
+        raise ValueError(f"Invalid date: {value}")
+    return date(int(value[:4]), int(value[4:6]), int(value[6:]))
+
+
+def parse_amount(value):
+    """Parse an amount with at most two decimals into integer öre."""
+    return to_ore(Decimal(value))
+
+
+def parse_lines(lines, first_line=1):
+    """Yield records for an iterable of decoded SIE lines."""
+    voucher = None
+    in_block = False
+
+    for number, line in enumerate(lines, first_line):
+        tokens = tokenize(line)
+        if not tokens:
+            continue
+        label = tokens[0]
+
+        if voucher is not None:
+            if label == "{" and not in_block:
+                in_block = True
+                continue
+            if label == "}" and in_block:
+                yield voucher
+                voucher = None
+                in_block = False
+                continue
+            if in_block:
+                if label == "#TRANS":
+                    if voucher[0] == "voucher":
+                        voucher = _add_transaction(voucher, number, tokens)
+                elif label not in IGNORED_VOUCHER_LABELS:
+                    voucher = ("error", number, f"Unexpected {label} in voucher.")
+                continue
+            yield ("error", voucher[1], "Voucher is missing its { } block.")
+            voucher = None
+
+        if label == "#VER":
+            voucher = _parse_voucher(number, tokens)
+            if tokens[-1] == "{":
+                in_block = True
+        elif label == "#KONTO":
+            yield _parse_account(number, tokens)
+        elif label == "#RAR":
+            yield _parse_year(number, tokens)
+        elif label in ("{", "}", "#TRANS"):
+            yield ("error", number, f"Unexpected {label} outside a voucher.")
+
+    if voucher is not None:
+        yield ("error", voucher[1], "Voucher is not terminated.")
+
+
+def _parse_account(number, tokens):
+    try:
+        return ("account", number, int(tokens[1]), tokens[2])
+    except (IndexError, ValueError):
+        return ("error", number, "Malformed #KONTO.")
+
+
+def _parse_year(number, tokens):
+    try:
+        index = int(tokens[1])
+        return ("year", number, index, parse_date(tokens[2]), parse_date(tokens[3]))
+    except (IndexError, ValueError):
+        return ("error", number, "Malformed #RAR.")
+
+
+def _parse_voucher(number, tokens):
+    try:
+        series, voucher_number, voucher_date = tokens[1:4]
+        voucher_date = parse_date(voucher_date)
+    except ValueError:
+        return ("error", number, "Malformed #VER.")
+    text = tokens[4] if len(tokens) > 4 and tokens[4] != "{" else ""
+    return ("voucher", number, voucher_date, text or f"{series}{voucher_number}", [])
+
+
+def _add_transaction(voucher, number, tokens):
+    try:
+        code = int(tokens[1])
+        object_list = tokens[2]
+        amount = parse_amount(tokens[3])
+    except (IndexError, ValueError, InvalidOperation):
+        return ("error", number, "Malformed #TRANS.")
+    if not object_list.startswith("{"):
+        return ("error", number, "Malformed #TRANS.")
+    voucher[4].append((code, amount))
+    return voucher
+
+
+def read_lines(file, start=0, end=None):
+    """Yield decoded lines from the binary `file` between byte offsets."""
+    file.seek(start)
+    position = start
+    for raw in file:
+        if end is not None and position >= end:
+            break
+        position += len(raw)
+        yield raw.decode(SIE_ENCODING)
+
+
+def parse_range(path, start, end, first_line):
+    """Parse the byte range `[start, end)` of the file at `path`."""
+    with open(path, "rb") as file:
+        return list(parse_lines(read_lines(file, start, end), first_line))
+
+
+def split_file(path, chunk_size=PARSE_CHUNK_SIZE):
+    """
+    Split the file at `path` into `(start, end, first_line)` ranges of about
+    `chunk_size` bytes. Every range after the first starts at a `#VER` line,
+    so each one can be parsed on its own.
+    """
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as file:
+        while boundaries[-1] + chunk_size < size:
+            file.seek(boundaries[-1] + chunk_size)
+            file.readline()
+            while True:
+                offset = file.tell()
+                line = file.readline()
+                if not line:
+                    break
+                if line.startswith(b"#VER"):
+                    boundaries.append(offset)
+                    break
+            if not line:
+                break
+
+        ranges = []
+        line_number = 1
+        file.seek(0)
+        for start, end in zip(boundaries, boundaries[1:] + [size]):
+            ranges.append((start, end, line_number))
+            line_number += _count_newlines(file, end - start)
+    return ranges
+
+
+def _count_newlines(file, length, block_size=1024 * 1024):
+    count = 0
+    while length > 0:
+        block = file.read(min(block_size, length))
+        if not block:
+            break
+        count += block.count(b"\n")
+        length -= len(block)
+    return count
+
+
+def parse_file(path, workers=1, chunk_size=PARSE_CHUNK_SIZE):
+    """
+    Yield records for the SIE file at `path`, in file order. With more than one
+    worker, chunks are parsed in separate processes; at most two chunks per
+    worker are held in memory at a time.
+    """
+    if workers <= 1:
+        with open(path, "rb") as file:
+            yield from parse_lines(read_lines(file))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, end, first_line in split_file(path, chunk_size):
+            pending.append(pool.submit(parse_range, path, start, end, first_line))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,249 @@
+"""
+Content-addressed attachment storage.
+
+Every distinct file is stored once, as a `Blob` named after the SHA-256 of its
+content, and attachments refer to it. Uploading a file that is already stored
+only increments the blob's reference count; deleting an attachment decrements
+it, and the file is removed once no attachment refers to it.
+
+Uploads are hashed while Django's upload handlers stream them into memory or
+a temporary file (`FILE_UPLOAD_HANDLERS`), so storing a large upload reads it
+only once; files from other sources are hashed in chunks before they are
+stored. Attachments are linked to their blob by signal receivers, which
+covers the API, the admin and plain `Attachment.objects.create()`.
+
+Files are laid out two directory levels deep (`attachments/ab/cd/abcd...`,
+see `models.fan_out`) so that no directory grows large. Files stored flat in
+`attachments/` by earlier versions are moved by `fan_out_attachments`:
+each file is hard-linked under its new name, the rows are pointed at it and
+only then is the old name removed, so the file stays readable throughout.
+
+Attachments created before content addressing have no blob and keep their
+own file; `dedupe_attachments` moves them into blobs.
+
+A new blob's file is written before its row, and the file system does not
+roll back with the database. Attachments are therefore written in
+`atomic_storing_files()`, which deletes the files stored in it when it rolls
+back, so a failed write leaves no file without a blob row.
+"""
+
+import hashlib
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Attachment, Blob, fan_out
+
+# Names of the blob files stored in the current `atomic_storing_files()`
+_stored_files = ContextVar("stored_files", default=None)
+
+
+class HashingUploadHandlerMixin:
+    """
+    Computes the SHA-256 of an uploaded file from the chunks passing through
+    the handler and sets it as `sha256` on the completed file.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Set before super(), which raises StopFutureHandlers once activated
+        self.hash = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.hash.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(
+    HashingUploadHandlerMixin, MemoryFileUploadHandler
+):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(
+    HashingUploadHandlerMixin, TemporaryFileUploadHandler
+):
+    pass
+
+
+def file_digest(file):
+    """
+    Return the hex SHA-256 of `file`, using the digest computed by the upload
+    handlers when there is one.
+    """
+    digest = getattr(file, "sha256", None)
+    if digest is not None:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    file.seek(0)
+    return sha256.hexdigest()
+
+
+def store_blob(file):
+    """
+    Return the blob holding the content of `file` with one more reference,
+    storing the file if its content is new.
+    """
+    digest = file_digest(file)
+    if Blob.objects.filter(sha256=digest).update(ref_count=F("ref_count") + 1):
+        return Blob.objects.get(sha256=digest)
+
+    blob = Blob(sha256=digest, size=file.size, ref_count=1)
+    blob.file.save(os.path.basename(file.name), file, save=False)
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # The same content was stored concurrently; use that copy
+        blob.file.delete(save=False)
+        return store_blob(file)
+    stored = _stored_files.get()
+    if stored is not None:
+        stored.append(blob.file.name)
+    return blob
+
+
+@contextmanager
+def atomic_storing_files(using=None):
+    """
+    `transaction.atomic()` that deletes the blob files stored inside it if
+    it rolls back on an exception. A rollback of an enclosing transaction
+    after this block has exited is not seen.
+    """
+    stored = []
+    token = _stored_files.set(stored)
+    try:
+        with transaction.atomic(using=using):
+            yield
+    except BaseException:
+        storage = Blob._meta.get_field("file").storage
+        for name in stored:
+            storage.delete(name)
+        raise
+    finally:
+        _stored_files.reset(token)
+
+
+def release_blob(blob_id):
+    """
+    Drop one reference to a blob, deleting it and its file when it was the
+    last one. The file is removed once the transaction commits.
+    """
+    Blob.objects.filter(pk=blob_id).update(ref_count=F("ref_count") - 1)
+    name = Blob.objects.filter(pk=blob_id).values_list("file", flat=True).first()
+    # Conditional on the count, so a concurrent store_blob() that took a new
+    # reference keeps the blob
+    deleted, _ = Blob.objects.filter(pk=blob_id, ref_count=0).delete()
+    if deleted:
+        storage = Blob._meta.get_field("file").storage
+        transaction.on_commit(lambda: storage.delete(name))
+    return bool(deleted)
+
+
+def adopt_attachment_file(attachment):
+    """
+    Move the file of an attachment that has no blob into one, and delete the
+    attachment's own copy. Returns the blob. The attachment's file URL
+    changes, which clients holding its detail pick up when they revalidate.
+    """
+    old_name = attachment.file.name
+    with atomic_storing_files():
+        with attachment.file.open("rb") as file:
+            blob = store_blob(file)
+        Attachment.objects.filter(pk=attachment.pk).update(
+            blob=blob, file=blob.file.name
+        )
+        storage = attachment.file.storage
+        transaction.on_commit(lambda: storage.delete(old_name))
+    attachment.blob = blob
+    attachment.file = blob.file.name
+    return blob
+
+
+def link_stored_file(storage, name, new_name):
+    """
+    Make the stored file `name` also available as `new_name`, and return the
+    name it got. On the local filesystem this is a hard link, so nothing is
+    copied; other storages get a copy.
+    """
+    try:
+        path, new_path = storage.path(name), storage.path(new_name)
+    except NotImplementedError:
+        path = None
+    if path is not None:
+        if os.path.exists(new_path) and os.path.samefile(path, new_path):
+            # Linked by an earlier, interrupted run
+            return new_name
+        new_name = storage.get_available_name(new_name)
+        new_path = storage.path(new_name)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        try:
+            os.link(path, new_path)
+            return new_name
+        except OSError:
+            pass
+    with storage.open(name, "rb") as file:
+        return storage.save(new_name, file)
+
+
+def fan_out_file(instance):
+    """
+    Move the file of a blob, or of an attachment without one, into the
+    fan-out layout and point the rows using it at the new name. Returns
+    False when the file is already in place.
+    """
+    name = instance.file.name
+    new_name = fan_out(os.path.basename(name))
+    if name == new_name:
+        return False
+
+    storage = instance.file.storage
+    new_name = link_stored_file(storage, name, new_name)
+    with transaction.atomic():
+        moved = type(instance).objects.filter(pk=instance.pk).update(file=new_name)
+        if isinstance(instance, Blob):
+            Attachment.objects.filter(blob=instance).update(file=new_name)
+    if not moved:
+        # Deleted meanwhile
+        storage.delete(new_name)
+        return False
+    if isinstance(instance, Blob):
+        # Attachments that took a reference to the blob while it moved
+        Attachment.objects.filter(blob=instance, file=name).update(file=new_name)
+    storage.delete(name)
+    instance.file.name = new_name
+    return True
+
+
+@receiver(pre_save, sender=Attachment)
+def store_attachment_blob(instance, raw=False, **kwargs):
+    if raw or instance.blob_id is not None:
+        return
+    if not instance.file or instance.file._committed:
+        return
+    blob = store_blob(instance.file.file)
+    instance.blob = blob
+    instance.file = blob.file.name
+
+
+@receiver(post_delete, sender=Attachment)
+def release_attachment_blob(instance, **kwargs):
+    if instance.blob_id is not None:
+        release_blob(instance.blob_id)
@@ -0,0 +1,60 @@
+import pytest
+from rest_framework.test import APIClient
+from tx.models import Account, FinancialYear
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    # Stored files outlive the test transaction; keep them out of MEDIA_ROOT
+    settings.MEDIA_ROOT = tmp_path / "media"
+    return settings.MEDIA_ROOT
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def financial_year():
+    return FinancialYear.objects.create(start_date="2023-01-01", end_date="2023-12-31")
+
+
+@pytest.fixture
+def account():
+    return Account.objects.create(name="Test Account", code=1000)
+
+
+@pytest.fixture
+def event_data():
+    """
+    Return a builder for the payload of a balanced event that debits `debit`
+    and credits `credit` (the same account if not given) with `amount`.
+    """
+
+    def build(
+        debit,
+        credit=None,
+        amount="100.00",
+        date="2023-06-15",
+        description="Event",
+        financial_year=None,
+        **extra,
+    ):
+        data = {
+            "date": date,
+            "description": description,
+            "transactions": [
+                {"amount": amount, "account": debit.id, "direction": "debit"},
+                {
+                    "amount": amount,
+                    "account": (credit or debit).id,
+                    "direction": "credit",
+                },
+            ],
+        }
+        if financial_year is not None:
+            data["financial_year"] = financial_year.id
+        return {**data, **extra}
+
+    return build
@@ -0,0 +1,69 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework import status
+from tx.amounts import format_ore, from_ore, to_ore
+from tx.models import Transaction
+
+
+@pytest.mark.parametrize(
+    "value, ore",
+    [
+        ("100.50", 10050),
+        ("0.01", 1),
+        ("-0.05", -5),
+        ("12", 1200),
+        ("9999999999.99", 999999999999),
+    ],
+)
+def test_conversions(value, ore):
+    assert to_ore(Decimal(value)) == ore
+    assert from_ore(ore) == Decimal(value)
+    assert format_ore(ore) == f"{Decimal(value):.2f}"
+
+
+@pytest.mark.parametrize("value", ["0.005", "NaN", "Infinity"])
+def test_to_ore_rejects_invalid_amounts(value):
+    with pytest.raises(ValueError):
+        to_ore(Decimal(value))
+
+
+@pytest.mark.django_db
+def test_amounts_are_stored_in_ore(api_client, financial_year, account, event_data):
+    data = event_data(account, amount="1234.5", financial_year=financial_year)
+    data["transactions"][1]["amount"] = "1234.50"
+    response = api_client.post(reverse("event-list"), data, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert set(Transaction.objects.values_list("amount", flat=True)) == {123450}
+    assert [row["amount"] for row in response.data["transactions"]] == [
+        "1234.50",
+        "1234.50",
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("amount", ["10.005", "10000000000.00", "ten"])
+def test_invalid_amounts_are_rejected(
+    api_client, financial_year, account, event_data, amount
+):
+    response = api_client.post(
+        reverse("event-list"),
+        event_data(account, amount=amount, financial_year=financial_year),
+        format="json",
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "amount" in response.data["transactions"][0]
+
+
+@pytest.mark.django_db
+def test_unbalanced_error_shows_decimal_amounts(
+    api_client, financial_year, account, event_data
+):
+    data = event_data(account, amount="10.00", financial_year=financial_year)
+    data["transactions"][1]["amount"] = "9.99"
+    response = api_client.post(reverse("event-list"), data, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "(10.00)" in str(response.data) and "(9.99)" in str(response.data)
@@ -0,0 +1,130 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+from tx.models import Attachment, Event, Transaction
+
+
+@pytest.fixture
+def async_get():
+    client = AsyncClient()
+
+    def get(url, data=None, headers=None):
+        return async_to_sync(client.get)(url, data, headers=headers)
+
+    return get
+
+
+@pytest.fixture
+def events(financial_year, account):
+    created = []
+    for i, day in enumerate(["2023-06-16", "2023-06-15", "2023-06-15"]):
+        event = Event.objects.create(
+            date=day, description=f"Event {i}", financial_year=financial_year
+        )
+        Transaction.objects.create(
+            amount=10000, account=account, direction="debit", event=event
+        )
+        Transaction.objects.create(
+            amount=10000, account=account, direction="credit", event=event
+        )
+        Attachment.objects.create(
+            file=SimpleUploadedFile("receipt.pdf", b"receipt"), event=event
+        )
+        created.append(event)
+    return created
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "name, kwargs",
+    [
+        ("event-list", {}),
+        ("event-detail", {"pk": 1}),
+        ("financialyear-list", {}),
+        ("financialyear-detail", {"pk": 0}),
+        ("attachment-list", {}),
+        ("attachment-detail", {"pk": 2}),
+    ],
+)
+def test_async_views_match_viewsets(
+    api_client, async_get, events, financial_year, name, kwargs
+):
+    if "pk" in kwargs:
+        if name.startswith("event"):
+            kwargs = {"pk": events[kwargs["pk"]].id}
+        elif name.startswith("attachment"):
+            kwargs = {"pk": events[kwargs["pk"]].attachments.get().id}
+        else:
+            kwargs = {"pk": financial_year.id}
+
+    expected = api_client.get(reverse(name, kwargs=kwargs), format="json")
+    response = async_get(reverse(f"async-{name}", kwargs=kwargs))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/json"
+    if "results" in expected.data:
+        assert response.json()["results"] == expected.json()["results"]
+    else:
+        assert response.json() == expected.json()
+    assert response.get("Cache-Control") == expected.get("Cache-Control")
+
+
+@pytest.mark.django_db
+def test_async_event_list_pages_and_filters(async_get, events):
+    url = reverse("async-event-list")
+    seen = []
+    next_url, params = url, {"page_size": 2, "date__lte": "2023-06-15"}
+    while next_url:
+        response = async_get(next_url, params)
+        assert response.status_code == status.HTTP_200_OK
+        seen += [event["id"] for event in response.json()["results"]]
+        next_url, params = response.json()["next"], None
+
+    assert seen == [events[1].id, events[2].id]
+
+    response = async_get(url, {"date__lte": "tomorrow"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "date__lte" in response.json()
+    response = async_get(url, {"cursor": "garbage"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_async_event_detail_conditional_get(
+    async_get, events, django_assert_num_queries
+):
+    url = reverse("async-event-detail", kwargs={"pk": events[0].id})
+    response = async_get(url)
+    assert response.status_code == status.HTTP_200_OK
+
+    # ETag only
+    with django_assert_num_queries(1):
+        cached = async_get(url, headers={"If-None-Match": response["ETag"]})
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached["ETag"] == response["ETag"]
+
+    Attachment.objects.create(
+        file=SimpleUploadedFile("invoice.pdf", b"invoice"), event=events[0]
+    )
+    changed = async_get(url, headers={"If-None-Match": response["ETag"]})
+    assert changed.status_code == status.HTTP_200_OK
+    assert len(changed.json()["attachments"]) == 2
+
+
+@pytest.mark.django_db
+def test_async_views_not_found(async_get):
+    for name in ["event", "financialyear", "attachment"]:
+        response = async_get(reverse(f"async-{name}-detail", kwargs={"pk": 999}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "detail" in response.json()
+
+
+@pytest.mark.django_db
+def test_async_event_list_query_budget(async_get, events, django_assert_num_queries):
+    # events, attachment ids (ETag), transactions, attachments
+    with django_assert_num_queries(4):
+        response = async_get(reverse("async-event-list"))
+    assert len(response.json()["results"]) == 3
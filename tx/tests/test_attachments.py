@@ -1,21 +1,13 @@
+import hashlib
+import io
 import os
-import tempfile
 import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
-from rest_framework.test import APIClient
+from django.core.management import call_command
 from rest_framework import status
 from django.urls import reverse
-from tx.models import Event, FinancialYear, Account, Attachment
-
-
-@pytest.fixture
-def financial_year():
-    return FinancialYear.objects.create(start_date="2023-01-01", end_date="2023-12-31")
-
-
-@pytest.fixture
-def account():
-    return Account.objects.create(name="Test Account", code=1000)
+from tx.models import Event, Attachment, Blob
+from tx.storage import HashingTemporaryFileUploadHandler, atomic_storing_files
 
 
 @pytest.fixture
@@ -25,11 +17,6 @@ def event(financial_year):
     )
 
 
-@pytest.fixture
-def api_client():
-    return APIClient()
-
-
 @pytest.mark.django_db
 def test_attachment_creation(event):
     file_content = b"test file content"
@@ -47,7 +34,7 @@ def test_attachment_creation(event):
 
 
 @pytest.mark.django_db
-def test_attachment_upload_path_with_uuid(event):
+def test_attachment_upload_path_with_content_hash(event):
     file_content = b"test file content"
     uploaded_file = SimpleUploadedFile(
         "receipt.jpg", file_content, content_type="image/jpeg"
@@ -61,7 +48,13 @@ def test_attachment_upload_path_with_uuid(event):
 
     filename = os.path.basename(file_path)
     name_without_ext = os.path.splitext(filename)[0]
-    assert len(name_without_ext) == 36
+    assert name_without_ext == hashlib.sha256(file_content).hexdigest()
+    # Fanned out over two directory levels
+    assert file_path == os.path.join(
+        "attachments", filename[:2], filename[2:4], filename
+    )
+    assert attachment.blob.sha256 == name_without_ext
+    assert attachment.blob.size == len(file_content)
 
 
 @pytest.mark.django_db
@@ -78,8 +71,7 @@ def test_attachment_str_representation(event):
 
 
 @pytest.mark.django_db
-def test_upload_attachment(api_client, event, settings):
-    settings.MEDIA_ROOT = tempfile.mkdtemp()
+def test_upload_attachment(api_client, event):
 
     url = reverse("attachment-list")
     file_content = b"test file content"
@@ -111,8 +103,8 @@ def test_list_attachments(api_client, event):
     response = api_client.get(url)
 
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) == 1
-    assert response.data[0]["event"] == event.id
+    assert len(response.data["results"]) == 1
+    assert response.data["results"][0]["event"] == event.id
 
 
 @pytest.mark.django_db
@@ -147,3 +139,212 @@ def test_event_includes_attachments(api_client, event):
     assert response.status_code == status.HTTP_200_OK
     assert "attachments" in response.data
     assert len(response.data["attachments"]) == 1
+
+
+def upload(api_client, event, content, name="receipt.pdf"):
+    response = api_client.post(
+        reverse("attachment-list"),
+        {"file": SimpleUploadedFile(name, content), "event": event.id},
+        format="multipart",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return Attachment.objects.get(pk=response.data["id"])
+
+
+@pytest.mark.django_db
+def test_duplicate_uploads_share_one_file(
+    api_client, event, settings, django_capture_on_commit_callbacks
+):
+    first = upload(api_client, event, b"%PDF receipt")
+    second = upload(api_client, event, b"%PDF receipt", name="copy.pdf")
+    other = upload(api_client, event, b"%PDF invoice")
+
+    assert first.file.name == second.file.name
+    assert first.blob_id == second.blob_id != other.blob_id
+    assert Blob.objects.get(pk=first.blob_id).ref_count == 2
+    assert len(os.listdir(os.path.join(settings.MEDIA_ROOT, "attachments"))) == 2
+
+    # The file stays while another attachment refers to it
+    path = first.file.path
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.delete(
+            reverse("attachment-detail", kwargs={"pk": first.id})
+        )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert Blob.objects.get(pk=second.blob_id).ref_count == 1
+    assert os.path.exists(path)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.delete(
+            reverse("attachment-detail", kwargs={"pk": second.id})
+        )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert not Blob.objects.filter(pk=second.blob_id).exists()
+    assert not os.path.exists(path)
+    assert os.path.exists(other.file.path)
+
+
+@pytest.mark.django_db
+def test_deleting_event_releases_attachment_files(
+    event, django_capture_on_commit_callbacks
+):
+    attachment = Attachment.objects.create(
+        file=SimpleUploadedFile("receipt.pdf", b"receipt"), event=event
+    )
+    path = attachment.file.path
+
+    with django_capture_on_commit_callbacks(execute=True):
+        event.delete()
+
+    assert not Blob.objects.exists()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.django_db
+def test_rolled_back_attachment_leaves_no_file(event):
+    storage = Blob._meta.get_field("file").storage
+    with pytest.raises(RuntimeError):
+        with atomic_storing_files():
+            attachment = Attachment.objects.create(
+                file=SimpleUploadedFile("receipt.pdf", b"receipt"), event=event
+            )
+            assert storage.exists(attachment.file.name)
+            raise RuntimeError("write failed")
+
+    assert not Blob.objects.exists()
+    assert not storage.exists(attachment.file.name)
+
+
+def test_upload_handler_hashes_chunks():
+    handler = HashingTemporaryFileUploadHandler()
+    handler.new_file("file", "receipt.pdf", "application/pdf", None)
+    content = b"%PDF" + b"x" * 100000
+    for start in range(0, len(content), 4096):
+        handler.receive_data_chunk(content[start : start + 4096], start)
+    file = handler.file_complete(len(content))
+
+    assert file.sha256 == hashlib.sha256(content).hexdigest()
+    file.seek(0)
+    assert file.read() == content
+
+
+@pytest.mark.django_db
+def test_dedupe_attachments_command(event, django_capture_on_commit_callbacks):
+    # bulk_create sends no signals, like attachments stored before content
+    # addressing: each has its own copy under a UUID name
+    Attachment.objects.bulk_create(
+        Attachment(file=SimpleUploadedFile("receipt.pdf", content), event=event)
+        for content in [b"receipt", b"receipt", b"invoice"]
+    )
+    old_paths = [attachment.file.path for attachment in Attachment.objects.all()]
+
+    stdout = io.StringIO()
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("dedupe_attachments", "--batch-size", "2", stdout=stdout)
+
+    assert "Moved 3 attachments into blobs, 1 of them duplicates" in stdout.getvalue()
+    assert sorted(Blob.objects.values_list("ref_count", flat=True)) == [1, 2]
+    assert not any(os.path.exists(path) for path in old_paths)
+    for attachment in Attachment.objects.all():
+        assert attachment.file.name == attachment.blob.file.name
+        with attachment.file.open("rb") as file:
+            assert hashlib.sha256(file.read()).hexdigest() == attachment.blob.sha256
+
+
+@pytest.mark.django_db
+def test_fan_out_attachments_command(event, settings):
+    storage = Attachment._meta.get_field("file").storage
+    # Files stored flat in attachments/ by earlier versions: a blob shared by
+    # two attachments and an attachment from before content addressing
+    content = b"receipt"
+    digest = hashlib.sha256(content).hexdigest()
+    blob = Blob.objects.create(
+        sha256=digest,
+        file=storage.save(f"attachments/{digest}.pdf", io.BytesIO(content)),
+        size=len(content),
+        ref_count=2,
+    )
+    legacy_name = storage.save(
+        "attachments/0b6e4f0a-9d1c-4b7e-8f55-1f0f3d2c9a7e.pdf", io.BytesIO(b"invoice")
+    )
+    Attachment.objects.bulk_create(
+        [
+            Attachment(file=blob.file.name, blob=blob, event=event),
+            Attachment(file=blob.file.name, blob=blob, event=event),
+            Attachment(file=legacy_name, event=event),
+        ]
+    )
+
+    # An earlier run was interrupted after linking the blob's new name
+    new_path = os.path.join(
+        settings.MEDIA_ROOT, "attachments", digest[:2], digest[2:4], f"{digest}.pdf"
+    )
+    os.makedirs(os.path.dirname(new_path))
+    os.link(blob.file.path, new_path)
+
+    stdout = io.StringIO()
+    call_command("fan_out_attachments", "--batch-size", "1", stdout=stdout)
+    assert "Moved 2 files; 0 were already in place" in stdout.getvalue()
+
+    blob.refresh_from_db()
+    assert blob.file.name == f"attachments/{digest[:2]}/{digest[2:4]}/{digest}.pdf"
+    assert set(Attachment.objects.values_list("file", flat=True)) == {
+        blob.file.name,
+        "attachments/0b/6e/0b6e4f0a-9d1c-4b7e-8f55-1f0f3d2c9a7e.pdf",
+    }
+    for attachment in Attachment.objects.all():
+        with attachment.file.open("rb") as file:
+            assert file.read() in (b"receipt", b"invoice")
+    assert not storage.exists(f"attachments/{digest}.pdf")
+    assert not storage.exists(legacy_name)
+
+    # Running it again finds everything in place
+    stdout = io.StringIO()
+    call_command("fan_out_attachments", stdout=stdout)
+    assert "Moved 0 files; 2 were already in place" in stdout.getvalue()
+
+
+def revalidated_file(api_client, url, response, settings):
+    """
+    Revalidate a cached attachment detail as a client would, and return the
+    name in storage of the file URL it then holds.
+    """
+    assert "immutable" not in response["Cache-Control"]
+    assert "no-cache" in response["Cache-Control"]
+    fresh = api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert fresh.status_code == status.HTTP_200_OK
+    assert fresh.data["file"] != response.data["file"]
+    return fresh.data["file"].split(settings.MEDIA_URL, 1)[1]
+
+
+@pytest.mark.django_db
+def test_fan_out_attachments_revalidates_cached_details(api_client, event, settings):
+    storage = Attachment._meta.get_field("file").storage
+    name = storage.save(
+        "attachments/0b6e4f0a-9d1c-4b7e-8f55-1f0f3d2c9a7e.pdf", io.BytesIO(b"invoice")
+    )
+    [attachment] = Attachment.objects.bulk_create([Attachment(file=name, event=event)])
+    url = reverse("attachment-detail", kwargs={"pk": attachment.id})
+    cached = api_client.get(url)
+
+    call_command("fan_out_attachments", stdout=io.StringIO())
+
+    assert storage.exists(revalidated_file(api_client, url, cached, settings))
+
+
+@pytest.mark.django_db
+def test_dedupe_attachments_revalidates_cached_details(
+    api_client, event, settings, django_capture_on_commit_callbacks
+):
+    [attachment] = Attachment.objects.bulk_create(
+        [Attachment(file=SimpleUploadedFile("receipt.pdf", b"receipt"), event=event)]
+    )
+    url = reverse("attachment-detail", kwargs={"pk": attachment.id})
+    cached = api_client.get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("dedupe_attachments", stdout=io.StringIO())
+
+    storage = Attachment._meta.get_field("file").storage
+    assert not storage.exists(attachment.file.name)
+    assert storage.exists(revalidated_file(api_client, url, cached, settings))
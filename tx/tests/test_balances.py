@@ -0,0 +1,262 @@
+import io
+import random
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework import status
+from tx.balances import verify_balances, verify_checkpoints
+from tx.models import (
+    AccountBalance,
+    Event,
+    Account,
+    Transaction,
+)
+
+
+@pytest.fixture
+def cash():
+    return Account.objects.create(name="Cash", code=1930)
+
+
+@pytest.fixture
+def sales():
+    return Account.objects.create(name="Sales", code=3001)
+
+
+def stored_balances():
+    return {
+        balance.account.code: (balance.debit, balance.credit)
+        for balance in AccountBalance.objects.select_related("account")
+    }
+
+
+@pytest.mark.django_db
+def test_event_create_updates_balances(
+    api_client, financial_year, cash, sales, event_data
+):
+    url = reverse("event-list")
+    api_client.post(
+        url,
+        event_data(cash, sales, "100.00", financial_year=financial_year),
+        format="json",
+    )
+    api_client.post(
+        url,
+        event_data(sales, cash, "30.50", financial_year=financial_year),
+        format="json",
+    )
+
+    assert stored_balances() == {
+        1930: (10000, 3050),
+        3001: (3050, 10000),
+    }
+    balance = AccountBalance.objects.get(account=cash)
+    assert balance.balance == 6950
+    assert verify_balances() == []
+
+
+@pytest.mark.django_db
+def test_bulk_create_updates_balances(
+    api_client, financial_year, cash, sales, event_data
+):
+    data = [
+        event_data(cash, sales, "10.00", financial_year=financial_year)
+        for _ in range(3)
+    ]
+
+    response = api_client.post(reverse("event-bulk"), data, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert stored_balances() == {
+        1930: (3000, 0),
+        3001: (0, 3000),
+    }
+
+
+@pytest.mark.django_db
+def test_failed_event_create_leaves_balances(
+    api_client, financial_year, cash, sales, event_data
+):
+    data = event_data(cash, sales, "10.00", financial_year=financial_year)
+    data["transactions"][1]["amount"] = "5.00"
+
+    response = api_client.post(reverse("event-list"), data, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not AccountBalance.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rebuild_balances_command(financial_year, cash, sales):
+    event = Event.objects.create(
+        date="2023-06-15", description="Sale", financial_year=financial_year
+    )
+    Transaction.objects.create(
+        amount=4000, account=cash, direction="debit", event=event
+    )
+    Transaction.objects.create(
+        amount=4000, account=sales, direction="credit", event=event
+    )
+
+    stderr = io.StringIO()
+    with pytest.raises(CommandError):
+        call_command("rebuild_balances", "--verify", stderr=stderr)
+    assert "Account" in stderr.getvalue()
+
+    call_command("rebuild_balances", stdout=io.StringIO())
+    assert verify_checkpoints() == []
+
+    assert stored_balances() == {
+        1930: (4000, 0),
+        3001: (0, 4000),
+    }
+    stdout = io.StringIO()
+    call_command("rebuild_balances", "--verify", stdout=stdout)
+    assert "up to date" in stdout.getvalue()
+
+
+def checkpoints(account):
+    return [
+        (checkpoint.date.isoformat(), checkpoint.debit, checkpoint.credit)
+        for checkpoint in account.balance_checkpoints.order_by("date")
+    ]
+
+
+@pytest.mark.django_db
+def test_checkpoints_roll_forward(api_client, financial_year, cash, sales, event_data):
+    url = reverse("event-list")
+    for amount, day in [("100.00", "2023-03-10"), ("50.00", "2023-05-20")]:
+        api_client.post(
+            url,
+            event_data(cash, sales, amount, day, financial_year=financial_year),
+            format="json",
+        )
+    assert checkpoints(cash) == [
+        ("2023-03-31", 10000, 0),
+        ("2023-05-31", 15000, 0),
+    ]
+
+    # A late event in an earlier month rolls every later checkpoint forward
+    api_client.post(
+        url,
+        event_data(sales, cash, "30.00", "2023-04-01", financial_year=financial_year),
+        format="json",
+    )
+    api_client.post(
+        url,
+        event_data(cash, sales, "5.00", "2023-03-01", financial_year=financial_year),
+        format="json",
+    )
+    assert checkpoints(cash) == [
+        ("2023-03-31", 10500, 0),
+        ("2023-04-30", 10500, 3000),
+        ("2023-05-31", 15500, 3000),
+    ]
+    assert verify_checkpoints() == []
+
+
+@pytest.mark.django_db
+def test_batched_updates_match_rebuild(api_client, financial_year, event_data):
+    rng = random.Random(1)
+    accounts = [
+        Account.objects.create(name=f"Account {code}", code=code)
+        for code in (1910, 1930, 2440, 3001, 5010)
+    ]
+
+    for _ in range(4):
+        data = []
+        for _ in range(15):
+            debit, credit = rng.sample(accounts, 2)
+            day = f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            amount = f"{rng.randint(1, 5000)}.{rng.randint(0, 99):02d}"
+            data.append(
+                event_data(debit, credit, amount, day, financial_year=financial_year)
+            )
+        response = api_client.post(reverse("event-bulk"), data, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        assert verify_balances() == []
+        assert verify_checkpoints() == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "day, expected",
+    [
+        ("2023-02-28", "0.00"),
+        ("2023-03-09", "0.00"),
+        ("2023-03-10", "100.00"),
+        ("2023-03-31", "100.00"),
+        ("2023-05-19", "100.00"),
+        ("2023-05-20", "150.00"),
+        ("2024-01-01", "150.00"),
+    ],
+)
+def test_account_balance_at_date(
+    api_client, financial_year, cash, sales, day, expected, event_data
+):
+    url = reverse("event-list")
+    for amount, event_day in [("100.00", "2023-03-10"), ("50.00", "2023-05-20")]:
+        api_client.post(
+            url,
+            event_data(cash, sales, amount, event_day, financial_year=financial_year),
+            format="json",
+        )
+
+    response = api_client.get(
+        reverse("account-balance", kwargs={"pk": cash.id}), {"date": day}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["balance"] == expected
+    assert response.data["credit"] == "0.00"
+
+
+@pytest.mark.django_db
+def test_account_balance_query_budget(
+    api_client, financial_year, cash, sales, django_assert_num_queries, event_data
+):
+    api_client.post(
+        reverse("event-list"),
+        event_data(cash, sales, "10.00", "2023-03-10", financial_year=financial_year),
+        format="json",
+    )
+    url = reverse("account-balance", kwargs={"pk": cash.id})
+    # account, checkpoint
+    with django_assert_num_queries(2):
+        api_client.get(url, {"date": "2023-03-31"})
+    # account, checkpoint, transactions in the month
+    with django_assert_num_queries(3):
+        api_client.get(url, {"date": "2023-04-15"})
+
+
+@pytest.mark.django_db
+def test_account_balance_requires_date(api_client, cash):
+    response = api_client.get(reverse("account-balance", kwargs={"pk": cash.id}))
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_list_accounts(api_client, cash, sales):
+    response = api_client.get(reverse("account-list"))
+    assert response.status_code == status.HTTP_200_OK
+    assert [account["code"] for account in response.data] == [1930, 3001]
+
+
+@pytest.mark.django_db
+def test_bulk_create_touching_many_accounts(api_client, financial_year, event_data):
+    # More OR terms than SQLite allows in one expression tree
+    accounts = Account.objects.bulk_create(
+        Account(name=f"Account {code}", code=code) for code in range(10000, 11200)
+    )
+    for day in ["2023-06-15", "2023-03-15"]:
+        data = [
+            event_data(debit, credit, "10.00", day, financial_year=financial_year)
+            for debit, credit in zip(accounts[::2], accounts[1::2])
+        ]
+        response = api_client.post(reverse("event-bulk"), data, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+
+    assert verify_balances() == []
+    assert verify_checkpoints() == []
@@ -0,0 +1,104 @@
+import pytest
+from tx.balances import sum_direction, verify_balances, verify_checkpoints
+from tx.benchmarks.generator import generate_ledger
+from tx.benchmarks.scenarios import (
+    SCENARIOS,
+    BenchmarkContext,
+    compare,
+    run_benchmarks,
+)
+from tx.benchmarks.serialization import run_serialization
+from tx.benchmarks.throughput import ENDPOINTS, run_throughput, run_write_throughput
+from tx.models import Event, FinancialYear, Transaction
+
+
+@pytest.mark.django_db
+def test_generate_ledger():
+    dataset = generate_ledger(300, years=2, first_year=2023)
+
+    assert dataset["events"] == Event.objects.count() == 300
+    assert dataset["transactions"] == Transaction.objects.count()
+    assert FinancialYear.objects.count() == 2
+    totals = Transaction.objects.aggregate(
+        debit=sum_direction("debit"), credit=sum_direction("credit")
+    )
+    assert totals["debit"] == totals["credit"]
+    assert not Event.objects.exclude(
+        date__year=2023, financial_year__start_date__year=2023
+    ).exclude(date__year=2024, financial_year__start_date__year=2024)
+    assert verify_balances() == []
+    assert verify_checkpoints() == []
+
+
+@pytest.mark.django_db
+def test_generate_ledger_is_deterministic():
+    generate_ledger(50, years=1, seed=7)
+    first = list(Transaction.objects.order_by("id").values_list("amount", flat=True))
+    Event.objects.all().delete()
+    FinancialYear.objects.all().delete()
+
+    generate_ledger(50, years=1, seed=7)
+    second = list(Transaction.objects.order_by("id").values_list("amount", flat=True))
+    assert first == second
+
+
+@pytest.mark.django_db
+def test_run_benchmarks():
+    dataset = generate_ledger(100, years=3)
+
+    results = run_benchmarks(dataset, iterations=1)
+
+    assert results["dataset"] == dataset
+    assert set(results["scenarios"]) == {name for name, _, _ in SCENARIOS}
+    for result in results["scenarios"].values():
+        assert result["p50_ms"] <= result["p99_ms"]
+        assert result["queries"] > 0
+
+    slower = {
+        "scenarios": {
+            name: dict(result, p50_ms=result["p50_ms"] * 2)
+            for name, result in results["scenarios"].items()
+        }
+    }
+    regressed = [row[0] for row in compare(results, slower, 0.2) if row[4]]
+    assert regressed == list(results["scenarios"])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_throughput():
+    generate_ledger(100, years=3)
+
+    results = run_throughput(
+        BenchmarkContext(), requests=6, concurrency=3, threads=2, client_delay=0
+    )
+
+    assert set(results["endpoints"]) == {name for name, _, _, _ in ENDPOINTS}
+    for result in results["endpoints"].values():
+        assert set(result) == {"wsgi", "asgi", "asgi_async_views"}
+        assert all(rate > 0 for rate in result.values())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_write_throughput():
+    generate_ledger(100, years=3)
+    events = Event.objects.count()
+
+    results = run_write_throughput(BenchmarkContext(), requests=4, concurrency=1)
+
+    for name in ["direct", "group_commit"]:
+        assert results[name]["created"] == 4
+        assert results[name]["failed"] == 0
+    assert Event.objects.count() == events + 8
+    assert verify_balances() == []
+
+
+@pytest.mark.django_db
+def test_run_serialization():
+    generate_ledger(50, years=1)
+
+    results = run_serialization(page_size=20, iterations=2)
+
+    assert results["events"] == 20
+    for path in ["serializer", "fast_path"]:
+        assert set(results[path]) == {"serialize", "load_and_serialize"}
+    assert all(speedup > 0 for speedup in results["speedup"].values())
@@ -0,0 +1,133 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework import status
+from tx.models import Account, Attachment, Event, Transaction
+
+
+@pytest.fixture
+def event(financial_year):
+    account = Account.objects.create(name="Cash", code=1930)
+    event = Event.objects.create(
+        date="2023-06-15", description="Sale", financial_year=financial_year
+    )
+    for direction in ["debit", "credit"]:
+        Transaction.objects.create(
+            amount=10000, account=account, direction=direction, event=event
+        )
+    return event
+
+
+def attach(event):
+    return Attachment.objects.create(
+        file=SimpleUploadedFile("receipt.pdf", b"receipt"), event=event
+    )
+
+
+def revalidate(api_client, url, response, **params):
+    return api_client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+
+
+@pytest.mark.django_db
+def test_event_detail_not_modified(api_client, event, django_assert_num_queries):
+    url = reverse("event-detail", kwargs={"pk": event.id})
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"].startswith('"')
+    assert response["Cache-Control"] == "private, no-cache"
+
+    # ETag only
+    with django_assert_num_queries(1):
+        cached = revalidate(api_client, url, response)
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.content == b""
+    assert cached["ETag"] == response["ETag"]
+
+
+@pytest.mark.django_db
+def test_event_detail_changes_with_attachments(api_client, event):
+    url = reverse("event-detail", kwargs={"pk": event.id})
+    response = api_client.get(url)
+
+    attachment = attach(event)
+    added = revalidate(api_client, url, response)
+    assert added.status_code == status.HTTP_200_OK
+    assert added["ETag"] != response["ETag"]
+    assert added.data["attachments"] == ["Attachment for Sale"]
+
+    attachment.delete()
+    removed = revalidate(api_client, url, added)
+    assert removed.status_code == status.HTTP_200_OK
+    assert removed.data["attachments"] == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("pk", ["999", "abc"])
+def test_event_detail_missing(api_client, event, pk):
+    response = api_client.get(reverse("event-detail", kwargs={"pk": pk}))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_event_list_not_modified(
+    api_client, event, financial_year, django_assert_num_queries
+):
+    url = reverse("event-list")
+    response = api_client.get(url, {"page_size": 1})
+    assert response.status_code == status.HTTP_200_OK
+
+    # events, attachment ids
+    with django_assert_num_queries(2):
+        cached = revalidate(api_client, url, response, page_size=1)
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # The ETag is per page
+    assert api_client.get(url)["ETag"] != response["ETag"]
+
+    # A later event adds a next link to the first page
+    Event.objects.create(
+        date="2023-07-01", description="Later", financial_year=financial_year
+    )
+    changed = revalidate(api_client, url, response, page_size=1)
+    assert changed.status_code == status.HTTP_200_OK
+    assert changed.data["next"] is not None
+
+    attach(event)
+    assert revalidate(api_client, url, changed, page_size=1).status_code == 200
+
+
+@pytest.mark.django_db
+def test_attachment_detail_is_revalidated(api_client, event):
+    attachment = attach(event)
+    url = reverse("attachment-detail", kwargs={"pk": attachment.id})
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    # The file URL changes when attachment storage is reorganized
+    assert response["Cache-Control"] == "private, no-cache"
+    cached = revalidate(api_client, url, response)
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached["Cache-Control"] == response["Cache-Control"]
+
+
+@pytest.mark.django_db
+def test_attachment_list_changes_on_delete(api_client, event):
+    attachments = [attach(event), attach(event)]
+    url = reverse("attachment-list")
+    response = api_client.get(url)
+    assert revalidate(api_client, url, response).status_code == 304
+
+    api_client.delete(reverse("attachment-detail", kwargs={"pk": attachments[0].id}))
+    changed = revalidate(api_client, url, response)
+    assert changed.status_code == status.HTTP_200_OK
+    assert len(changed.data["results"]) == 1
+
+
+@pytest.mark.django_db
+def test_etag_depends_on_renderer(api_client, event):
+    url = reverse("event-detail", kwargs={"pk": event.id})
+    json = api_client.get(url, {"format": "json"})
+    browsable = api_client.get(url, {"format": "api"})
+    assert json["ETag"] != browsable["ETag"]
+    assert "Accept" in json["Vary"]
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from tx.downloads import RangeNotSatisfiable, parse_range, stream_file
+from tx.models import Attachment, Event, FinancialYear
+
+CONTENT = bytes(range(256)) * 1024
+
+
+@pytest.fixture
+def attachment():
+    financial_year = FinancialYear.objects.create(
+        start_date="2023-01-01", end_date="2023-12-31"
+    )
+    event = Event.objects.create(
+        date="2023-06-15", description="Annual report", financial_year=financial_year
+    )
+    return Attachment.objects.create(
+        file=SimpleUploadedFile("report.pdf", CONTENT), event=event
+    )
+
+
+def download(api_client, attachment, **headers):
+    return api_client.get(
+        reverse("attachment-download", kwargs={"pk": attachment.id}), headers=headers
+    )
+
+
+def body(response):
+    return b"".join(response.streaming_content)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=900-5000", (900, 999)),
+        ("bytes=-10", (990, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=5-4", None),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+        ("bytes=-", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 1000)
+
+
+@pytest.mark.django_db
+def test_download(api_client, attachment, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        response = download(api_client, attachment)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert body(response) == CONTENT
+    assert response["Content-Length"] == str(len(CONTENT))
+    assert response["Content-Type"] == "application/pdf"
+    assert response["Accept-Ranges"] == "bytes"
+    assert response["ETag"] == f'"{hashlib.sha256(CONTENT).hexdigest()}"'
+    assert "immutable" in response["Cache-Control"]
+    assert (
+        response["Content-Disposition"]
+        == f'attachment; filename="attachment-{attachment.id}.pdf"'
+    )
+
+
+@pytest.mark.django_db
+def test_download_streams_file_object(attachment):
+    # A real file, which WSGI servers send with sendfile() through
+    # wsgi.file_wrapper (the test client consumes it as an iterator)
+    request = RequestFactory().get("/")
+    response = stream_file(request, attachment.file, '"etag"', "report.pdf")
+    assert response.file_to_stream.fileno()
+    response.close()
+
+
+@pytest.mark.django_db
+def test_download_range(api_client, attachment):
+    response = download(api_client, attachment, Range="bytes=1000-1999")
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert body(response) == CONTENT[1000:2000]
+    assert response["Content-Length"] == "1000"
+    assert response["Content-Range"] == f"bytes 1000-1999/{len(CONTENT)}"
+
+    response = download(api_client, attachment, Range="bytes=-100")
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert body(response) == CONTENT[-100:]
+
+    response = download(api_client, attachment, Range="bytes=0-1,5-6")
+    assert response.status_code == status.HTTP_200_OK
+    assert body(response) == CONTENT
+
+    response = download(api_client, attachment, Range=f"bytes={len(CONTENT)}-")
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+@pytest.mark.django_db
+def test_download_resume_and_conditional_get(api_client, attachment):
+    etag = download(api_client, attachment)["ETag"]
+
+    response = download(api_client, attachment, Range="bytes=500-", If_Range=etag)
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert body(response) == CONTENT[500:]
+
+    # A different file: start over
+    response = download(api_client, attachment, Range="bytes=500-", If_Range='"x"')
+    assert response.status_code == status.HTTP_200_OK
+    assert body(response) == CONTENT
+
+    response = download(api_client, attachment, If_None_Match=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["ETag"] == etag
+
+
+@pytest.mark.django_db
+def test_download_offloaded_to_proxy(api_client, attachment, settings):
+    settings.ATTACHMENT_SENDFILE = "x-accel-redirect"
+    response = download(api_client, attachment, Range="bytes=0-9")
+    assert response.status_code == status.HTTP_200_OK
+    assert response["X-Accel-Redirect"] == f"/protected-media/{attachment.file.name}"
+    assert "Content-Type" not in response
+    assert response.content == b""
+    assert response["ETag"]
+
+    settings.ATTACHMENT_SENDFILE = "x-sendfile"
+    response = download(api_client, attachment)
+    assert response["X-Sendfile"] == attachment.file.path
+
+
+@pytest.mark.django_db
+def test_download_missing(api_client, attachment):
+    os.remove(attachment.file.path)
+    response = download(api_client, attachment)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = api_client.get(reverse("attachment-download", kwargs={"pk": 999}))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_download_non_numeric_id(api_client):
+    response = api_client.get("/attachments/abc/download/")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,178 @@
+import datetime
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from tx.models import Account, Event, FinancialYear, Transaction
+
+
+@pytest.fixture
+def ledger():
+    """
+    Three financial years of 1000 events each, two transactions per event
+    spread over 50 accounts, with every year imported on its last day.
+    """
+    years = [
+        FinancialYear.objects.create(
+            start_date=f"{year}-01-01", end_date=f"{year}-12-31"
+        )
+        for year in (2022, 2023, 2024)
+    ]
+    accounts = Account.objects.bulk_create(
+        Account(name=f"Account {code}", code=code) for code in range(1000, 1050)
+    )
+    events = Event.objects.bulk_create(
+        Event(
+            date=datetime.date.fromisoformat(year.start_date)
+            + datetime.timedelta(days=i % 365),
+            description=f"Event {i}",
+            financial_year=year,
+        )
+        for year in years
+        for i in range(1000)
+    )
+    Transaction.objects.bulk_create(
+        Transaction(
+            amount=10000,
+            account=accounts[(i + side) % len(accounts)],
+            direction=direction,
+            event=event,
+        )
+        for i, event in enumerate(events)
+        for side, direction in enumerate(["debit", "credit"])
+    )
+    for year in years:
+        Event.objects.filter(financial_year=year).update(
+            created_at=f"{year.end_date}T12:00:00Z"
+        )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return years, accounts
+
+
+def list_ids(api_client, params):
+    ids = []
+    url = reverse("event-list")
+    while url:
+        response = api_client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        ids += [event["id"] for event in response.data["results"]]
+        url, params = response.data["next"], None
+    return ids
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@pytest.mark.django_db
+def test_filter_events(api_client, ledger):
+    years, accounts = ledger
+    params = {
+        "financial_year": years[1].id,
+        "date__gte": "2023-03-01",
+        "date__lte": "2023-03-31",
+        "account": accounts[3].id,
+    }
+    expected = Event.objects.filter(
+        financial_year=years[1],
+        date__range=("2023-03-01", "2023-03-31"),
+        transactions__account=accounts[3],
+    ).order_by("date", "id")
+
+    assert list_ids(api_client, params) == [event.id for event in expected]
+    assert len(expected) > 0
+
+
+@pytest.mark.django_db
+def test_filter_events_by_created_at(api_client, ledger):
+    years, _ = ledger
+    params = {
+        "created_at__gte": "2023-12-31T00:00:00Z",
+        "created_at__lte": "2023-12-31T23:59:59Z",
+    }
+    expected = Event.objects.filter(financial_year=years[1]).order_by("date", "id")
+
+    assert list_ids(api_client, params) == [event.id for event in expected]
+
+
+@pytest.mark.django_db
+def test_filter_events_by_account_lists_each_event_once(api_client):
+    year = FinancialYear.objects.create(start_date="2023-01-01", end_date="2023-12-31")
+    cash = Account.objects.create(name="Cash", code=1930)
+    event = Event.objects.create(
+        date="2023-06-15", description="Transfer", financial_year=year
+    )
+    Transaction.objects.create(
+        amount=10000, account=cash, direction="debit", event=event
+    )
+    Transaction.objects.create(
+        amount=10000, account=cash, direction="credit", event=event
+    )
+
+    assert list_ids(api_client, {"account": cash.id}) == [event.id]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"financial_year": "x"},
+        {"date__gte": "not-a-date"},
+        {"account": "cash"},
+        {"created_at__lte": "yesterday"},
+    ],
+)
+def test_filter_events_rejects_invalid_values(api_client, params):
+    response = api_client.get(reverse("event-list"), params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert list(response.data) == list(params)
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite query plans")
+@pytest.mark.parametrize(
+    "filters, index",
+    [
+        ({"financial_year": 1}, "tx_event_year_date_id_idx"),
+        (
+            {"financial_year": 1, "date__gte": "2023-03-01"},
+            "tx_event_year_date_id_idx",
+        ),
+        (
+            {"date__gte": "2023-03-01", "date__lte": "2023-03-31"},
+            "tx_event_date_id_idx",
+        ),
+        ({"account": 3}, "tx_transaction_acct_event_idx"),
+        (
+            {
+                "created_at__gte": "2023-12-31T00:00:00Z",
+                "created_at__lte": "2023-12-31T23:59:59Z",
+            },
+            "tx_event_created_id_idx",
+        ),
+    ],
+)
+def test_filter_events_uses_index(api_client, ledger, filters, index):
+    years, accounts = ledger
+    params = dict(filters)
+    if "financial_year" in params:
+        params["financial_year"] = years[params["financial_year"]].id
+    if "account" in params:
+        params["account"] = accounts[params["account"]].id
+    params["page_size"] = 10
+
+    first = api_client.get(reverse("event-list"), params)
+    assert first.data["next"]
+    # The first page and a page after a keyset cursor
+    for url, data in [(reverse("event-list"), params), (first.data["next"], None)]:
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, data)
+        assert response.status_code == status.HTTP_200_OK
+
+        plan = query_plan(queries[0]["sql"])
+        assert any(index in step for step in plan), plan
+        assert not any(step.startswith("SCAN") for step in plan), plan
@@ -0,0 +1,134 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework import status
+from tx.exports import export_ledger
+from tx.models import Event, FinancialYear, Account, Transaction
+
+
+@pytest.fixture
+def ledger(financial_year):
+    cash = Account.objects.create(name="Cash", code=1930)
+    sales = Account.objects.create(name="Sales", code=3001)
+    other_year = FinancialYear.objects.create(
+        start_date="2024-01-01", end_date="2024-12-31"
+    )
+    for date, description, year in [
+        ("2023-06-16", "Invoice, March", financial_year),
+        ("2023-06-15", "Cash sale", financial_year),
+        ("2024-01-10", "Next year", other_year),
+    ]:
+        event = Event.objects.create(
+            date=date, description=description, financial_year=year
+        )
+        Transaction.objects.create(
+            amount=12550, account=cash, direction="debit", event=event
+        )
+        Transaction.objects.create(
+            amount=12550, account=sales, direction="credit", event=event
+        )
+
+
+def read_csv(content):
+    return list(csv.DictReader(io.StringIO(content.decode())))
+
+
+@pytest.mark.django_db
+def test_export_ledger_csv(api_client, ledger):
+    response = api_client.get(reverse("event-export"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv"
+    assert 'filename="ledger.csv"' in response["Content-Disposition"]
+
+    rows = read_csv(b"".join(response.streaming_content))
+    assert len(rows) == 6
+    assert [row["description"] for row in rows[::2]] == [
+        "Cash sale",
+        "Invoice, March",
+        "Next year",
+    ]
+    assert rows[0]["account_code"] == "1930"
+    assert rows[0]["account_name"] == "Cash"
+    assert rows[0]["direction"] == "debit"
+    assert rows[0]["amount"] == "125.50"
+    assert rows[1]["account_code"] == "3001"
+
+
+@pytest.mark.django_db
+def test_export_ledger_ndjson_for_financial_year(api_client, ledger, financial_year):
+    url = reverse("event-export")
+    response = api_client.get(
+        url, {"output": "ndjson", "financial_year": financial_year.id}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert len(rows) == 4
+    assert {row["financial_year"] for row in rows} == {financial_year.id}
+    assert rows[0]["date"] == "2023-06-15"
+    assert rows[0]["amount"] == "125.50"
+
+
+@pytest.mark.django_db
+def test_export_ledger_gzip(api_client, ledger):
+    response = api_client.get(reverse("event-export"), {"compress": "gzip"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/gzip"
+    assert 'filename="ledger.csv.gz"' in response["Content-Disposition"]
+    content = gzip.decompress(b"".join(response.streaming_content))
+    assert len(read_csv(content)) == 6
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [{"output": "xml"}, {"compress": "zip"}, {"financial_year": "abc"}],
+)
+def test_export_ledger_rejects_invalid_parameters(api_client, params):
+    response = api_client.get(reverse("event-export"), params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_export_ledger_unknown_financial_year(api_client):
+    response = api_client.get(reverse("event-export"), {"financial_year": 999})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_export_ledger_command(ledger, financial_year, tmp_path):
+    output = tmp_path / "ledger.ndjson.gz"
+
+    call_command(
+        "export_ledger",
+        "--format=ndjson",
+        f"--financial-year={financial_year.id}",
+        "--gzip",
+        f"--output={output}",
+    )
+
+    lines = gzip.decompress(output.read_bytes()).decode().splitlines()
+    assert len(lines) == 4
+    assert json.loads(lines[0])["description"] == "Cash sale"
+
+
+@pytest.mark.django_db
+def test_export_ledger_command_to_text_stream(ledger):
+    stdout = io.StringIO()
+    call_command("export_ledger", "--format=csv", stdout=stdout)
+
+    assert stdout.getvalue() == b"".join(export_ledger("csv")).decode()
+    assert stdout.getvalue().startswith("event_id,date,")
+
+    with pytest.raises(CommandError):
+        call_command("export_ledger", "--gzip", stdout=io.StringIO())
@@ -0,0 +1,182 @@
+import pytest
+from datetime import date
+from django.db import transaction
+from django.urls import reverse
+from rest_framework import status
+from tx.financial_years import (
+    RELOAD_AFTER,
+    FinancialYearIndex,
+    financial_year_index,
+    resolve_financial_year,
+)
+from tx.models import Event, FinancialYear
+
+
+@pytest.fixture
+def financial_years():
+    return [
+        FinancialYear.objects.create(start_date="2022-07-01", end_date="2023-06-30"),
+        FinancialYear.objects.create(start_date="2023-07-01", end_date="2024-06-30"),
+        FinancialYear.objects.create(start_date="2025-01-01", end_date="2025-12-31"),
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "day, expected",
+    [
+        ("2022-06-30", None),
+        ("2022-07-01", 0),
+        ("2023-06-30", 0),
+        ("2023-07-01", 1),
+        ("2024-07-01", None),
+        ("2025-12-31", 2),
+        ("2026-01-01", None),
+    ],
+)
+def test_index_find(financial_years, day, expected):
+    index = FinancialYearIndex.load()
+    found = index.find(date.fromisoformat(day))
+    assert found == (None if expected is None else financial_years[expected])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        ("2024-07-01", "2024-12-31", []),
+        ("2024-06-30", "2024-12-31", [1]),
+        ("2023-01-01", "2025-01-01", [0, 1, 2]),
+        ("2026-01-01", "2026-12-31", []),
+    ],
+)
+def test_index_overlapping(financial_years, start, end, expected):
+    index = FinancialYearIndex.load()
+    overlapping = index.overlapping(date.fromisoformat(start), date.fromisoformat(end))
+    assert overlapping == [financial_years[i] for i in expected]
+
+
+@pytest.mark.django_db
+def test_index_is_invalidated_on_save(financial_years, django_assert_num_queries):
+    financial_year_index()
+    with django_assert_num_queries(0):
+        assert resolve_financial_year(date(2025, 3, 1)) == financial_years[2]
+
+    created = FinancialYear.objects.create(
+        start_date="2026-01-01", end_date="2026-12-31"
+    )
+    assert resolve_financial_year(date(2026, 3, 1)) == created
+
+
+@pytest.mark.django_db
+def test_rolled_back_year_is_not_indexed(financial_years):
+    financial_year_index()
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            FinancialYear.objects.create(start_date="2026-01-01", end_date="2026-12-31")
+            # Seen by the transaction that created it, but not shared
+            assert resolve_financial_year(date(2026, 3, 1)) is not None
+            raise RuntimeError
+
+    assert resolve_financial_year(date(2026, 3, 1)) is None
+
+
+@pytest.mark.django_db
+def test_shared_index_is_dropped_on_commit(
+    financial_years, django_capture_on_commit_callbacks
+):
+    shared = financial_year_index()
+    with django_capture_on_commit_callbacks(execute=True):
+        created = FinancialYear.objects.create(
+            start_date="2026-01-01", end_date="2026-12-31"
+        )
+        assert financial_year_index() is not shared
+        assert financial_year_index().find(date(2026, 3, 1)) == created
+
+    assert financial_year_index() is not shared
+    assert resolve_financial_year(date(2026, 3, 1)) == created
+
+
+@pytest.mark.django_db
+def test_create_event_resolves_financial_year(
+    api_client, financial_years, account, event_data
+):
+    response = api_client.post(
+        reverse("event-list"), event_data(account, date="2023-07-01"), format="json"
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["financial_year"] == financial_years[1].id
+    assert Event.objects.get().financial_year == financial_years[1]
+
+
+@pytest.mark.django_db
+def test_create_event_without_covering_financial_year(
+    api_client, financial_years, account, event_data
+):
+    response = api_client.post(
+        reverse("event-list"), event_data(account, date="2024-08-01"), format="json"
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "financial_year" in response.data
+
+
+@pytest.mark.django_db
+def test_bulk_create_resolves_financial_years_without_queries(
+    api_client, financial_years, account, django_assert_num_queries, event_data
+):
+    financial_year_index()
+    days = ["2022-08-01", "2023-08-01", "2025-08-01"] * 10
+    data = [event_data(account, date=day) for day in days]
+    data[0]["financial_year"] = financial_years[0].id
+
+    # accounts, savepoint, events, transactions, balance rows,
+    # balance increments, later checkpoints, previous checkpoints,
+    # new checkpoints, release
+    with django_assert_num_queries(10):
+        response = api_client.post(reverse("event-bulk"), data, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    years = Event.objects.order_by("id").values_list("financial_year", flat=True)
+    assert list(years[:3]) == [year.id for year in financial_years]
+
+
+@pytest.mark.django_db
+def test_financial_year_rejects_overlap(api_client, financial_years):
+    response = api_client.post(
+        reverse("financialyear-list"),
+        {"start_date": "2024-06-01", "end_date": "2024-12-31"},
+        format="json",
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "overlaps" in str(response.data["non_field_errors"][0])
+
+
+@pytest.mark.django_db
+def test_financial_year_fills_gap(api_client, financial_years):
+    response = api_client.post(
+        reverse("financialyear-list"),
+        {"start_date": "2024-07-01", "end_date": "2024-12-31"},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db
+def test_index_expires_for_changes_from_other_processes(
+    financial_years, monkeypatch, django_assert_num_queries
+):
+    index = financial_year_index()
+    # Changed and created without signals, as by another process
+    FinancialYear.objects.filter(pk=financial_years[2].pk).update(end_date="2025-06-30")
+    FinancialYear.objects.bulk_create(
+        [FinancialYear(start_date="2026-01-01", end_date="2026-12-31")]
+    )
+    with django_assert_num_queries(0):
+        assert resolve_financial_year(date(2025, 8, 1)) == financial_years[2]
+
+    monkeypatch.setattr(index, "loaded_at", index.loaded_at - RELOAD_AFTER)
+    assert resolve_financial_year(date(2025, 8, 1)) is None
+    assert resolve_financial_year(date(2026, 8, 1)) is not None
@@ -0,0 +1,132 @@
+import threading
+import time
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from tx.balances import verify_balances
+from tx.group_commit import GroupCommit
+from tx.models import Account, Event, FinancialYear
+from tx.serializers import event_group_commit
+
+
+class Writer:
+    """Fake writes that hold the first batch until every caller has queued."""
+
+    def __init__(self):
+        self.batches = []
+        self.queued = threading.Event()
+
+    def write_batch(self, items):
+        self.batches.append(list(items))
+        if len(self.batches) == 1:
+            self.queued.wait(5)
+        if "bad" in items:
+            raise ValueError("batch failed")
+        return [item.upper() for item in items]
+
+    def write_one(self, item):
+        if item == "bad":
+            raise ValueError(f"{item} failed")
+        return item.upper()
+
+
+def submit_all(group, writer, items):
+    results = {}
+
+    def submit(item):
+        try:
+            results[item] = group.submit(item)
+        except ValueError as exc:
+            results[item] = exc
+
+    threads = [threading.Thread(target=submit, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with group.condition:
+            written = sum(len(batch) for batch in writer.batches)
+            if len(group.pending) + written == len(items):
+                break
+        time.sleep(0.001)
+    writer.queued.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_group_commit_coalesces_concurrent_writes():
+    items = [f"event {i}" for i in range(10)]
+    writer = Writer()
+    group = GroupCommit(writer.write_batch, writer.write_one, max_batch=4)
+
+    results = submit_all(group, writer, items)
+
+    assert results == {item: item.upper() for item in items}
+    # The callers that queued behind the first batch were written in batches
+    # of up to four
+    assert sorted(sum(writer.batches, [])) == sorted(items)
+    assert max(len(batch) for batch in writer.batches) == 4
+    assert len(writer.batches) <= 4
+    assert not group.leading and not group.pending
+
+
+def test_group_commit_failed_batch_fails_only_the_bad_item():
+    items = ["a", "b", "bad", "c"]
+    writer = Writer()
+    group = GroupCommit(writer.write_batch, writer.write_one)
+
+    results = submit_all(group, writer, items)
+
+    assert str(results.pop("bad")) == "bad failed"
+    assert results == {"a": "A", "b": "B", "c": "C"}
+
+
+def test_event_group_commit_reads_batch_size_from_settings(settings):
+    settings.EVENT_GROUP_COMMIT_MAX_BATCH = 3
+    assert event_group_commit.batch_size() == 3
+    settings.EVENT_GROUP_COMMIT_MAX_BATCH = 50
+    assert event_group_commit.batch_size() == 50
+
+
+@pytest.mark.django_db
+def test_group_commit_inside_atomic_writes_directly():
+    writer = Writer()
+    group = GroupCommit(writer.write_batch, writer.write_one)
+
+    # Tests run inside a transaction
+    assert group.submit("event") == "EVENT"
+    assert writer.batches == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_event_with_group_commit(settings):
+    settings.EVENT_GROUP_COMMIT = True
+    api_client = APIClient()
+    financial_year = FinancialYear.objects.create(
+        start_date="2023-01-01", end_date="2023-12-31"
+    )
+    account = Account.objects.create(name="Test Account", code=1000)
+    data = {
+        "date": "2023-06-15",
+        "description": "Grouped",
+        "financial_year": financial_year.id,
+        "transactions": [
+            {"amount": "100.00", "account": account.id, "direction": "debit"},
+            {"amount": "100.00", "account": account.id, "direction": "credit"},
+        ],
+    }
+
+    response = api_client.post(reverse("event-list"), data, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    event = Event.objects.get()
+    assert response.data["id"] == event.id
+    assert response.data["created_at"]
+    assert len(response.data["transactions"]) == 2
+    assert verify_balances() == []
+
+    data["transactions"][0]["amount"] = "99.00"
+    response = api_client.post(reverse("event-list"), data, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert Event.objects.count() == 1
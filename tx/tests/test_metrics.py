@@ -0,0 +1,156 @@
+import re
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from tx.metrics import Histogram, RequestMetrics, registry
+from tx.models import Account, Event, Transaction
+
+SERVER_TIMING = re.compile(
+    r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries", serializer;dur=[\d.]+$'
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+@pytest.fixture
+def event(financial_year, account):
+    event = Event.objects.create(
+        date="2023-06-15", description="Sale", financial_year=financial_year
+    )
+    Transaction.objects.create(
+        amount=10000, account=account, direction="debit", event=event
+    )
+    Transaction.objects.create(
+        amount=10000, account=account, direction="credit", event=event
+    )
+    return event
+
+
+def scrape(api_client):
+    response = api_client.get(reverse("metrics"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    return response.content.decode()
+
+
+def sample(text, name, view, suffix=""):
+    match = re.search(
+        rf'^{name}{suffix}{{view="{re.escape(view)}"}} (\S+)$', text, re.MULTILINE
+    )
+    return float(match.group(1)) if match else None
+
+
+@pytest.mark.django_db
+def test_server_timing_header(api_client, event):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(reverse("event-list"))
+    assert response.status_code == status.HTTP_200_OK
+
+    match = SERVER_TIMING.match(response["Server-Timing"])
+    assert match is not None
+    assert int(match.group(1)) == len(queries)
+
+
+@pytest.mark.django_db
+def test_metrics_per_view(api_client, event):
+    for _ in range(2):
+        api_client.get(reverse("event-list"))
+    response = api_client.get(reverse("event-detail", kwargs={"pk": event.id}))
+    not_found = api_client.get(reverse("event-detail", kwargs={"pk": 999}))
+
+    text = scrape(api_client)
+    assert 'taxan_requests_total{view="EventViewSet.list",status="200"} 2' in text
+    assert 'taxan_requests_total{view="EventViewSet.retrieve",status="200"} 1' in text
+    assert 'taxan_requests_total{view="EventViewSet.retrieve",status="404"} 1' in text
+
+    view = "EventViewSet.retrieve"
+    assert sample(text, "taxan_request_duration_seconds", view, "_count") == 2
+    assert sample(text, "taxan_request_db_queries", view, "_sum") > 0
+    assert sample(text, "taxan_request_serializer_duration_seconds", view, "_sum") > 0
+    size = len(response.content) + len(not_found.content)
+    assert sample(text, "taxan_response_size_bytes", view, "_sum") == size
+
+
+@pytest.mark.django_db
+def test_metrics_write_and_async_views(api_client, financial_year, account):
+    response = api_client.post(
+        reverse("event-list"),
+        {
+            "date": "2023-06-15",
+            "description": "Sale",
+            "financial_year": financial_year.id,
+            "transactions": [
+                {"amount": "100.00", "account": account.id, "direction": "debit"},
+                {"amount": "100.00", "account": account.id, "direction": "credit"},
+            ],
+        },
+        format="json",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = async_to_sync(AsyncClient().get)(reverse("async-event-list"))
+    assert response.status_code == status.HTTP_200_OK
+    queries = int(SERVER_TIMING.match(response["Server-Timing"]).group(1))
+    assert queries > 0
+
+    text = scrape(api_client)
+    assert sample(text, "taxan_request_db_queries", "EventViewSet.create", "_sum") > 0
+    assert (
+        sample(text, "taxan_request_db_queries", "AsyncEventListView.get", "_sum")
+        == queries
+    )
+
+
+@pytest.mark.django_db
+def test_metrics_streamed_response(api_client, event):
+    response = api_client.get(reverse("event-export"))
+    body = b"".join(response.streaming_content)
+    response.close()
+
+    text = scrape(api_client)
+    view = "EventViewSet.export"
+    assert sample(text, "taxan_response_size_bytes", view, "_sum") == len(body)
+    # Queries run while streaming are counted
+    assert sample(text, "taxan_request_db_queries", view, "_sum") > 0
+
+
+@pytest.mark.django_db
+def test_queries_outside_requests_not_recorded(account):
+    Account.objects.count()
+    assert registry.requests == {}
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency", "Latency.", (0.1, 1))
+    for value in [0.05, 0.1, 0.5, 5]:
+        histogram.observe("v", value)
+
+    assert list(histogram.render()) == [
+        "# HELP latency Latency.",
+        "# TYPE latency histogram",
+        'latency_bucket{view="v",le="0.1"} 2',
+        'latency_bucket{view="v",le="1"} 3',
+        'latency_bucket{view="v",le="+Inf"} 4',
+        'latency_sum{view="v"} 5.65',
+        'latency_count{view="v"} 4',
+    ]
+
+
+def test_record_counts_requests_by_status():
+    registry.record("v", 200, RequestMetrics(), 0.2, 10)
+    registry.record("v", 500, RequestMetrics(), 0.2, None)
+
+    text = registry.render()
+    assert 'taxan_requests_total{view="v",status="200"} 1' in text
+    assert 'taxan_requests_total{view="v",status="500"} 1' in text
+    assert 'taxan_request_duration_seconds_count{view="v"} 2' in text
+    assert 'taxan_response_size_bytes_count{view="v"} 1' in text
@@ -0,0 +1,143 @@
+import base64
+import logging
+import pstats
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from tx.models import Event, FinancialYear
+
+
+@pytest.fixture
+def profile_root(settings, tmp_path):
+    settings.PROFILE_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def staff():
+    return User.objects.create_user("staff", password="secret", is_staff=True)
+
+
+@pytest.fixture
+def staff_client(api_client, staff):
+    api_client.force_login(staff)
+    return api_client
+
+
+@pytest.fixture
+def basic_auth(staff):
+    return "Basic " + base64.b64encode(b"staff:secret").decode()
+
+
+@pytest.fixture
+def event():
+    financial_year = FinancialYear.objects.create(
+        start_date="2023-01-01", end_date="2023-12-31"
+    )
+    return Event.objects.create(
+        date="2023-06-15", description="Sale", financial_year=financial_year
+    )
+
+
+@pytest.mark.django_db
+def test_profile_request(staff_client, profile_root, event):
+    response = staff_client.get(reverse("event-list"), headers={"X-Profile": "1"})
+    assert response.status_code == status.HTTP_200_OK
+    profile_id = response["X-Profile-Id"]
+    assert (profile_root / f"{profile_id}.prof").exists()
+
+    url = reverse("profile", kwargs={"profile_id": profile_id})
+    report = staff_client.get(url, {"sort": "tottime", "limit": 10})
+    assert report.status_code == status.HTTP_200_OK
+    assert "function calls" in report.content.decode()
+
+    raw = staff_client.get(url, {"format": "prof"})
+    path = profile_root / "downloaded.prof"
+    path.write_bytes(b"".join(raw.streaming_content))
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert "list" in functions
+
+
+@pytest.mark.django_db
+def test_profile_with_basic_auth_and_query_parameter(
+    api_client, profile_root, basic_auth
+):
+    response = api_client.get(
+        reverse("event-list"), {"profile": "1"}, HTTP_AUTHORIZATION=basic_auth
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert "X-Profile-Id" in response
+
+
+@pytest.mark.django_db
+def test_profile_async_view(profile_root, basic_auth, event):
+    response = async_to_sync(AsyncClient().get)(
+        reverse("async-event-list"),
+        headers={"X-Profile": "1", "Authorization": basic_auth},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    stats = pstats.Stats(str(profile_root / f"{response['X-Profile-Id']}.prof"))
+    functions = {name for _, _, name in stats.stats}
+    # The coroutine on the event loop and the queries in the worker thread
+    assert "respond" in functions
+    assert "_execute" in functions
+
+
+@pytest.mark.django_db
+def test_profiling_is_staff_only(api_client, profile_root, staff):
+    response = api_client.get(reverse("event-list"), headers={"X-Profile": "1"})
+    assert "X-Profile-Id" not in response
+    assert not list(profile_root.iterdir())
+
+    staff_client = APIClient()
+    staff_client.force_login(staff)
+    response = staff_client.get(reverse("event-list"), headers={"X-Profile": "1"})
+    url = reverse("profile", kwargs={"profile_id": response["X-Profile-Id"]})
+    assert api_client.get(url).status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_profiles_pruned(staff_client, profile_root, settings):
+    settings.PROFILE_KEEP = 2
+    ids = [
+        staff_client.get(reverse("event-list"), headers={"X-Profile": "1"})[
+            "X-Profile-Id"
+        ]
+        for _ in range(3)
+    ]
+    assert len(set(ids)) == 3
+    assert len(list(profile_root.iterdir())) == 2
+
+    url = reverse(
+        "profile", kwargs={"profile_id": "00000000-0000-0000-0000-000000000000"}
+    )
+    assert staff_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_slow_query_logged_with_plan(api_client, settings, caplog, event):
+    settings.SLOW_QUERY_THRESHOLD = 0
+    with caplog.at_level(logging.WARNING, logger="tx.slow_queries"):
+        api_client.get(reverse("event-list"))
+
+    records = [r for r in caplog.records if r.name == "tx.slow_queries"]
+    assert records
+    assert all(record.view == "EventViewSet.list" for record in records)
+    event_query = next(r for r in records if 'FROM "tx_event"' in r.sql)
+    assert event_query.plan
+    assert "tx_event" in event_query.getMessage()
+
+
+@pytest.mark.django_db
+def test_slow_query_threshold(api_client, settings, caplog, event):
+    settings.SLOW_QUERY_THRESHOLD = 60
+    with caplog.at_level(logging.WARNING, logger="tx.slow_queries"):
+        api_client.get(reverse("event-list"))
+        settings.SLOW_QUERY_THRESHOLD = None
+        api_client.get(reverse("event-list"))
+    assert not [r for r in caplog.records if r.name == "tx.slow_queries"]
@@ -0,0 +1,111 @@
+from unittest import mock
+import pytest
+from django.conf import settings
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.urls import reverse
+from taxan.databases import sqlite_production_databases
+from tx import replica
+from tx.models import Event
+from tx.replica import ReadReplicaRouter
+
+
+@pytest.fixture
+def read_marks():
+    """The replica mark at every read routed while the test runs."""
+    marks = []
+    original = ReadReplicaRouter.db_for_read
+
+    def db_for_read(self, model, **hints):
+        marks.append(replica._use_replica.get())
+        return original(self, model, **hints)
+
+    with mock.patch.object(ReadReplicaRouter, "db_for_read", db_for_read):
+        yield marks
+
+
+@pytest.mark.django_db
+def test_production_profile(tmp_path):
+    connections = ConnectionHandler(
+        sqlite_production_databases(tmp_path / "db.sqlite3")
+    )
+    try:
+        with connections["default"].cursor() as cursor:
+            cursor.execute("CREATE TABLE t (x)")
+            pragmas = {}
+            for pragma in ["journal_mode", "synchronous", "mmap_size", "busy_timeout"]:
+                cursor.execute(f"PRAGMA {pragma}")
+                pragmas[pragma] = cursor.fetchone()[0]
+        assert pragmas == {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "mmap_size": 268435456,
+            "busy_timeout": 20000,
+        }
+        assert connections["default"].transaction_mode == "IMMEDIATE"
+
+        with connections["replica"].cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM t")
+            with pytest.raises(OperationalError):
+                cursor.execute("INSERT INTO t VALUES (1)")
+    finally:
+        connections.close_all()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "name, kwargs, replica_reads",
+    [
+        ("event-list", {}, True),
+        ("async-event-list", {}, True),
+        ("financialyear-list", {}, True),
+        ("financialyear-trial-balance", {"pk": "year"}, True),
+        ("attachment-list", {}, False),
+    ],
+)
+def test_safe_reads_marked_for_replica(
+    api_client, financial_year, read_marks, name, kwargs, replica_reads
+):
+    if kwargs:
+        kwargs = {"pk": financial_year.id}
+    response = api_client.get(reverse(name, kwargs=kwargs))
+    assert response.status_code == 200
+
+    assert read_marks
+    assert all(mark == replica_reads for mark in read_marks)
+    # The mark ends with the response
+    assert replica._use_replica.get() is False
+
+
+@pytest.mark.django_db
+def test_writes_not_marked_for_replica(api_client, financial_year, account, read_marks):
+    response = api_client.post(
+        reverse("event-list"),
+        {
+            "date": "2023-06-15",
+            "description": "Sale",
+            "financial_year": financial_year.id,
+            "transactions": [
+                {"amount": "100.00", "account": account.id, "direction": "debit"},
+                {"amount": "100.00", "account": account.id, "direction": "credit"},
+            ],
+        },
+        format="json",
+    )
+    assert response.status_code == 201
+    assert read_marks and not any(read_marks)
+
+
+def test_router():
+    router = ReadReplicaRouter()
+    token = replica._use_replica.set(True)
+    try:
+        # Without a replica alias reads stay on the default database
+        assert router.db_for_read(Event) is None
+        with mock.patch.dict(settings.DATABASES, {"replica": {}}):
+            assert router.db_for_read(Event) == "replica"
+            assert router.db_for_write(Event) is None
+    finally:
+        replica._use_replica.reset(token)
+    assert router.allow_migrate("replica", "tx") is False
+    assert router.allow_migrate("default", "tx") is None
@@ -0,0 +1,99 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from tx.models import FinancialYear, Account
+
+
+@pytest.fixture
+def ledger(api_client, financial_year):
+    cash = Account.objects.create(name="Cash", code=1930)
+    sales = Account.objects.create(name="Sales", code=3001)
+    rent = Account.objects.create(name="Rent", code=5010)
+    other_year = FinancialYear.objects.create(
+        start_date="2024-01-01", end_date="2024-12-31"
+    )
+
+    def book(date, year, debit, credit, amount):
+        response = api_client.post(
+            reverse("event-list"),
+            {
+                "date": date,
+                "description": "Event",
+                "financial_year": year.id,
+                "transactions": [
+                    {"amount": amount, "account": debit.id, "direction": "debit"},
+                    {"amount": amount, "account": credit.id, "direction": "credit"},
+                ],
+            },
+            format="json",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    book("2023-02-01", financial_year, cash, sales, "1000.00")
+    book("2023-03-15", financial_year, rent, cash, "400.00")
+    book("2023-09-30", financial_year, cash, sales, "250.00")
+    book("2024-01-10", other_year, cash, sales, "99.00")
+
+
+def url_for(financial_year):
+    return reverse("financialyear-trial-balance", kwargs={"pk": financial_year.id})
+
+
+def summary(response):
+    return [
+        (row["code"], row["debit"], row["credit"], row["balance"])
+        for row in response.data["accounts"]
+    ]
+
+
+@pytest.mark.django_db
+def test_trial_balance(api_client, financial_year, ledger):
+    response = api_client.get(url_for(financial_year))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["as_of"] == "2023-12-31"
+    assert summary(response) == [
+        (1930, "1250.00", "400.00", "850.00"),
+        (3001, "0.00", "1250.00", "-1250.00"),
+        (5010, "400.00", "0.00", "400.00"),
+    ]
+    assert response.data["accounts"][0]["name"] == "Cash"
+    assert response.data["debit"] == response.data["credit"] == "1650.00"
+
+
+@pytest.mark.django_db
+def test_trial_balance_as_of(api_client, financial_year, ledger):
+    response = api_client.get(url_for(financial_year), {"as_of": "2023-03-15"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["as_of"] == "2023-03-15"
+    assert summary(response) == [
+        (1930, "1000.00", "400.00", "600.00"),
+        (3001, "0.00", "1000.00", "-1000.00"),
+        (5010, "400.00", "0.00", "400.00"),
+    ]
+    assert response.data["debit"] == response.data["credit"] == "1400.00"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("as_of", [None, "2023-06-30"])
+def test_trial_balance_is_one_aggregate_query(
+    api_client, financial_year, ledger, as_of
+):
+    params = {"as_of": as_of} if as_of else {}
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(url_for(financial_year), params)
+    assert response.status_code == status.HTTP_200_OK
+    # financial year, report
+    assert len(queries) == 2
+    if as_of:
+        assert "GROUP BY" in queries[1]["sql"].upper()
+
+
+@pytest.mark.django_db
+def test_trial_balance_rejects_invalid_date(api_client, financial_year):
+    response = api_client.get(url_for(financial_year), {"as_of": "yesterday"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "as_of" in response.data
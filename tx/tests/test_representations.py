@@ -0,0 +1,127 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import prefetch_related_objects
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from tx.models import Account, Attachment, Event, FinancialYear, Transaction
+from tx.representations import EVENT_FIELDS, build_representations, serialize_events
+from tx.serializers import EventSerializer
+
+
+@pytest.fixture
+def request_(settings):
+    settings.ALLOWED_HOSTS = ["example.com"]
+    return Request(APIRequestFactory().get("/events/", HTTP_HOST="example.com:8000"))
+
+
+@pytest.fixture
+def events():
+    financial_year = FinancialYear.objects.create(
+        start_date="2023-01-01", end_date="2023-12-31"
+    )
+    cash = Account.objects.create(name="Cash", code=1930)
+    sales = Account.objects.create(name="Sales", code=3001)
+    created = []
+    for i, description in enumerate(['Invoice "42", Malmö', "Rent", "No attachments"]):
+        event = Event.objects.create(
+            date=f"2023-06-{10 + i}",
+            description=description,
+            financial_year=financial_year,
+        )
+        for amount, account, direction in [
+            (12550 * (i + 1), cash, "debit"),
+            (10000 * (i + 1), sales, "credit"),
+            (2550 * (i + 1), sales, "credit"),
+        ]:
+            Transaction.objects.create(
+                amount=amount, account=account, direction=direction, event=event
+            )
+        for _ in range(2 - i):
+            Attachment.objects.create(
+                file=SimpleUploadedFile(f"receipt-{i}.pdf", b"receipt %d" % i),
+                event=event,
+            )
+        created.append(event)
+    # An event from another page, whose rows must not leak into this one
+    Transaction.objects.create(
+        amount=100,
+        account=cash,
+        direction="debit",
+        event=Event.objects.create(
+            date="2023-07-01", description="Other", financial_year=financial_year
+        ),
+    )
+    return created
+
+
+def serializer_output(events, request, format=None):
+    events = list(Event.objects.filter(pk__in=[event.pk for event in events]))
+    prefetch_related_objects(events, "transactions", "attachments")
+    context = {"request": request, "format": format}
+    return JSONRenderer().render(
+        EventSerializer(events, many=True, context=context).data
+    )
+
+
+def fast_output(events, request, format=None):
+    rows = list(
+        Event.objects.filter(pk__in=[event.pk for event in events]).values(
+            *EVENT_FIELDS
+        )
+    )
+    return JSONRenderer().render(serialize_events(rows, request, format))
+
+
+@pytest.mark.django_db
+def test_identical_to_event_serializer(events, request_):
+    output = fast_output(events, request_)
+    assert output == serializer_output(events, request_)
+    assert b'"url":"http://example.com:8000/events/' in output
+
+
+@pytest.mark.django_db
+def test_identical_with_format_suffix(events, request_):
+    assert fast_output(events, request_, "json") == serializer_output(
+        events, request_, "json"
+    )
+
+
+@pytest.mark.django_db
+def test_identical_with_decimal_amounts(events, request_, settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        "COERCE_DECIMAL_TO_STRING": False,
+    }
+    output = fast_output(events, request_)
+    assert b'"amount":125.5' in output
+    assert output == serializer_output(events, request_)
+
+
+@pytest.mark.django_db
+def test_serialize_events_queries(events, request_, django_assert_num_queries):
+    rows = list(Event.objects.values(*EVENT_FIELDS))
+    with django_assert_num_queries(2):
+        serialize_events(rows, request_)
+    with django_assert_num_queries(0):
+        assert serialize_events([], request_) == []
+
+
+def test_build_representations_without_related_rows():
+    [event] = build_representations(
+        [
+            {
+                "id": 7,
+                "date": None,
+                "description": "Empty",
+                "financial_year_id": None,
+                "created_at": None,
+            }
+        ],
+        [],
+        [],
+        ("http://testserver/events/", "/"),
+    )
+    assert event["url"] == "http://testserver/events/7/"
+    assert event["transactions"] == []
+    assert event["attachments"] == []
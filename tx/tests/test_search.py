@@ -0,0 +1,133 @@
+import io
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from tx.models import Event, FinancialYear
+from tx.search import SEARCH_TABLE, search_terms, verify_search_index
+
+
+def search(api_client, q, **params):
+    response = api_client.get(reverse("event-search"), {"q": q, **params})
+    assert response.status_code == status.HTTP_200_OK
+    return [event["description"] for event in response.data]
+
+
+def test_search_terms():
+    assert search_terms('Telia "faktura", mars!') == ["telia", "faktura", "mars"]
+    assert search_terms("Kontorsmateriel Åhléns") == ["kontorsmateriel", "åhléns"]
+    assert search_terms(" -*: ") == []
+
+
+@pytest.mark.django_db
+def test_search_events(api_client, financial_year, account, event_data):
+    api_client.post(
+        reverse("event-bulk"),
+        [
+            event_data(account, description=description, financial_year=financial_year)
+            for description in [
+                "Telia faktura mars",
+                "Telia faktura april",
+                "Hyra mars",
+                "Telia Telia abonnemang",
+            ]
+        ],
+        format="json",
+    )
+
+    assert search(api_client, "telia mars") == ["Telia faktura mars"]
+    # Words match as prefixes, and repeated words rank higher
+    assert search(api_client, "tel") == [
+        "Telia Telia abonnemang",
+        "Telia faktura mars",
+        "Telia faktura april",
+    ]
+    assert search(api_client, "tel", limit=1) == ["Telia Telia abonnemang"]
+    assert search(api_client, "elia") == []
+
+
+@pytest.mark.django_db
+def test_search_events_with_filters(api_client, account, event_data):
+    years = [
+        FinancialYear.objects.create(
+            start_date=f"{year}-01-01", end_date=f"{year}-12-31"
+        )
+        for year in (2023, 2024)
+    ]
+    for year in years:
+        api_client.post(
+            reverse("event-list"),
+            event_data(
+                account,
+                date=f"{year.start_date[:4]}-03-15",
+                description=f"Telia {year.start_date[:4]}",
+                financial_year=year,
+            ),
+            format="json",
+        )
+
+    assert search(api_client, "telia", financial_year=years[1].id) == ["Telia 2024"]
+    assert search(api_client, "telia", date__lte="2023-12-31") == ["Telia 2023"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{}, {"q": " - "}, {"q": "telia", "limit": 0}])
+def test_search_events_rejects_invalid_queries(api_client, params):
+    response = api_client.get(reverse("event-search"), params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_search_index_follows_event_changes(api_client, financial_year, account):
+    event = Event.objects.create(
+        date="2023-06-15", description="Telia faktura", financial_year=financial_year
+    )
+    assert search(api_client, "telia") == ["Telia faktura"]
+
+    event.description = "Tele2 faktura"
+    event.save()
+    assert search(api_client, "telia") == []
+    assert search(api_client, "tele2") == ["Tele2 faktura"]
+
+    event.delete()
+    assert search(api_client, "faktura") == []
+    assert verify_search_index()
+
+
+@pytest.mark.django_db
+def test_search_query_budget(
+    api_client, financial_year, account, django_assert_num_queries, event_data
+):
+    api_client.post(
+        reverse("event-list"),
+        event_data(account, description="Telia faktura", financial_year=financial_year),
+        format="json",
+    )
+    # events, transactions, attachments
+    with django_assert_num_queries(3):
+        search(api_client, "telia")
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite FTS5 index")
+def test_rebuild_search_index_command(financial_year):
+    event = Event.objects.create(
+        date="2023-06-15", description="Telia faktura", financial_year=financial_year
+    )
+    # Drop the event from the index behind the triggers' back
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, description) "
+            "VALUES ('delete', %s, %s)",
+            [event.id, event.description],
+        )
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_search_index", "--verify", stdout=io.StringIO())
+
+    call_command("rebuild_search_index", stdout=io.StringIO())
+    stdout = io.StringIO()
+    call_command("rebuild_search_index", "--verify", stdout=stdout)
+    assert "up to date" in stdout.getvalue()
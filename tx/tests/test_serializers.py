@@ -1,6 +1,5 @@
 import pytest
 from rest_framework.test import APIRequestFactory
-from decimal import Decimal
 from datetime import date
 from tx.models import FinancialYear, Account, Event, Transaction
 from tx.serializers import (
@@ -104,7 +103,7 @@ def test_transaction_create(account, event):
     serializer = TransactionSerializer(data=data)
     assert serializer.is_valid()
     transaction = serializer.save()
-    assert transaction.amount == Decimal("100.50")
+    assert transaction.amount == 10050
     assert transaction.account == account
     assert transaction.direction == "debit"
     assert transaction.event == event
@@ -126,7 +125,7 @@ def test_transaction_invalid_direction(account, event):
 @pytest.mark.django_db
 def test_transaction_serialization(account, event):
     transaction = Transaction.objects.create(
-        amount=Decimal("100.50"), account=account, direction="credit", event=event
+        amount=10050, account=account, direction="credit", event=event
     )
     serializer = TransactionSerializer(transaction)
     data = serializer.data
@@ -141,7 +140,7 @@ def test_transaction_serialization(account, event):
 @pytest.mark.django_db
 def test_transaction_update_not_supported(account, event):
     transaction = Transaction.objects.create(
-        amount=Decimal("100.50"), account=account, direction="credit", event=event
+        amount=10050, account=account, direction="credit", event=event
     )
     serializer = TransactionSerializer(transaction)
     with pytest.raises(AttributeError):
@@ -171,8 +170,8 @@ def test_event_create_with_balanced_transactions(
     debit_transaction = event.transactions.get(direction="debit")
     credit_transaction = event.transactions.get(direction="credit")
 
-    assert debit_transaction.amount == Decimal("100.00")
-    assert credit_transaction.amount == Decimal("100.00")
+    assert debit_transaction.amount == 10000
+    assert credit_transaction.amount == 10000
 
 
 @pytest.mark.django_db
@@ -222,10 +221,10 @@ def test_event_serialization(
         date=date(2023, 6, 1), description="Test event", financial_year=financial_year
     )
     Transaction.objects.create(
-        amount=Decimal("100.00"), account=cash_account, direction="debit", event=event
+        amount=10000, account=cash_account, direction="debit", event=event
     )
     Transaction.objects.create(
-        amount=Decimal("100.00"),
+        amount=10000,
         account=revenue_account,
         direction="credit",
         event=event,
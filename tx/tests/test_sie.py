@@ -0,0 +1,299 @@
+import io
+import pytest
+from datetime import date
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from tx.balances import verify_balances
+from tx.models import Event, FinancialYear, Account, Transaction
+from tx.sie_parser import parse_file, tokenize
+
+
+@pytest.fixture
+def financial_years():
+    previous = FinancialYear.objects.create(
+        start_date="2022-01-01", end_date="2022-12-31"
+    )
+    current = FinancialYear.objects.create(
+        start_date="2023-01-01", end_date="2023-12-31"
+    )
+    return previous, current
+
+
+@pytest.fixture
+def ledger(financial_years):
+    previous, current = financial_years
+    cash = Account.objects.create(name="Företagskonto", code=1930)
+    equity = Account.objects.create(name="Eget kapital", code=2010)
+    sales = Account.objects.create(name="Försäljning", code=3001)
+
+    def book(date, description, year, debit, credit, amount):
+        event = Event.objects.create(
+            date=date, description=description, financial_year=year
+        )
+        Transaction.objects.create(
+            amount=amount, account=debit, direction="debit", event=event
+        )
+        Transaction.objects.create(
+            amount=amount, account=credit, direction="credit", event=event
+        )
+        return event
+
+    book("2022-03-01", "Insättning", previous, cash, equity, 100000)
+    first = book("2023-02-01", 'Kvitto "Telia"', current, cash, sales, 25000)
+    second = book("2023-01-15", "Kontantförsäljning", current, cash, sales, 9950)
+    return first, second
+
+
+def sie_text(response):
+    return b"".join(response.streaming_content).decode("cp437")
+
+
+@pytest.mark.django_db
+def test_sie_export(api_client, financial_years, ledger):
+    _, current = financial_years
+    first, second = ledger
+    url = reverse("financialyear-sie", kwargs={"pk": current.id})
+
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert 'filename="taxan-20230101.se"' in response["Content-Disposition"]
+    lines = sie_text(response).splitlines()
+
+    assert lines[:3] == ["#FLAGGA 0", '#PROGRAM "Taxan" "0.1.0"', "#FORMAT PC8"]
+    assert "#SIETYP 4" in lines
+    assert "#RAR 0 20230101 20231231" in lines
+    assert '#KONTO 1930 "Företagskonto"' in lines
+    assert '#KONTO 3001 "Försäljning"' in lines
+
+    assert "#IB 0 1930 1000.00" in lines
+    assert "#UB 0 1930 1349.50" in lines
+    assert "#IB 0 2010 -1000.00" in lines
+    assert "#UB 0 2010 -1000.00" in lines
+    assert "#RES 0 3001 -349.50" in lines
+    assert not any(line.startswith("#IB 0 3001") for line in lines)
+
+    vouchers = lines[
+        lines.index(f'#VER "" {second.id} 20230115 "Kontantförsäljning"') :
+    ]
+    assert vouchers == [
+        f'#VER "" {second.id} 20230115 "Kontantförsäljning"',
+        "{",
+        "#TRANS 1930 {} 99.50",
+        "#TRANS 3001 {} -99.50",
+        "}",
+        f'#VER "" {first.id} 20230201 "Kvitto \\"Telia\\""',
+        "{",
+        "#TRANS 1930 {} 250.00",
+        "#TRANS 3001 {} -250.00",
+        "}",
+    ]
+
+
+@pytest.mark.django_db
+def test_sie_export_query_count(
+    api_client, financial_years, ledger, django_assert_num_queries
+):
+    _, current = financial_years
+    url = reverse("financialyear-sie", kwargs={"pk": current.id})
+    response = api_client.get(url)
+    # accounts, opening balances, movements, vouchers
+    with django_assert_num_queries(4):
+        sie_text(response)
+
+
+@pytest.mark.django_db
+def test_sie_export_unknown_financial_year(api_client):
+    response = api_client.get(reverse("financialyear-sie", kwargs={"pk": 999}))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_export_sie_command(financial_years, ledger, tmp_path):
+    _, current = financial_years
+    output = tmp_path / "export.se"
+
+    call_command(
+        "export_sie", str(current.id), "--company-name=Test AB", f"--output={output}"
+    )
+
+    lines = output.read_bytes().decode("cp437").splitlines()
+    assert '#FNAMN "Test AB"' in lines
+    assert "#RES 0 3001 -349.50" in lines
+
+
+@pytest.mark.django_db
+def test_export_sie_command_to_text_stream(financial_years, ledger):
+    _, current = financial_years
+    stdout = io.StringIO()
+
+    call_command("export_sie", str(current.id), stdout=stdout)
+
+    lines = stdout.getvalue().splitlines()
+    assert lines[0] == "#FLAGGA 0"
+    assert "#RES 0 3001 -349.50" in lines
+
+
+SIE_IMPORT = """\
+#FLAGGA 0
+#FORMAT PC8
+#SIETYP 4
+#RAR 0 20230101 20231231
+#KONTO 1930 "Företagskonto"
+#KONTO 3001 "Försäljning"
+#KONTO 2010
+#VER A 1 20230115 "Kontantförsäljning"
+{
+#TRANS 1930 {} 99.50
+#TRANS 3001 {1 "10"} -99.50
+}
+#VER A 2 20230116 "Obalanserad"
+{
+#TRANS 1930 {} 100.00
+#TRANS 3001 {} -90.00
+}
+#VER A 3 20230117 "Okänt konto"
+{
+#TRANS 1930 {} 10.00
+#TRANS 4010 {} -10.00
+}
+#VER A 4 20230118 "Felaktigt belopp"
+{
+#TRANS 1930 {} abc
+#TRANS 3001 {} -1.00
+}
+#VER A 5 20240101 "Nästa år"
+{
+#TRANS 1930 {} 1.00
+#TRANS 3001 {} -1.00
+}
+#VER A 6 20231231 "Bokslut"
+{
+#TRANS 1930 {} 250.00
+#RTRANS 3001 {} -250.00
+#TRANS 3001 {} -250.00
+}
+"""
+
+
+def write_sie(tmp_path, content=SIE_IMPORT):
+    path = tmp_path / "import.se"
+    path.write_bytes(content.encode("cp437"))
+    return path
+
+
+def test_tokenize():
+    assert tokenize('#VER "" 12 20230115 "Kvitto \\"Telia\\"" 20230120') == [
+        "#VER",
+        "",
+        "12",
+        "20230115",
+        'Kvitto "Telia"',
+        "20230120",
+    ]
+    assert tokenize('#TRANS 3001 {1 "10"} -99.50') == [
+        "#TRANS",
+        "3001",
+        '{1 "10"}',
+        "-99.50",
+    ]
+
+
+def test_parse_file_in_parallel_matches_sequential(tmp_path):
+    content = SIE_IMPORT + "".join(
+        f'#VER A {n} 20230201 "Voucher {n}"\n{{\n'
+        f"#TRANS 1930 {{}} {n}.00\n#TRANS 3001 {{}} -{n}.00\n}}\n"
+        for n in range(10, 200)
+    )
+    path = write_sie(tmp_path, content)
+
+    sequential = list(parse_file(path))
+    parallel = list(parse_file(path, workers=2, chunk_size=512))
+
+    assert parallel == sequential
+    vouchers = [record for record in sequential if record[0] == "voucher"]
+    assert len(vouchers) == 195
+
+
+@pytest.mark.django_db
+def test_import_sie_command(tmp_path):
+    Account.objects.create(name="Bank", code=1930)
+    path = write_sie(tmp_path)
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+
+    call_command("import_sie", str(path), stdout=stdout, stderr=stderr)
+
+    assert Account.objects.count() == 2
+    assert Account.objects.get(code=1930).name == "Företagskonto"
+    financial_year = FinancialYear.objects.get()
+    assert (financial_year.start_date, financial_year.end_date) == (
+        date(2023, 1, 1),
+        date(2023, 12, 31),
+    )
+
+    events = Event.objects.order_by("date")
+    assert [event.description for event in events] == [
+        "Kontantförsäljning",
+        "Bokslut",
+    ]
+    assert list(
+        events[0]
+        .transactions.order_by("id")
+        .values_list("account__code", "direction", "amount")
+    ) == [(1930, "debit", 9950), (3001, "credit", 9950)]
+    assert Transaction.objects.count() == 4
+    assert verify_balances() == []
+
+    errors = stderr.getvalue().splitlines()
+    assert errors == [
+        "Line 7: Malformed #KONTO.",
+        "Line 13: Total debits (100.00) must equal total credits (90.00).",
+        "Line 18: Unknown accounts: 4010.",
+        "Line 25: Malformed #TRANS.",
+        "Line 28: Voucher date (2024-01-01) is outside every financial year.",
+    ]
+    assert "Imported 2 events with 4 transactions" in stdout.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_sie_endpoint(api_client, tmp_path):
+    upload = SimpleUploadedFile("import.se", SIE_IMPORT.encode("cp437"))
+
+    response = api_client.post(
+        reverse("event-import-sie"), {"file": upload}, format="multipart"
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["events"] == 2
+    assert response.data["transactions"] == 4
+    assert response.data["accounts"] == 2
+    assert response.data["financial_years"] == 1
+    assert response.data["error_count"] == 5
+    assert response.data["errors"][1] == {
+        "line": 13,
+        "message": "Total debits (100.00) must equal total credits (90.00).",
+    }
+
+
+@pytest.mark.django_db
+def test_import_sie_endpoint_requires_file(api_client):
+    response = api_client.post(reverse("event-import-sie"), {}, format="multipart")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_sie_round_trip(api_client, financial_years, ledger, tmp_path):
+    _, current = financial_years
+    response = api_client.get(reverse("financialyear-sie", kwargs={"pk": current.id}))
+    path = tmp_path / "export.se"
+    path.write_bytes(b"".join(response.streaming_content))
+    Event.objects.all().delete()
+
+    call_command("import_sie", str(path), stdout=io.StringIO())
+
+    assert Event.objects.count() == 2
+    assert Event.objects.get(date="2023-02-01").description == 'Kvitto "Telia"'
+    assert Account.objects.count() == 3
@@ -1,23 +1,10 @@
 import pytest
-from rest_framework.test import APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from tx.models import Event, FinancialYear, Account
-
-
-@pytest.fixture
-def api_client():
-    return APIClient()
-
-
-@pytest.fixture
-def financial_year():
-    return FinancialYear.objects.create(start_date="2023-01-01", end_date="2023-12-31")
-
-
-@pytest.fixture
-def account():
-    return Account.objects.create(name="Test Account", code=1000)
+from tx.models import Event, Account, Transaction, Attachment
 
 
 @pytest.mark.django_db
@@ -62,4 +49,241 @@ def test_list_events(api_client, financial_year):
     url = reverse("event-list")
     response = api_client.get(url)
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) == 2
+    assert len(response.data["results"]) == 2
+
+
+@pytest.fixture
+def events_with_attachments(financial_year, account):
+
+    def create(count):
+        for i in range(count):
+            event = Event.objects.create(
+                date="2023-06-15",
+                description=f"Event {i}",
+                financial_year=financial_year,
+            )
+            Transaction.objects.create(
+                amount=10000, account=account, direction="debit", event=event
+            )
+            Transaction.objects.create(
+                amount=10000, account=account, direction="credit", event=event
+            )
+            Attachment.objects.create(
+                file=SimpleUploadedFile("receipt.pdf", b"receipt"), event=event
+            )
+
+    return create
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", [1, 10])
+def test_list_events_query_budget(
+    api_client, events_with_attachments, django_assert_num_queries, count
+):
+    events_with_attachments(count)
+    url = reverse("event-list")
+    # events, attachment ids (ETag), transactions, attachments
+    with django_assert_num_queries(4):
+        response = api_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["results"]) == count
+
+
+@pytest.mark.django_db
+def test_get_event_query_budget(
+    api_client, events_with_attachments, django_assert_num_queries
+):
+    events_with_attachments(1)
+    event = Event.objects.get()
+    url = reverse("event-detail", kwargs={"pk": event.id})
+    # ETag, event, transactions, attachments
+    with django_assert_num_queries(4):
+        response = api_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["attachments"] == ["Attachment for Event 0"]
+
+
+@pytest.mark.django_db
+def test_list_events_cursor_pagination(api_client, financial_year):
+    # Several events share a date, so the cursor must break ties on id
+    for day in ["2023-06-16", "2023-06-15", "2023-06-15", "2023-06-17", "2023-06-15"]:
+        Event.objects.create(date=day, description=day, financial_year=financial_year)
+    expected = list(Event.objects.order_by("date", "id").values_list("id", flat=True))
+
+    url = reverse("event-list") + "?page_size=2"
+    seen = []
+    pages = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        seen += [event["id"] for event in response.data["results"]]
+        pages.append(url)
+        url = response.data["next"]
+
+    assert seen == expected
+    assert len(pages) == 3
+
+    response = api_client.get(pages[-1])
+    previous = api_client.get(response.data["previous"])
+    assert [event["id"] for event in previous.data["results"]] == expected[2:4]
+
+
+@pytest.mark.django_db
+def test_list_events_deep_page_uses_keyset(api_client, financial_year):
+    for i in range(3):
+        Event.objects.create(
+            date="2023-06-15", description=f"Event {i}", financial_year=financial_year
+        )
+    first = api_client.get(reverse("event-list") + "?page_size=1")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(first.data["next"])
+    assert response.status_code == status.HTTP_200_OK
+
+    sql = " ".join(query["sql"] for query in queries).upper()
+    assert "OFFSET" not in sql
+    assert "COUNT(" not in sql
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("cursor", ["garbage", "cD1bIm5vdC1hLWRhdGUiLDFd"])
+def test_list_events_invalid_cursor(api_client, cursor):
+    response = api_client.get(reverse("event-list") + f"?cursor={cursor}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def voucher(financial_year, account_ids):
+    """One event debiting each of `account_ids` and crediting the last one."""
+    *debits, credit = account_ids
+    return {
+        "date": "2023-06-15",
+        "description": "Payroll",
+        "financial_year": financial_year.id,
+        "transactions": [
+            {"amount": "10.00", "account": account_id, "direction": "debit"}
+            for account_id in debits
+        ]
+        + [
+            {
+                "amount": f"{10 * len(debits)}.00",
+                "account": credit,
+                "direction": "credit",
+            }
+        ],
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("lines", [2, 40])
+def test_create_event_query_budget(
+    api_client, financial_year, django_assert_num_queries, lines
+):
+    accounts = Account.objects.bulk_create(
+        Account(name=f"Account {code}", code=code) for code in range(4000, 4000 + lines)
+    )
+    data = voucher(financial_year, [account.id for account in accounts])
+    # accounts, financial years, savepoint, event, transactions, balance rows,
+    # balance increments, later checkpoints, previous checkpoints,
+    # new checkpoints, release, response transactions and attachments
+    with django_assert_num_queries(13):
+        response = api_client.post(reverse("event-list"), data, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Transaction.objects.count() == lines
+
+    # The month's checkpoints now exist and are rolled forward instead:
+    # accounts, savepoint, event, transactions, balance rows,
+    # balance increments, later checkpoints, checkpoint increments, release,
+    # response transactions and attachments
+    with django_assert_num_queries(11):
+        response = api_client.post(reverse("event-list"), data, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db
+def test_create_event_reports_every_missing_account(
+    api_client, financial_year, account, django_assert_max_num_queries
+):
+    data = voucher(financial_year, [account.id, 998, account.id, 999])
+
+    # accounts, financial years
+    with django_assert_max_num_queries(2):
+        response = api_client.post(reverse("event-list"), data, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    errors = response.data["transactions"]
+    assert "account" not in errors[0] and "account" not in errors[2]
+    assert "998" in str(errors[1]["account"][0])
+    assert "999" in str(errors[3]["account"][0])
+
+
+@pytest.mark.django_db
+def test_bulk_create_events(api_client, financial_year, account, event_data):
+    url = reverse("event-bulk")
+    data = [
+        event_data(account, description=f"Event {i}", financial_year=financial_year)
+        for i in range(3)
+    ]
+
+    response = api_client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    events = Event.objects.order_by("id")
+    assert response.data["ids"] == [event.id for event in events]
+    assert [event.description for event in events] == ["Event 0", "Event 1", "Event 2"]
+    assert Transaction.objects.filter(event__in=events).count() == 6
+    assert all(event.created_at is not None for event in events)
+
+
+@pytest.mark.django_db
+def test_bulk_create_events_reports_errors_per_item(
+    api_client, financial_year, account, event_data
+):
+    url = reverse("event-bulk")
+    unbalanced = event_data(
+        account, description="Unbalanced", financial_year=financial_year
+    )
+    unbalanced["transactions"][0]["amount"] = "50.00"
+    data = [event_data(account, financial_year=financial_year), unbalanced]
+
+    response = api_client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data[0] == {}
+    assert "non_field_errors" in response.data[1]
+    assert Event.objects.count() == 0
+    assert Transaction.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_bulk_create_events_rejects_empty_payload(api_client):
+    response = api_client.post(reverse("event-bulk"), [], format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", [1, 20])
+def test_bulk_create_events_query_budget(
+    api_client, financial_year, account, django_assert_num_queries, count, event_data
+):
+    data = [event_data(account, financial_year=financial_year) for _ in range(count)]
+    # financial years, accounts, savepoint, events, transactions,
+    # balance rows, balance increments, later checkpoints,
+    # previous checkpoints, new checkpoints, release
+    with django_assert_num_queries(11):
+        response = api_client.post(reverse("event-bulk"), data, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db
+def test_bulk_create_events_reports_missing_accounts(
+    api_client, financial_year, account, event_data
+):
+    missing = event_data(account, financial_year=financial_year)
+    missing["transactions"][1]["account"] = account.id + 100
+    data = [event_data(account, financial_year=financial_year), missing]
+
+    response = api_client.post(reverse("event-bulk"), data, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data[0] == {}
+    assert "account" in response.data[1]["transactions"][1]
@@ -1,15 +1,89 @@
-from rest_framework import viewsets
-from rest_framework.mixins import CreateModelMixin, ListModelMixin, RetrieveModelMixin, DestroyModelMixin
-from drf_spectacular.utils import extend_schema, extend_schema_view
-from .models import Event, FinancialYear, Attachment
-from .serializers import EventSerializer, FinancialYearSerializer, AttachmentSerializer
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.mixins import (
+    CreateModelMixin,
+    ListModelMixin,
+    RetrieveModelMixin,
+    DestroyModelMixin,
+)
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    extend_schema,
+    extend_schema_view,
+    inline_serializer,
+)
+from .caching import IMMUTABLE_MAX_AGE, ConditionalGetMixin
+from .downloads import download_response
+from .exports import EXPORT_FORMATS, encode_chunks, export_ledger
+from .balances import balance_at
+from .models import Account, Event, FinancialYear, Attachment, Transaction
+from .pagination import EventPagination, AttachmentPagination
+from .reports import trial_balance_report
+from .representations import EVENT_FIELDS, serialize_events
+from .search import search_events
+from .serializers import (
+    AccountSerializer,
+    AccountBalanceQuerySerializer,
+    AccountBalanceSerializer,
+    EventFilterSerializer,
+    EventSearchQuerySerializer,
+    EventSerializer,
+    FinancialYearSerializer,
+    AttachmentSerializer,
+    TrialBalanceQuerySerializer,
+    TrialBalanceSerializer,
+)
+from .sie import SieImporter, sie_lines
+from .sie_parser import SIE_ENCODING, parse_lines, read_lines
+from .storage import atomic_storing_files
+
+EVENT_VERSION_FIELDS = ("id", "attachment_count", "last_attachment")
+
+
+def event_versions():
+    """
+    Events annotated with the state of their attachment list, the only part
+    of an event's representation that can change.
+    """
+    return Event.objects.annotate(
+        attachment_count=Count("attachments"),
+        last_attachment=Max("attachments"),
+    )
+
+
+def page_attachment_ids(event_ids):
+    """Ids of the attachments of a page of events, for the page's ETag."""
+    return (
+        Attachment.objects.filter(event__in=event_ids)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def filter_events(queryset, filters):
+    """Apply validated `EventFilterSerializer` data to an event queryset."""
+    filters = dict(filters)
+    account = filters.pop("account", None)
+    if account is not None:
+        # A subquery rather than a join, so that events touching the
+        # account more than once are listed once
+        filters["id__in"] = Transaction.objects.filter(account=account).values("event")
+    return queryset.filter(**filters)
 
 
 @extend_schema_view(
     list=extend_schema(
         summary="List accounting events",
-        description="Retrieve a list of all accounting events (journal entries) with their transactions and attachments.",
+        description="Retrieve accounting events (journal entries) with their transactions and attachments, ordered by date. Results can be filtered by financial year, date, account and creation time, and are paginated with an opaque cursor; follow the `next` link to fetch the following page.",
         tags=["events"],
+        parameters=[EventFilterSerializer],
     ),
     create=extend_schema(
         summary="Create a new accounting event",
@@ -23,7 +97,11 @@ from .serializers import EventSerializer, FinancialYearSerializer, AttachmentSer
     ),
 )
 class EventViewSet(
-    CreateModelMixin, ListModelMixin, RetrieveModelMixin, viewsets.GenericViewSet
+    ConditionalGetMixin,
+    CreateModelMixin,
+    ListModelMixin,
+    RetrieveModelMixin,
+    viewsets.GenericViewSet,
 ):
     """
     ViewSet for managing accounting events (journal entries).
@@ -32,8 +110,197 @@ class EventViewSet(
     transactions that must balance (total debits = total credits).
     """
 
-    queryset = Event.objects.all()
+    queryset = Event.objects.prefetch_related("transactions", "attachments")
     serializer_class = EventSerializer
+    pagination_class = EventPagination
+    bulk_max_events = 10000
+    # Read from the replica database when one is configured
+    replica_actions = {"list", "retrieve", "search", "export"}
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != "list":
+            return queryset
+        query = EventFilterSerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        # Pages are serialized from rows, see `serialize_page`
+        return filter_events(queryset, query.validated_data).values(*EVENT_FIELDS)
+
+    def get_object_version(self):
+        # Events and transactions never change; only the attachment list does
+        return self.lookup_version(event_versions(), *EVENT_VERSION_FIELDS)
+
+    def get_page_version(self, page):
+        ids = [event["id"] for event in page]
+        return ids, list(page_attachment_ids(ids))
+
+    def serialize_page(self, page):
+        return serialize_events(page, self.request, self.format_kwarg)
+
+    @extend_schema(
+        summary="Create many accounting events",
+        description=(
+            "Create a batch of accounting events in one request. Every event is "
+            "validated with the same rules as single event creation. If any event "
+            "is invalid nothing is created, and the response is a list with one "
+            "error object per submitted event (empty for valid events). On success "
+            "the IDs of the created events are returned in submission order."
+        ),
+        tags=["events"],
+        request=EventSerializer(many=True),
+        responses={
+            201: inline_serializer(
+                "BulkEventCreateResponse",
+                fields={"ids": serializers.ListField(child=serializers.IntegerField())},
+            )
+        },
+    )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=self.bulk_max_events,
+        )
+        serializer.is_valid(raise_exception=True)
+        events = serializer.save()
+        return Response(
+            {"ids": [event.id for event in events]}, status=status.HTTP_201_CREATED
+        )
+
+    @extend_schema(
+        summary="Search accounting events",
+        description=(
+            "Full-text search over event descriptions. Every word in `q` must "
+            "match the start of a word in the description. Results are ranked "
+            "by relevance, best match first, and can be narrowed with the same "
+            "filters as the event list."
+        ),
+        tags=["events"],
+        parameters=[EventSearchQuerySerializer],
+        responses=EventSerializer(many=True),
+    )
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        query = EventSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        filters = dict(query.validated_data)
+        terms = filters.pop("q")
+        limit = filters.pop("limit")
+        events = search_events(filter_events(Event.objects.all(), filters), terms)
+        events = list(events.values(*EVENT_FIELDS)[:limit])
+        return Response(serialize_events(events, request, self.format_kwarg))
+
+    @extend_schema(
+        summary="Import an SIE 4 file",
+        description=(
+            "Upload an SIE 4 file (CP437 encoded) as `file`. Accounts are created "
+            "or renamed by code, financial years are taken from `#RAR` when no "
+            "existing year covers a voucher, and every `#VER` becomes an event. "
+            "Vouchers are checked with the same rules as event creation; malformed "
+            "or unbalanced vouchers are skipped and reported with their line "
+            "number instead of aborting the import."
+        ),
+        tags=["events"],
+        request={
+            "multipart/form-data": inline_serializer(
+                "SieImportRequest", fields={"file": serializers.FileField()}
+            )
+        },
+        responses={
+            201: inline_serializer(
+                "SieImportResponse",
+                fields={
+                    "accounts": serializers.IntegerField(),
+                    "financial_years": serializers.IntegerField(),
+                    "events": serializers.IntegerField(),
+                    "transactions": serializers.IntegerField(),
+                    "error_count": serializers.IntegerField(),
+                    "errors": serializers.ListField(child=serializers.DictField()),
+                },
+            )
+        },
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import-sie",
+        parser_classes=[MultiPartParser],
+    )
+    def import_sie(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "No file was submitted."})
+        result = SieImporter().load(parse_lines(read_lines(upload.file)))
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Export the general ledger",
+        description=(
+            "Stream every transaction joined with its event and account as CSV or "
+            "newline-delimited JSON, ordered by event date. Rows are read from the "
+            "database in chunks and written as they are produced, so exports of any "
+            "size use constant memory. Optionally restricted to one financial year "
+            "and gzip-compressed."
+        ),
+        tags=["events"],
+        parameters=[
+            OpenApiParameter(
+                "output",
+                OpenApiTypes.STR,
+                enum=list(EXPORT_FORMATS),
+                description="Export format (default `csv`)",
+            ),
+            OpenApiParameter(
+                "financial_year",
+                OpenApiTypes.INT,
+                description="Only export events in this financial year",
+            ),
+            OpenApiParameter(
+                "compress",
+                OpenApiTypes.STR,
+                enum=["gzip"],
+                description="Compress the export with gzip",
+            ),
+        ],
+        responses={
+            (200, media_type): OpenApiTypes.BINARY
+            for media_type in [*EXPORT_FORMATS.values(), "application/gzip"]
+        },
+    )
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        export_format = request.query_params.get("output", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {"output": f"Must be one of: {', '.join(EXPORT_FORMATS)}."}
+            )
+
+        compress = request.query_params.get("compress")
+        if compress not in (None, "gzip"):
+            raise ValidationError({"compress": "Only gzip is supported."})
+
+        financial_year = request.query_params.get("financial_year")
+        if financial_year is not None:
+            if not financial_year.isdigit():
+                raise ValidationError(
+                    {"financial_year": "A valid integer is required."}
+                )
+            financial_year = get_object_or_404(FinancialYear, pk=financial_year)
+
+        filename = f"ledger.{export_format}"
+        content_type = EXPORT_FORMATS[export_format]
+        if compress:
+            filename += ".gz"
+            content_type = "application/gzip"
+
+        response = StreamingHttpResponse(
+            export_ledger(export_format, financial_year, compress=bool(compress)),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
 
 @extend_schema_view(
@@ -65,12 +332,107 @@ class FinancialYearViewSet(
 
     queryset = FinancialYear.objects.all()
     serializer_class = FinancialYearSerializer
+    replica_actions = {"list", "retrieve", "trial_balance", "sie"}
+
+    @extend_schema(
+        summary="Trial balance of a financial year",
+        description=(
+            "Total debits, total credits and net balance (debits minus credits) per "
+            "account for the financial year, ordered by account code. With `as_of`, "
+            "only events up to and including that date are counted. Computed in the "
+            "database with one grouped query."
+        ),
+        tags=["financial-years"],
+        parameters=[TrialBalanceQuerySerializer],
+        responses=TrialBalanceSerializer,
+    )
+    @action(detail=True, methods=["get"], url_path="trial-balance")
+    def trial_balance(self, request, pk=None):
+        financial_year = self.get_object()
+        query = TrialBalanceQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        report = trial_balance_report(financial_year, query.validated_data.get("as_of"))
+        return Response(TrialBalanceSerializer(report).data)
+
+    @extend_schema(
+        summary="Export a financial year as SIE 4",
+        description=(
+            "Download the financial year as an SIE 4 file (CP437 encoded) with the "
+            "chart of accounts, opening and closing balances (`#IB`/`#UB`), the "
+            "result per account (`#RES`) and every event as a voucher (`#VER`). "
+            "The file is streamed as it is generated."
+        ),
+        tags=["financial-years"],
+        responses={(200, "text/plain"): OpenApiTypes.BINARY},
+    )
+    @action(detail=True, methods=["get"])
+    def sie(self, request, pk=None):
+        financial_year = self.get_object()
+        response = StreamingHttpResponse(
+            encode_chunks(sie_lines(financial_year), encoding=SIE_ENCODING),
+            content_type=f"text/plain; charset={SIE_ENCODING}",
+        )
+        filename = f"taxan-{financial_year.start_date:%Y%m%d}.se"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+@extend_schema_view(
+    list=extend_schema(
+        summary="List accounts",
+        description="Retrieve the chart of accounts, ordered by account code.",
+        tags=["accounts"],
+    ),
+    retrieve=extend_schema(
+        summary="Retrieve an account",
+        description="Get details of a specific account.",
+        tags=["accounts"],
+    ),
+)
+class AccountViewSet(ListModelMixin, RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet for reading the chart of accounts and account balances.
+    """
+
+    queryset = Account.objects.order_by("code", "id")
+    serializer_class = AccountSerializer
+    replica_actions = {"list", "retrieve", "balance"}
+
+    @extend_schema(
+        summary="Balance of an account at a date",
+        description=(
+            "Cumulative debit and credit totals of the account, and their net "
+            "balance, at the end of `date`. Read from month-end checkpoints plus "
+            "at most one month of transactions."
+        ),
+        tags=["accounts"],
+        parameters=[AccountBalanceQuerySerializer],
+        responses=AccountBalanceSerializer,
+    )
+    @action(detail=True, methods=["get"])
+    def balance(self, request, pk=None):
+        account = self.get_object()
+        query = AccountBalanceQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        date = query.validated_data["date"]
+        debit, credit = balance_at(account, date)
+        return Response(
+            AccountBalanceSerializer(
+                {
+                    "account": account.id,
+                    "date": date,
+                    "debit": debit,
+                    "credit": credit,
+                    "balance": debit - credit,
+                }
+            ).data
+        )
 
 
 @extend_schema_view(
     create=extend_schema(
         summary="Upload a new file attachment",
-        description="Upload a file attachment and associate it with an accounting event. Files are automatically renamed with UUIDs.",
+        description="Upload a file attachment and associate it with an accounting event. Files are stored under the SHA-256 of their content, so uploading the same file again does not store a second copy.",
         tags=["attachments"],
     ),
     retrieve=extend_schema(
@@ -80,12 +442,17 @@ class FinancialYearViewSet(
     ),
     destroy=extend_schema(
         summary="Delete a file attachment",
-        description="Delete a file attachment. This will remove the file from storage and the database record.",
+        description="Delete a file attachment. The file is removed from storage once no other attachment refers to the same content.",
         tags=["attachments"],
     ),
 )
 class AttachmentViewSet(
-    CreateModelMixin, ListModelMixin, RetrieveModelMixin, DestroyModelMixin, viewsets.GenericViewSet
+    ConditionalGetMixin,
+    CreateModelMixin,
+    ListModelMixin,
+    RetrieveModelMixin,
+    DestroyModelMixin,
+    viewsets.GenericViewSet,
 ):
     """
     ViewSet for managing file attachments.
@@ -96,3 +463,59 @@ class AttachmentViewSet(
 
     queryset = Attachment.objects.all()
     serializer_class = AttachmentSerializer
+    pagination_class = AttachmentPagination
+    # The content of an attachment never changes while it exists, but the
+    # file URL in its representation does when storage is reorganized
+    # (`fan_out_attachments`, `dedupe_attachments`), so details are
+    # revalidated like events and only downloads are cached for good
+    download_cache_control = {
+        "private": True,
+        "max_age": IMMUTABLE_MAX_AGE,
+        "immutable": True,
+    }
+
+    def get_object_version(self):
+        return self.lookup_version(Attachment.objects.all(), "id", "file")
+
+    def perform_create(self, serializer):
+        # Keep the blob's reference count in step with the attachment row,
+        # and remove a newly stored file if the row is not written
+        with atomic_storing_files():
+            serializer.save()
+
+    @extend_schema(
+        summary="Download a file attachment",
+        description=(
+            "Download the attachment's file. A single byte range in `Range` is "
+            "answered with 206 Partial Content, and `If-Range` with the ETag "
+            "resumes an interrupted download only if the file is unchanged. The "
+            "ETag is the SHA-256 of the content, and `If-None-Match` is answered "
+            "with 304 Not Modified. Depending on the deployment the file may be "
+            "sent by the front proxy."
+        ),
+        tags=["attachments"],
+        parameters=[
+            OpenApiParameter(
+                "Range",
+                OpenApiTypes.STR,
+                OpenApiParameter.HEADER,
+                description="A single byte range, for example `bytes=0-1023`",
+            ),
+            OpenApiParameter(
+                "If-Range",
+                OpenApiTypes.STR,
+                OpenApiParameter.HEADER,
+                description="Only honour `Range` if the ETag still matches",
+            ),
+        ],
+        responses={
+            (200, "application/octet-stream"): OpenApiTypes.BINARY,
+            (206, "application/octet-stream"): OpenApiTypes.BINARY,
+            304: None,
+            416: None,
+        },
+    )
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        attachment = get_object_or_404(Attachment.objects.select_related("blob"), pk=pk)
+        return download_response(request, attachment, self.download_cache_control)